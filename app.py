@@ -1,9 +1,24 @@
 import os
 import sys
+import time
+import numpy as np
+import pandas as pd
 from flask import Flask, request, jsonify
 from src.recommendation_engine.content_based import ContentBasedRecommender
+from src.recommendation_engine.artifacts import prune_versions
 from src.recommendation_engine.collaborative import CollaborativeRecommender
+from src.recommendation_engine.datasets import INTERACTION_COLUMNS, load_dataset
+from src.recommendation_engine.factorization import ImplicitALSRecommender
 from src.recommendation_engine.hybrid import HybridRecommender
+from src.recommendation_engine.user_profiles import UserProfiles
+from src.recommendation_engine.pipeline import RecommendationPipeline
+from src.recommendation_engine.popularity import PopularityRecommender
+from src.model_reloader import ModelBundle, ModelReloader
+from src.feed_cache import FeedCache
+from src.batch_feed import compute_feeds
+from src.interaction_log import (
+    append_interaction_log, read_interaction_log, replayable_interactions, validate_interactions
+)
 
 # Add src directory to the Python path (if needed)
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
@@ -11,20 +26,135 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 # Initialize Flask app
 app = Flask(__name__)
 
-# Load preprocessed data paths
-CONTENT_DATA_PATH = "data/processed/all_posts_with_features.csv"
-INTERACTION_DATA_PATH = "data/processed/interaction_df.csv"
+# Load preprocessed data paths (PROCESSED_FORMAT: csv, parquet or feather)
+PROCESSED_FORMAT = os.environ.get("PROCESSED_FORMAT", "csv")
+CONTENT_DATA_PATH = f"data/processed/all_posts_with_features.{PROCESSED_FORMAT}"
+INTERACTION_DATA_PATH = f"data/processed/interaction_df.{PROCESSED_FORMAT}"
+
+# Interactions ingested through the API; not watched for reloads, folded into INTERACTION_DATA_PATH
+# offline with `python -m src.interaction_log`
+INTERACTION_LOG_PATH = "data/processed/interaction_log.csv"
+
+# Saved model artifacts (rebuilt automatically when missing or stale)
+CONTENT_ARTIFACTS_DIR = "data/artifacts/content"
+COLLABORATIVE_ARTIFACTS_DIR = "data/artifacts/collaborative"
+FACTORIZATION_ARTIFACTS_DIR = "data/artifacts/factorization"
+
+# Seconds between checks of the preprocessed data for changes
+MODEL_RELOAD_INTERVAL = float(os.environ.get("MODEL_RELOAD_INTERVAL", 60))
+
+# Latency budget of each component model in /feed, in seconds; slower models are left out of the ranking
+HYBRID_MODEL_TIMEOUT = float(os.environ.get("HYBRID_MODEL_TIMEOUT", 0.5))
+
+# Weight of the implicit-ALS factorization model in the hybrid ranking (0 leaves it out)
+HYBRID_WEIGHT_FACTORIZATION = float(os.environ.get("HYBRID_WEIGHT_FACTORIZATION", 0.5))
+
+# Size of the candidate set the staged pipeline ranks for filtered feeds
+PIPELINE_MAX_CANDIDATES = int(os.environ.get("PIPELINE_MAX_CANDIDATES", 500))
+
 
-# Initialize recommendation systems
-content_recommender = ContentBasedRecommender(CONTENT_DATA_PATH)
-collaborative_recommender = CollaborativeRecommender(INTERACTION_DATA_PATH)
+def load_models():
+    """
+    Loads (or rebuilds) the recommendation models and wraps them in a versioned bundle.
 
-# Initialize the Hybrid Recommender
-hybrid_recommender = HybridRecommender(
-    content_model=content_recommender,
-    collaborative_model=collaborative_recommender
+    Events in the interaction log (ingested since the last compaction) are replayed on top
+    of the models built from the processed interactions.
+    """
+    content_recommender = ContentBasedRecommender.load_or_build(CONTENT_DATA_PATH, CONTENT_ARTIFACTS_DIR)
+    collaborative_recommender = CollaborativeRecommender.load_or_build(INTERACTION_DATA_PATH, COLLABORATIVE_ARTIFACTS_DIR)
+    interactions_df = load_dataset(INTERACTION_DATA_PATH, columns=INTERACTION_COLUMNS)
+    logged_df = replayable_interactions(read_interaction_log(INTERACTION_LOG_PATH))
+    if len(logged_df):
+        try:
+            collaborative_recommender.apply_interactions(logged_df)
+            interactions_df = pd.concat([interactions_df, logged_df], ignore_index=True)
+        except Exception as e:
+            # A log that cannot be replayed must not keep the app from starting
+            print(f"Skipped replaying {len(logged_df)} logged interactions: {e}")
+            collaborative_recommender = CollaborativeRecommender.load_or_build(INTERACTION_DATA_PATH, COLLABORATIVE_ARTIFACTS_DIR)
+    user_profiles = UserProfiles(content_recommender).build(interactions_df)
+    popularity_recommender = PopularityRecommender(
+        content_recommender.posts_df, interactions_df, post_index=content_recommender.post_index
+    )
+
+    # Initialize the Hybrid Recommender
+    hybrid_recommender = HybridRecommender(
+        content_model=content_recommender,
+        collaborative_model=collaborative_recommender,
+        timeout=HYBRID_MODEL_TIMEOUT,
+        user_profiles=user_profiles
+    )
+    if HYBRID_WEIGHT_FACTORIZATION > 0:
+        factorization_recommender = ImplicitALSRecommender.load_or_build(INTERACTION_DATA_PATH, FACTORIZATION_ARTIFACTS_DIR)
+        hybrid_recommender.add_model("factorization", factorization_recommender, HYBRID_WEIGHT_FACTORIZATION)
+
+    version = f"{content_recommender.source_hash[:8]}-{collaborative_recommender.source_hash[:8]}"
+    return ModelBundle(
+        version,
+        content=content_recommender,
+        collaborative=collaborative_recommender,
+        hybrid=hybrid_recommender,
+        popularity=popularity_recommender,
+        pipeline=RecommendationPipeline(
+            hybrid_recommender, max_candidates=PIPELINE_MAX_CANDIDATES, popularity=popularity_recommender
+        )
+    )
+
+
+# Number of ranked candidates cached per user; category and mood filters run against this list
+FEED_CANDIDATES = 100
+FEED_SIZE = 10
+
+# Per-user cache of ranked candidates, keyed by (user_id, model version)
+feed_cache = FeedCache(
+    max_entries=int(os.environ.get("FEED_CACHE_MAX_ENTRIES", 10000)),
+    max_bytes=int(os.environ.get("FEED_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    ttl=float(os.environ.get("FEED_CACHE_TTL", 300))
 )
 
+
+def filter_feed(content_recommender, post_ids, scores, category_id=None, mood=None):
+    """
+    Applies the category and mood filters to a ranked candidate list.
+
+    Returns:
+        pd.DataFrame: Columns category_id, post_id and weighted_score, in ranked order.
+    """
+    positions = content_recommender.positions_of(post_ids)
+    known = positions >= 0
+
+    mask = content_recommender.filter_mask(category_id=category_id, mood=mood)
+    if mask is not None:
+        keep = known.copy()
+        keep[known] = mask[positions[known]]
+        post_ids, scores, positions, known = post_ids[keep], scores[keep], positions[keep], known[keep]
+
+    category_ids = np.full(len(post_ids), -1, dtype=np.int64)
+    if len(post_ids):
+        category_ids[known] = content_recommender.posts_df['category_id'].values[positions[known]]
+
+    return pd.DataFrame({"category_id": category_ids, "post_id": post_ids, "weighted_score": scores})
+
+
+def prune_artifacts(bundle):
+    """
+    Deletes the artifact versions that were replaced, once the bundle built from the current ones is served.
+    """
+    for directory in (CONTENT_ARTIFACTS_DIR, COLLABORATIVE_ARTIFACTS_DIR, FACTORIZATION_ARTIFACTS_DIR):
+        removed = prune_versions(directory)
+        if removed:
+            print(f"Deleted {removed} old artifact versions from {directory}")
+
+
+# Initialize recommendation systems; new data is picked up in the background without a restart
+model_reloader = ModelReloader(
+    load_models,
+    watch_paths=[CONTENT_DATA_PATH, INTERACTION_DATA_PATH],
+    interval=MODEL_RELOAD_INTERVAL,
+    after_swap=prune_artifacts
+)
+model_reloader.start()
+
 @app.route('/feed', methods=['GET'])
 def get_recommendations():
     username = request.args.get('username')
@@ -34,6 +164,11 @@ def get_recommendations():
     if not username:
         return jsonify({"error": "Missing required parameter: username"}), 400
 
+    # Serve the whole request from one model bundle, even if a reload swaps it meanwhile
+    models = model_reloader.current()
+    collaborative_recommender = models.collaborative
+    hybrid_recommender = models.hybrid
+
     try:
         # Convert username to integer (if possible)
         try:
@@ -48,30 +183,41 @@ def get_recommendations():
             print("Error: User-Post Interaction Matrix is empty.")
             return jsonify({"error": "User-Post Interaction Matrix is not loaded properly"}), 500
 
-        if username not in collaborative_recommender.user_post_matrix.index:
-            print(f"Error: Username {username} not found in the interaction matrix.")
-            return jsonify({"error": f"No data found for user {username}"}), 404
+        # Users without interactions get the most popular posts matching the filters
+        if username not in collaborative_recommender.user_post_matrix.index and \
+                username not in hybrid_recommender.user_profiles.user_index:
+            ranked = models.popularity.top(FEED_SIZE, category_id=category_id, mood=mood)
+            recommendations = filter_feed(models.content, *ranked)
+            if recommendations.empty:
+                return jsonify({"error": "No recommendations available"}), 404
+            return jsonify({
+                "recommendations": recommendations.to_dict(orient="records"),
+                "model_version": models.version,
+                "cold_start": True
+            })
 
-        # Generate recommendations based on filters (category_id, mood)
-        recommendations = hybrid_recommender.recommend_hybrid(username, top_n=10)
-        print(f"Recommendations DataFrame columns: {recommendations.columns}")
+        # Rank candidates once per (user, model version); repeated refreshes are served from the cache
+        cached = feed_cache.get(username, models.version)
+        report = {"timed_out": []}
+        if cached is None:
+            # Taken before ranking, so the feed is not cached if an ingest invalidates the user meanwhile
+            generation = feed_cache.generation(username)
+            cached = tuple(hybrid_recommender.rank_hybrid(username, top_n=FEED_CANDIDATES, report=report))
+            # Degraded rankings (a model missed its deadline) are served but not cached
+            if not report["timed_out"]:
+                feed_cache.put(username, models.version, *cached, generation=generation)
 
-        # Check if 'category_id' is in the recommendations DataFrame
-        if 'category_id' not in recommendations.columns:
-            # Assign a default category_id if it's missing
-            print("Warning: 'category_id' column not found. Assigning default category_id.")
-            recommendations['category_id'] = 1  # You can adjust the default category as needed
+        # Filter the cached candidates by category_id and mood
+        recommendations = filter_feed(models.content, *cached, category_id=category_id, mood=mood).head(FEED_SIZE)
 
-        # Filter by category_id if provided
-        if category_id is not None:
-            recommendations = recommendations[recommendations['category_id'] == category_id]
-
-        # Check if 'mood_tags' exists in the recommendations
-        if mood:
-            if 'mood_tags' in recommendations.columns:
-                recommendations = recommendations[recommendations['mood_tags'].str.contains(mood, na=False, case=False)]
-            else:
-                print(f"Warning: 'mood_tags' column not found in recommendations. Skipping mood filter.")
+        # Too few cached candidates pass the filters: retrieve filtered candidates through the staged pipeline
+        pipeline_stats = None
+        if (category_id is not None or mood) and len(recommendations) < FEED_SIZE:
+            pipeline_stats = {}
+            ranked = models.pipeline.recommend(
+                username, top_n=FEED_SIZE, category_id=category_id, mood=mood, stats=pipeline_stats
+            )
+            recommendations = filter_feed(models.content, *ranked, category_id=category_id, mood=mood)
 
         # Check for empty recommendations
         if recommendations.empty:
@@ -80,12 +226,123 @@ def get_recommendations():
 
         # Convert recommendations to JSON
         response = recommendations.to_dict(orient="records")
-        return jsonify({"recommendations": response})
+        return jsonify({
+            "recommendations": response,
+            "model_version": models.version,
+            "timed_out_models": report["timed_out"],
+            "pipeline": pipeline_stats
+        })
 
     except Exception as e:
         print(f"Error encountered: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/feed/batch', methods=['POST'])
+def get_batch_recommendations():
+    """
+    Computes the feeds of many users with batched scoring and warms the feed cache with them.
+
+    Expects a JSON body {"usernames": [1, 2, ...], "top_n": 10}.
+    """
+    payload = request.get_json(silent=True) or {}
+    usernames = payload.get("usernames")
+    top_n = payload.get("top_n", FEED_SIZE)
+
+    if not isinstance(usernames, list) or not usernames:
+        return jsonify({"error": "Expected a non-empty 'usernames' list"}), 400
+    try:
+        usernames = [int(username) for username in usernames]
+        top_n = int(top_n)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Usernames and top_n must be integers."}), 400
+
+    models = model_reloader.current()
+    try:
+        start = time.perf_counter()
+        generations = {username: feed_cache.generation(username) for username in usernames}
+        user_ids, post_ids, scores, _ = compute_feeds(models.hybrid, usernames, top_n=max(top_n, FEED_CANDIDATES))
+
+        feeds = {}
+        for user_id, user_post_ids, user_scores in zip(user_ids.tolist(), post_ids, scores):
+            ranked = user_post_ids >= 0
+            user_post_ids = user_post_ids[ranked].astype(np.int64)
+            user_scores = user_scores[ranked].astype(np.float64)
+            feed_cache.put(user_id, models.version, user_post_ids, user_scores, generation=generations.get(user_id, 0))
+            feeds[str(user_id)] = [
+                {"post_id": int(post_id), "weighted_score": float(score)}
+                for post_id, score in zip(user_post_ids[:top_n], user_scores[:top_n])
+            ]
+        elapsed = time.perf_counter() - start
+
+        return jsonify({
+            "feeds": feeds,
+            "users": len(feeds),
+            "elapsed_seconds": elapsed,
+            "users_per_second": len(feeds) / elapsed if elapsed > 0 else None,
+            "model_version": models.version
+        })
+
+    except Exception as e:
+        print(f"Error encountered: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/interactions', methods=['POST'])
+def ingest_interactions():
+    """
+    Appends new interaction events to the interaction log and invalidates the cached feeds of their users.
+
+    Expects a JSON body {"interactions": [{"user_id": ..., "post_id": ..., "interaction_type": ..., ...}]}.
+    The users' content profiles, the collaborative model and the popularity tables are updated right away;
+    the other models pick the events up once the log is compacted into the interactions data.
+    """
+    payload = request.get_json(silent=True) or {}
+    events = payload.get("interactions")
+    if not isinstance(events, list) or not events:
+        return jsonify({"error": "Expected a non-empty 'interactions' list"}), 400
+
+    # Nothing is persisted or applied unless the whole batch is valid
+    try:
+        events_df = validate_interactions(events)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    models = model_reloader.current()
+    try:
+        models.hybrid.user_profiles.update(events_df)
+        models.collaborative.apply_interactions(events_df)
+        # Posts first seen in these events join the id space the hybrid fuses over
+        models.hybrid.refresh_post_ids()
+        models.popularity.update(events_df)
+    except Exception as e:
+        # Events the models cannot apply are not logged, so a reload never replays them
+        print(f"Error encountered: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    append_interaction_log(INTERACTION_LOG_PATH, events_df)
+
+    invalidated = sum(feed_cache.invalidate_user(int(user_id)) for user_id in events_df['user_id'].unique())
+    return jsonify({"ingested": len(events_df), "invalidated_feeds": invalidated}), 202
+
+
+@app.route('/feed/cache', methods=['GET'])
+def get_feed_cache_stats():
+    return jsonify(feed_cache.stats())
+
+
+@app.route('/models/status', methods=['GET'])
+def get_model_status():
+    status = model_reloader.status()
+    status["model_timeouts"] = dict(model_reloader.current().hybrid.timeout_counts)
+    return jsonify(status)
+
+
+@app.route('/models/reload', methods=['POST'])
+def reload_models():
+    # The reload runs in the background; /feed keeps serving the current bundle until the swap
+    model_reloader.reload_async()
+    return jsonify({"status": "reload started", "version": model_reloader.current().version}), 202
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
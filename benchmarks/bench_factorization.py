@@ -0,0 +1,68 @@
+"""
+Build time, serving latency and hold-out recall of the implicit-ALS model against item-item CF.
+
+A random 10% of the interactions is held out; both models are trained on the rest
+and asked for the top 20 posts of every held-out user. The bundled interactions can be
+enlarged `--factor` times with shifted user and post ids.
+
+Run from the repository root:
+    python -m benchmarks.bench_factorization
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from src.recommendation_engine.collaborative import CollaborativeRecommender
+from src.recommendation_engine.factorization import ImplicitALSRecommender
+
+INTERACTIONS_PATH = "data/processed/interaction_df.csv"
+
+
+def recall(model, held_out, top_n):
+    truth = held_out.groupby('user_id')['post_id'].apply(set)
+    found = model.recommend_many(truth.index, top_n=top_n).groupby('user_id')['post_id'].apply(set)
+    hits = sum(len(posts & found.get(user_id, set())) for user_id, posts in truth.items())
+    return hits / sum(len(posts) for posts in truth)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--factor", type=int, default=1, help="How many times the bundled interactions are repeated.")
+    parser.add_argument("--top-n", type=int, default=20, help="Posts recommended per held-out user.")
+    args = parser.parse_args()
+
+    interactions = pd.read_csv(INTERACTIONS_PATH)
+    max_user, max_post = int(interactions['user_id'].max()), int(interactions['post_id'].max())
+    interactions = pd.concat(
+        [interactions.assign(user_id=interactions['user_id'] + copy * max_user, post_id=interactions['post_id'] + copy * max_post)
+         for copy in range(args.factor)],
+        ignore_index=True
+    )
+    held_out = np.random.default_rng(0).random(len(interactions)) < 0.1
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "interaction_df.csv")
+        interactions[~held_out].to_csv(path, index=False)
+        print(f"{len(interactions)} interactions, {interactions['user_id'].nunique()} users, {interactions['post_id'].nunique()} posts")
+        print(f"{'model':>14} {'build s':>8} {'rank ms':>8} {'recall':>7}")
+        for name, build in (("item-item", CollaborativeRecommender), ("implicit-ALS", ImplicitALSRecommender)):
+            start = time.perf_counter()
+            model = build(path)
+            build_seconds = time.perf_counter() - start
+
+            users = model.user_ids[:200]
+            start = time.perf_counter()
+            for user_id in users:
+                model.rank(user_id, top_n=args.top_n)
+            rank_ms = (time.perf_counter() - start) / len(users) * 1000
+            print(f"{name:>14} {build_seconds:>8.2f} {rank_ms:>8.3f} {recall(model, interactions[held_out], args.top_n):>7.3f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Latency benchmark of the NumPy score fusion against the previous pandas concat/groupby path.
+
+Both paths fuse the same pair of ranked lists (one per model); the lists are sampled
+from the real post ids and, optionally, from a synthetic enlarged id space.
+
+Run from the repository root:
+    python -m benchmarks.bench_fusion
+"""
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from src.recommendation_engine.fusion import RankedList, fuse_ranked_lists
+
+POSTS_PATH = "data/processed/all_posts_with_features.csv"
+
+
+def fuse_dataframes(content_df, collaborative_df, weight_content, weight_collaborative, top_n):
+    """
+    The pandas fusion previously used by HybridRecommender.recommend_hybrid (without logging).
+    """
+    content_df = content_df.copy()
+    collaborative_df = collaborative_df.copy()
+    content_df["weight"] = weight_content
+    content_df["weighted_score"] = content_df["score"] * content_df["weight"]
+    collaborative_df["weight"] = weight_collaborative
+    collaborative_df["weighted_score"] = collaborative_df["score"] * collaborative_df["weight"]
+
+    combined_df = pd.concat([content_df.dropna(axis=1, how='all'), collaborative_df.dropna(axis=1, how='all')], ignore_index=True)
+    return (
+        combined_df.groupby("post_id", as_index=False)["weighted_score"]
+        .sum()
+        .sort_values(by="weighted_score", ascending=False)
+        .head(top_n)
+    )
+
+
+def sample_ranked_list(id_space, size, rng):
+    post_ids = rng.choice(id_space, size=size, replace=False)
+    scores = np.sort(rng.random(size))[::-1]
+    return RankedList(post_ids, scores)
+
+
+def time_per_call(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Posts per model ranking.")
+    parser.add_argument("--catalog", type=int, default=100000, help="Size of the synthetic id space.")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    real_ids = np.sort(pd.read_csv(POSTS_PATH, usecols=["id"])["id"].unique())
+    synthetic_ids = np.arange(args.catalog, dtype=np.int64)
+
+    print(f"{'catalog':>8} {'list size':>9} {'pandas ms':>10} {'numpy ms':>9} {'speed-up':>9}")
+    for id_space in (real_ids, synthetic_ids):
+        for size in args.sizes:
+            if size > id_space.size:
+                continue
+            content = sample_ranked_list(id_space, size, rng)
+            collaborative = sample_ranked_list(id_space, size, rng)
+            content_df, collaborative_df = content.to_frame(), collaborative.to_frame()
+
+            legacy = fuse_dataframes(content_df, collaborative_df, 0.3, 0.7, size)
+            fused = fuse_ranked_lists([(content, 0.3), (collaborative, 0.7)], id_space, top_n=size)
+            assert np.allclose(legacy["weighted_score"].values, fused.scores)
+
+            pandas_time = time_per_call(lambda: fuse_dataframes(content_df, collaborative_df, 0.3, 0.7, size), args.repeats)
+            numpy_time = time_per_call(
+                lambda: fuse_ranked_lists([(content, 0.3), (collaborative, 0.7)], id_space, top_n=size), args.repeats
+            )
+            print(f"{id_space.size:>8} {size:>9} {pandas_time * 1000:>10.3f} {numpy_time * 1000:>9.3f} {pandas_time / numpy_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Recall-vs-latency benchmark of the approximate (IVF) neighbour index against the exact backend.
+
+Uses the post features of data/processed/all_posts_with_features.csv and synthetic
+enlargements of it (perturbed copies of the real posts).
+
+Run from the repository root:
+    python -m benchmarks.bench_neighbors
+"""
+import time
+import argparse
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+from src.recommendation_engine.content_based import ContentBasedRecommender
+from src.recommendation_engine.neighbors import build_neighbor_index
+
+POSTS_PATH = "data/processed/all_posts_with_features.csv"
+
+
+def enlarge(features, factor, rng):
+    """
+    Builds a synthetic catalog `factor` times larger than `features`.
+
+    Every synthetic post is a real post with ~20% of its non-zero features dropped
+    and two random features added.
+    """
+    if factor <= 1:
+        return features
+    n_rows, n_cols = features.shape
+    n_new = n_rows * (factor - 1)
+
+    copies = features[rng.integers(0, n_rows, n_new)].tocsr()
+    copies.data *= rng.random(copies.data.size) > 0.2
+    noise = sp.csr_matrix(
+        (rng.random(n_new * 2).astype(np.float32) * 0.3,
+         (np.repeat(np.arange(n_new), 2), rng.integers(0, n_cols, n_new * 2))),
+        shape=(n_new, n_cols)
+    )
+    enlarged = sp.vstack([features, copies + noise]).tocsr()
+    enlarged.eliminate_zeros()
+    return normalize(enlarged.astype(np.float32))
+
+
+def run(vectors, backend, params, queries, k, exact_results=None):
+    start = time.perf_counter()
+    index = build_neighbor_index(backend, vectors, **params)
+    build_time = time.perf_counter() - start
+
+    results = []
+    start = time.perf_counter()
+    for row in queries:
+        indices, _ = index.query(vectors[row], k)
+        results.append(indices)
+    latency = (time.perf_counter() - start) / len(queries)
+
+    recall = 1.0
+    if exact_results is not None:
+        recall = np.mean([len(np.intersect1d(a, b)) / max(len(b), 1) for a, b in zip(results, exact_results)])
+    return results, build_time, latency, recall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 10, 50], help="Catalog enlargement factors.")
+    parser.add_argument("--queries", type=int, default=200, help="Number of random queries per configuration.")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query.")
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 4, 8, 16], help="IVF lists probed per query.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = ContentBasedRecommender(POSTS_PATH).combined_features
+
+    print(f"{'posts':>8} {'backend':>12} {'build s':>9} {'query ms':>9} {'recall@k':>9}")
+    for factor in args.factors:
+        vectors = enlarge(base, factor, rng)
+        queries = rng.integers(0, vectors.shape[0], args.queries)
+
+        exact, build_time, latency, _ = run(vectors, 'exact', {}, queries, args.k)
+        print(f"{vectors.shape[0]:>8} {'exact':>12} {build_time:>9.3f} {latency * 1000:>9.3f} {1.0:>9.3f}")
+
+        for n_probe in args.n_probe:
+            _, build_time, latency, recall = run(vectors, 'ivf', {"n_probe": n_probe}, queries, args.k, exact)
+            label = f"ivf/p{n_probe}"
+            print(f"{vectors.shape[0]:>8} {label:>12} {build_time:>9.3f} {latency * 1000:>9.3f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
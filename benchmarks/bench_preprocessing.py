@@ -0,0 +1,65 @@
+"""
+Startup benchmark of title preprocessing, in posts/sec.
+
+"before" rebuilds the NLTK tokenizer, lemmatizer and stop-word set for every
+title (the original per-title implementation); "after" uses the cached
+resources and lemma memo, serially and across a process pool.
+
+Run from the repository root:
+    python -m benchmarks.bench_preprocessing
+"""
+import os
+import time
+import string
+import argparse
+import pandas as pd
+from nltk.corpus import stopwords
+from nltk.tokenize import TreebankWordTokenizer
+from nltk.stem import WordNetLemmatizer
+from src.recommendation_engine import content_based
+from src.recommendation_engine.content_based import preprocess_titles
+
+POSTS_PATH = "data/processed/all_posts_with_features.csv"
+
+
+def preprocess_title_uncached(text):
+    if not isinstance(text, str):
+        text = str(text) if text is not None else ""
+    text = text.lower().translate(str.maketrans('', '', string.punctuation))
+    tokenizer = TreebankWordTokenizer()
+    lemmatizer = WordNetLemmatizer()
+    stop_words = set(stopwords.words('english'))
+    tokens = [word for word in tokenizer.tokenize(text) if word not in stop_words]
+    return ' '.join(lemmatizer.lemmatize(token) for token in tokens)
+
+
+def timed(label, function, titles):
+    start = time.perf_counter()
+    result = function(titles)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>24} {len(titles):>9} {elapsed:>9.3f} {len(titles) / elapsed:>12.0f}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--factor", type=int, default=20, help="How many times the bundled titles are repeated.")
+    parser.add_argument("--n-jobs", type=int, default=os.cpu_count(), help="Worker processes for the pooled run.")
+    args = parser.parse_args()
+
+    titles = pd.read_csv(POSTS_PATH)['title'].tolist() * args.factor
+
+    print(f"{'variant':>24} {'posts':>9} {'seconds':>9} {'posts/sec':>12}")
+    before = timed("before (uncached)", lambda t: [preprocess_title_uncached(x) for x in t], titles)
+
+    # Start the cached run cold, as a fresh process would
+    content_based._text_resources.cache_clear()
+    content_based._lemmatize.cache_clear()
+    after = timed("after (cached)", preprocess_titles, titles)
+    pooled = timed(f"after ({args.n_jobs} processes)", lambda t: preprocess_titles(t, n_jobs=args.n_jobs), titles)
+
+    assert before == after == pooled
+
+
+if __name__ == "__main__":
+    main()
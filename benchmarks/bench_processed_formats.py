@@ -0,0 +1,82 @@
+"""
+Load time and memory of the processed datasets as CSV, Parquet and Feather.
+
+The bundled interactions are enlarged `--factor` times (with shifted user ids) and
+written in every format next to the posts. Every load runs in a fresh process, which
+reports the load time, its RSS growth and the deep memory usage of the frame.
+"csv (all columns)" is the previous loading path (pd.read_csv of every column); the
+other rows read only the columns the recommenders use, through `load_dataset`.
+
+Run from the repository root:
+    python -m benchmarks.bench_processed_formats
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+import pandas as pd
+import psutil
+from src.recommendation_engine.datasets import CONTENT_COLUMNS, INTERACTION_COLUMNS, load_dataset, save_dataset
+
+POSTS_PATH = "data/processed/all_posts_with_features.csv"
+INTERACTIONS_PATH = "data/processed/interaction_df.csv"
+
+
+def measure_load(path, columns, queue):
+    # Library import cost is paid once per process, so it is left out of the RSS growth
+    import pyarrow.parquet  # noqa: F401
+    process = psutil.Process()
+    rss = process.memory_info().rss
+    start = time.perf_counter()
+    df = pd.read_csv(path) if columns is None else load_dataset(path, columns=columns)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, process.memory_info().rss - rss, df.memory_usage(deep=True).sum(), len(df)))
+
+
+def run_in_fresh_process(path, columns):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=measure_load, args=(path, columns, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--factor", type=int, default=50, help="How many times the bundled interactions are repeated.")
+    args = parser.parse_args()
+
+    interactions = pd.read_csv(INTERACTIONS_PATH)
+    max_user = int(interactions['user_id'].max())
+    interactions = pd.concat(
+        [interactions.assign(user_id=interactions['user_id'] + copy * max_user) for copy in range(args.factor)],
+        ignore_index=True
+    )
+    posts = pd.read_csv(POSTS_PATH)
+
+    directory = tempfile.mkdtemp()
+    try:
+        print(f"{'dataset':>13} {'variant':>18} {'rows':>9} {'disk MB':>8} {'seconds':>8} {'RSS MB':>7} {'frame MB':>9}")
+        for name, df, columns in (("posts", posts, CONTENT_COLUMNS), ("interactions", interactions, INTERACTION_COLUMNS)):
+            for variant, file_format, selected in (
+                ("csv (all columns)", "csv", None),
+                ("csv", "csv", columns),
+                ("parquet", "parquet", columns),
+                ("feather", "feather", columns),
+            ):
+                path = os.path.join(directory, f"{name}.{file_format}")
+                if not os.path.exists(path):
+                    save_dataset(df, path)
+                seconds, rss, frame, rows = run_in_fresh_process(path, selected)
+                size = os.path.getsize(path) / 2 ** 20
+                print(f"{name:>13} {variant:>18} {rows:>9} {size:>8.1f} {seconds:>8.3f} {rss / 2 ** 20:>7.1f} {frame / 2 ** 20:>9.1f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
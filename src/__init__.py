@@ -1,4 +1,6 @@
 from .data_fetcher import *
 from .preprocessing import *
 from .utils import *
-from .recommendation_engine import *
\ No newline at end of file
+from .recommendation_engine import *
+from .model_reloader import *
+from .feed_cache import *
\ No newline at end of file
@@ -0,0 +1,97 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from .recommendation_engine.content_based import ContentBasedRecommender
+from .recommendation_engine.collaborative import CollaborativeRecommender
+from .recommendation_engine.datasets import INTERACTION_COLUMNS, load_dataset
+from .recommendation_engine.factorization import ImplicitALSRecommender
+from .recommendation_engine.hybrid import HybridRecommender
+from .recommendation_engine.user_profiles import UserProfiles
+
+# Default paths, relative to the repository root (PROCESSED_FORMAT: csv, parquet or feather)
+PROCESSED_FORMAT = os.environ.get("PROCESSED_FORMAT", "csv")
+CONTENT_DATA_PATH = f"data/processed/all_posts_with_features.{PROCESSED_FORMAT}"
+INTERACTION_DATA_PATH = f"data/processed/interaction_df.{PROCESSED_FORMAT}"
+CONTENT_ARTIFACTS_DIR = "data/artifacts/content"
+COLLABORATIVE_ARTIFACTS_DIR = "data/artifacts/collaborative"
+FACTORIZATION_ARTIFACTS_DIR = "data/artifacts/factorization"
+OUTPUT_PATH = "data/feeds/feeds.npz"
+
+
+def compute_feeds(hybrid_recommender, user_ids, top_n=10, batch_size=512):
+    """
+    Computes the top-N hybrid feed of every user with batched matrix scoring.
+
+    Args:
+        hybrid_recommender (HybridRecommender): Model used to rank posts.
+        user_ids (iterable): Users to compute feeds for (duplicates are dropped).
+        top_n (int): Posts per feed.
+        batch_size (int): Users scored per batch.
+
+    Returns:
+        tuple: (user_ids, post_ids, scores, stats) where post_ids and scores have shape
+        (users, top_n), padded with -1 and 0 for users with shorter feeds, and stats
+        holds the elapsed time and throughput.
+    """
+    user_ids = pd.unique(np.asarray(list(user_ids), dtype=np.int64))
+
+    start = time.perf_counter()
+    recommendations = hybrid_recommender.recommend_hybrid_many(user_ids, top_n=top_n, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    post_ids = np.full((user_ids.size, top_n), -1, dtype=np.int32)
+    scores = np.zeros((user_ids.size, top_n), dtype=np.float32)
+    if not recommendations.empty:
+        # recommend_hybrid_many ranks per user, so the rank is the position inside each user's group
+        rows = pd.Index(user_ids).get_indexer(recommendations['user_id'].to_numpy())
+        ranks = recommendations.groupby('user_id').cumcount().to_numpy()
+        post_ids[rows, ranks] = recommendations['post_id'].to_numpy()
+        scores[rows, ranks] = recommendations['weighted_score'].to_numpy()
+
+    stats = {
+        "users": int(user_ids.size),
+        "elapsed_seconds": elapsed,
+        "users_per_second": user_ids.size / elapsed if elapsed > 0 else float("inf"),
+    }
+    return user_ids, post_ids, scores, stats
+
+
+def save_feeds(path, user_ids, post_ids, scores):
+    """
+    Writes feeds to a compressed .npz file with user_ids, post_ids and scores arrays.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(path, user_ids=user_ids, post_ids=post_ids, scores=scores)
+    print(f"Feeds saved to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the top-N feed of every user into a compact .npz file.")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="Output .npz file.")
+    parser.add_argument("--top-n", type=int, default=10, help="Posts per feed.")
+    parser.add_argument("--batch-size", type=int, default=512, help="Users scored per batch.")
+    parser.add_argument("--factorization-weight", type=float, default=0.5,
+                        help="Weight of the implicit-ALS model in the feeds (0 leaves it out).")
+    parser.add_argument("--users", type=int, nargs="*", help="User ids (default: every user with interactions).")
+    args = parser.parse_args()
+
+    content_recommender = ContentBasedRecommender.load_or_build(CONTENT_DATA_PATH, CONTENT_ARTIFACTS_DIR)
+    collaborative_recommender = CollaborativeRecommender.load_or_build(INTERACTION_DATA_PATH, COLLABORATIVE_ARTIFACTS_DIR)
+    user_profiles = UserProfiles(content_recommender).build(load_dataset(INTERACTION_DATA_PATH, columns=INTERACTION_COLUMNS))
+    hybrid_recommender = HybridRecommender(content_recommender, collaborative_recommender, user_profiles=user_profiles)
+    if args.factorization_weight > 0:
+        factorization_recommender = ImplicitALSRecommender.load_or_build(INTERACTION_DATA_PATH, FACTORIZATION_ARTIFACTS_DIR)
+        hybrid_recommender.add_model("factorization", factorization_recommender, args.factorization_weight)
+
+    user_ids = args.users if args.users else collaborative_recommender.user_ids
+    user_ids, post_ids, scores, stats = compute_feeds(
+        hybrid_recommender, user_ids, top_n=args.top_n, batch_size=args.batch_size
+    )
+    save_feeds(args.output, user_ids, post_ids, scores)
+    print(f"Computed {stats['users']} feeds in {stats['elapsed_seconds']:.3f}s ({stats['users_per_second']:.0f} users/sec)")
+
+
+if __name__ == "__main__":
+    main()
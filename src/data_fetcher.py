@@ -1,6 +1,12 @@
 import os
 import json
+import time
+import argparse
+import shutil
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -10,109 +16,627 @@ load_dotenv()
 BASE_URL = "https://api.socialverseapp.com"
 FLIC_TOKEN = os.environ.get("FLIC_TOKEN")
 DATA_DIR = "data"
+PAGE_SIZE = 1000
 
-def fetch_paginated_data(endpoint, requires_auth=False, key="posts", extra_params=""):
+# Concurrency and retry settings
+MAX_ENDPOINT_WORKERS = 6    # Endpoints fetched in parallel
+PAGE_CONCURRENCY = 4        # Maximum pages of one endpoint in flight
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 0.5
+REQUEST_TIMEOUT = 60
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Completed pages of interrupted syncs, one directory per output file
+CHECKPOINT_DIR = ".partial"
+
+# High-water mark and record count of every saved file, for incremental syncs
+SYNC_STATE_FILE = ".sync_state.json"
+
+RESONANCE_PARAMS = "resonance_algorithm=resonance_algorithm_cjsvervb7dbhss8bdrj89s44jfjdbsjd0xnjkbvuire8zcjwerui3njfbvsujc5if"
+
+# Output file of every endpoint; .ndjson files are written page by page, one record per line
+API_ENDPOINTS = {
+    "viewed_posts.ndjson": {
+        "endpoint": "/posts/view",
+        "requires_auth": False,
+        "key": "posts",
+        "extra_params": RESONANCE_PARAMS
+    },
+    "liked_posts.ndjson": {
+        "endpoint": "/posts/like",
+        "requires_auth": False,
+        "key": "posts",
+        "extra_params": RESONANCE_PARAMS
+    },
+    "inspired_posts.ndjson": {
+        "endpoint": "/posts/inspire",
+        "requires_auth": False,
+        "key": "posts",
+        "extra_params": RESONANCE_PARAMS
+    },
+    "rated_posts.ndjson": {
+        "endpoint": "/posts/rating",
+        "requires_auth": False,
+        "key": "posts",
+        "extra_params": RESONANCE_PARAMS
+    },
+    "all_posts.ndjson": {
+        "endpoint": "/posts/summary/get",
+        "requires_auth": True,
+        "key": "posts",
+        "extra_params": ""
+    },
+    "all_users.ndjson": {
+        "endpoint": "/users/get_all",
+        "requires_auth": True,
+        "key": "users",
+        "extra_params": ""
+    }
+}
+
+
+class RetryableError(Exception):
+    """
+    Raised when a page request failed in a way worth retrying (throttling, server error, connection error).
+    """
+
+
+class AdaptiveLimiter:
     """
-    Fetches paginated data from the given API endpoint.
-    
+    Additive-increase / multiplicative-decrease limit on the pages of one endpoint in flight.
+
+    Throttling responses halve the limit and successful pages raise it by one, up to `max_limit`.
+    """
+    def __init__(self, max_limit):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self._lock = threading.Lock()
+
+    def success(self):
+        with self._lock:
+            self.limit = min(self.max_limit, self.limit + 1)
+
+    def throttle(self):
+        with self._lock:
+            self.limit = max(1, self.limit // 2)
+
+
+def create_session(pool_size=MAX_ENDPOINT_WORKERS * PAGE_CONCURRENCY):
+    """
+    Creates a requests session whose connection pool is shared by every fetching thread.
+
+    Args:
+        pool_size (int): Maximum connections kept open per host.
+
+    Returns:
+        requests.Session: The session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_page(session, url, headers, key, limiter=None):
+    """
+    Fetches one page, retrying throttled and failed requests with exponential back-off.
+
+    The `Retry-After` header is honoured when present, and throttling shrinks the
+    endpoint's concurrency through the limiter.
+
+    Returns:
+        list: Items of the page (empty past the last page).
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+            if response.status_code in RETRY_STATUS_CODES:
+                raise RetryableError(f"HTTP {response.status_code} from {url}", response.headers.get("Retry-After"))
+            response.raise_for_status()
+            if limiter is not None:
+                limiter.success()
+            return response.json().get(key, [])
+        except (RetryableError, requests.ConnectionError, requests.Timeout) as e:
+            if attempt == MAX_RETRIES:
+                raise
+            if limiter is not None:
+                limiter.throttle()
+            retry_after = e.args[1] if isinstance(e, RetryableError) and len(e.args) > 1 else None
+            delay = float(retry_after) if retry_after else BACKOFF_SECONDS * 2 ** attempt
+            print(f"Retrying {url} in {delay:.1f}s ({e.args[0]})")
+            time.sleep(delay)
+
+
+def is_ndjson(filename):
+    """
+    Raw files ending in .ndjson hold one JSON record per line; other files hold one JSON array.
+    """
+    return filename.endswith(".ndjson")
+
+
+def iter_records(filepath):
+    """
+    Iterates over the records of a raw file, one line at a time for NDJSON files.
+
+    Yields:
+        dict: Records, in file order.
+    """
+    with open(filepath, "r") as f:
+        if not is_ndjson(filepath):
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_records(f, items):
+    """
+    Appends records to an open NDJSON file, one line each.
+
+    Returns:
+        int: Number of records written.
+    """
+    f.writelines(json.dumps(item) + "\n" for item in items)
+    return len(items)
+
+
+def _checkpoint_path(checkpoint_name):
+    return os.path.join(DATA_DIR, CHECKPOINT_DIR, checkpoint_name)
+
+
+def checkpoint_items_file(checkpoint_name):
+    """
+    Returns:
+        str: NDJSON file holding the items of the completed pages of a checkpoint.
+    """
+    return os.path.join(_checkpoint_path(checkpoint_name), "items.ndjson")
+
+
+def checkpoint_state(checkpoint_name, first_page=1):
+    """
+    Loads the state of an interrupted fetch.
+
+    The items file is truncated to the size recorded with the last completed page, so a
+    page written partially when the fetch was interrupted is dropped.
+
+    Args:
+        checkpoint_name (str): Checkpoint to load.
+        first_page (int): Page the fetch starts at; a checkpoint started elsewhere is discarded.
+
+    Returns:
+        dict: first_page, last_page (first_page - 1 if no page completed), and the size and
+            record count of the items file.
+    """
+    path = _checkpoint_path(checkpoint_name)
+    checkpoint_file = os.path.join(path, "checkpoint.json")
+    state = {"first_page": first_page, "last_page": first_page - 1, "size": 0, "count": 0}
+    if os.path.exists(checkpoint_file):
+        with open(checkpoint_file, "r") as f:
+            saved = json.load(f)
+        if saved.get("first_page", 1) == first_page:
+            state.update(saved)
+        else:
+            clear_checkpoint(checkpoint_name)
+
+    items_file = checkpoint_items_file(checkpoint_name)
+    if os.path.exists(items_file) and os.path.getsize(items_file) != state["size"]:
+        with open(items_file, "r+") as f:
+            f.truncate(state["size"])
+    return state
+
+
+def load_checkpoint(checkpoint_name, first_page=1):
+    """
+    Loads the pages completed by an interrupted fetch.
+
+    Returns:
+        tuple: (last_page, items) where last_page is the last contiguous page saved (first_page - 1 if none).
+    """
+    state = checkpoint_state(checkpoint_name, first_page)
+    if state["count"] == 0:
+        return state["last_page"], []
+    return state["last_page"], list(iter_records(checkpoint_items_file(checkpoint_name)))
+
+
+def save_checkpoint(checkpoint_name, page, items, first_page=1):
+    """
+    Appends a completed page to the checkpoint's items file and records it as the last completed page.
+
+    Args:
+        checkpoint_name (str): Checkpoint to save to.
+        page (int): Page just completed; pages must be saved in order.
+        items (list): Items of the page to keep.
+        first_page (int): Page the fetch started at.
+
+    Returns:
+        dict: The new checkpoint state.
+    """
+    path = _checkpoint_path(checkpoint_name)
+    os.makedirs(path, exist_ok=True)
+    checkpoint_file = os.path.join(path, "checkpoint.json")
+    state = {"first_page": first_page, "last_page": first_page - 1, "size": 0, "count": 0}
+    if os.path.exists(checkpoint_file):
+        with open(checkpoint_file, "r") as f:
+            state.update(json.load(f))
+
+    with open(checkpoint_items_file(checkpoint_name), "a") as f:
+        state["count"] += write_records(f, items)
+        state["size"] = f.tell()
+    state["last_page"] = page
+
+    # Write-then-rename so an interruption never leaves a half-written checkpoint
+    with open(checkpoint_file + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(checkpoint_file + ".tmp", checkpoint_file)
+    return state
+
+
+def clear_checkpoint(checkpoint_name):
+    shutil.rmtree(_checkpoint_path(checkpoint_name), ignore_errors=True)
+
+
+def iter_pages(endpoint, requires_auth=False, key="posts", extra_params="", session=None,
+               concurrency=PAGE_CONCURRENCY, base_url=None, start_page=1):
+    """
+    Fetches the pages of an endpoint concurrently and yields them in page order.
+
+    Up to `concurrency` pages are requested at once (fewer while the API is throttling);
+    pagination ends at the first empty page. Only the pages in flight or waiting for an
+    earlier page are held in memory.
+
     Args:
         endpoint (str): API endpoint (relative to the BASE_URL).
         requires_auth (bool): Whether authentication is required for the endpoint.
         key (str): Key to extract specific data from the API response.
         extra_params (str): Additional query parameters.
+        session (requests.Session): Session to reuse; a new one is created when omitted.
+        concurrency (int): Maximum pages in flight.
+        base_url (str): API root; defaults to BASE_URL.
+        start_page (int): First page to fetch.
 
-    Returns:
-        list: List of items retrieved from the API.
+    Yields:
+        tuple: (page, items) of every non-empty page.
     """
-    all_items = []
-    page = 1
+    base_url = base_url or BASE_URL
+    session = session or create_session(concurrency)
     headers = {"Flic-Token": FLIC_TOKEN} if requires_auth else {}
+    limiter = AdaptiveLimiter(concurrency)
 
-    while True:
-        url = f"{BASE_URL}{endpoint}?page={page}&page_size=1000"
-        if extra_params:
-            url += f"&{extra_params}"
+    def page_url(page):
+        url = f"{base_url}{endpoint}?page={page}&page_size={PAGE_SIZE}"
+        return f"{url}&{extra_params}" if extra_params else url
 
-        print(f"Fetching data from: {url}")
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
+    pages = {}
+    in_flight = {}
+    completed = start_page - 1
+    next_page = start_page
+    end_page = None  # First empty page
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fetch-page") as executor:
+        try:
+            while True:
+                while end_page is None and len(in_flight) < limiter.limit:
+                    url = page_url(next_page)
+                    print(f"Fetching data from: {url}")
+                    in_flight[executor.submit(fetch_page, session, url, headers, key, limiter)] = next_page
+                    next_page += 1
+                if not in_flight:
+                    break
 
-        items = data.get(key, [])
-        if not items:
-            break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = in_flight.pop(future)
+                    items = future.result()
+                    if not items:
+                        end_page = page if end_page is None else min(end_page, page)
+                    else:
+                        pages[page] = items
 
+                # Pages are yielded in order, as soon as they are contiguous
+                while completed + 1 in pages and (end_page is None or completed + 1 < end_page):
+                    completed += 1
+                    yield completed, pages.pop(completed)
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+def fetch_paginated_data(endpoint, requires_auth=False, key="posts", extra_params="", session=None,
+                         concurrency=PAGE_CONCURRENCY, checkpoint_name=None, base_url=None, start_page=1):
+    """
+    Fetches paginated data from the given API endpoint into one list.
+
+    With a checkpoint name, every completed page is saved so an interrupted fetch resumes
+    after the last contiguous completed page. `fetch_and_save` streams pages to disk instead.
+
+    Args:
+        endpoint (str): API endpoint (relative to the BASE_URL).
+        requires_auth (bool): Whether authentication is required for the endpoint.
+        key (str): Key to extract specific data from the API response.
+        extra_params (str): Additional query parameters.
+        session (requests.Session): Session to reuse; a new one is created when omitted.
+        concurrency (int): Maximum pages in flight.
+        checkpoint_name (str): Name of the checkpoint to resume from and save to.
+        base_url (str): API root; defaults to BASE_URL.
+        start_page (int): First page to fetch.
+
+    Returns:
+        list: List of items retrieved from the API, in page order.
+    """
+    completed, all_items = load_checkpoint(checkpoint_name, start_page) if checkpoint_name else (start_page - 1, [])
+    if completed >= start_page:
+        print(f"Resuming {endpoint} after page {completed}")
+
+    for page, items in iter_pages(endpoint, requires_auth, key, extra_params, session, concurrency, base_url,
+                                  start_page=completed + 1):
         all_items.extend(items)
-        page += 1
+        if checkpoint_name:
+            save_checkpoint(checkpoint_name, page, items, first_page=start_page)
 
     print(f"Fetched {len(all_items)} items from {endpoint}")
     return all_items
 
+
 def save_data(filename, data):
     """
-    Saves data to a JSON file.
-    
+    Saves data to a raw file: one record per line for .ndjson files, a JSON array otherwise.
+
     Args:
         filename (str): Name of the file to save the data.
         data (list): Data to be saved.
     """
     os.makedirs(DATA_DIR, exist_ok=True)
     filepath = os.path.join(DATA_DIR, filename)
-    with open(filepath, "w") as f:
-        json.dump(data, f, indent=2)
+    with open(filepath + ".tmp", "w") as f:
+        if is_ndjson(filename):
+            write_records(f, data)
+        else:
+            json.dump(data, f, indent=2)
+    os.replace(filepath + ".tmp", filepath)
     print(f"Data saved to {filepath}")
 
-def fetch_and_save_all():
-    """
-    Fetches all required data from the APIs and saves them to local files.
-    """
-    api_endpoints = {
-        "viewed_posts.json": {
-            "endpoint": "/posts/view",
-            "requires_auth": False,
-            "key": "posts",
-            "extra_params": "resonance_algorithm=resonance_algorithm_cjsvervb7dbhss8bdrj89s44jfjdbsjd0xnjkbvuire8zcjwerui3njfbvsujc5if"
-        },
-        "liked_posts.json": {
-            "endpoint": "/posts/like",
-            "requires_auth": False,
-            "key": "posts",
-            "extra_params": "resonance_algorithm=resonance_algorithm_cjsvervb7dbhss8bdrj89s44jfjdbsjd0xnjkbvuire8zcjwerui3njfbvsujc5if"
-        },
-        "inspired_posts.json": {
-            "endpoint": "/posts/inspire",
-            "requires_auth": False,
-            "key": "posts",
-            "extra_params": "resonance_algorithm=resonance_algorithm_cjsvervb7dbhss8bdrj89s44jfjdbsjd0xnjkbvuire8zcjwerui3njfbvsujc5if"
-        },
-        "rated_posts.json": {
-            "endpoint": "/posts/rating",
-            "requires_auth": False,
-            "key": "posts",
-            "extra_params": "resonance_algorithm=resonance_algorithm_cjsvervb7dbhss8bdrj89s44jfjdbsjd0xnjkbvuire8zcjwerui3njfbvsujc5if"
-        },
-        "all_posts.json": {
-            "endpoint": "/posts/summary/get",
-            "requires_auth": True,
-            "key": "posts",
-            "extra_params": ""
-        },
-        "all_users.json": {
-            "endpoint": "/users/get_all",
-            "requires_auth": True,
-            "key": "users",
-            "extra_params": ""
-        }
-    }
 
-    for filename, config in api_endpoints.items():
-        data = fetch_paginated_data(
-            endpoint=config["endpoint"],
-            requires_auth=config["requires_auth"],
-            key=config["key"],
-            extra_params=config["extra_params"]
-        )
-        save_data(filename, data)
+def _sync_state_path():
+    return os.path.join(DATA_DIR, SYNC_STATE_FILE)
+
+
+def load_sync_state():
+    """
+    Returns:
+        dict: Filename -> {"field", "high_water_mark", "count"} of every synced file.
+    """
+    if not os.path.exists(_sync_state_path()):
+        return {}
+    with open(_sync_state_path(), "r") as f:
+        return json.load(f)
+
+
+_sync_state_lock = threading.Lock()
+
+
+def update_sync_state(filename, field, data):
+    """
+    Records the high-water mark (max of `field`) and record count of a saved file.
+
+    Args:
+        filename (str): Saved file.
+        field (str): Watermark field.
+        data (iterable): Records of the file; consumed in one pass, so it can be a stream.
+    """
+    high_water_mark, count = None, 0
+    for item in data:
+        count += 1
+        value = item.get(field)
+        if value is not None and (high_water_mark is None or value > high_water_mark):
+            high_water_mark = value
+    record_sync_state(filename, field, high_water_mark, count)
+
+
+def record_sync_state(filename, field, high_water_mark, count):
+    with _sync_state_lock:
+        state = load_sync_state()
+        state[filename] = {"field": field, "high_water_mark": high_water_mark, "count": count}
+        os.makedirs(DATA_DIR, exist_ok=True)
+        with open(_sync_state_path() + ".tmp", "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(_sync_state_path() + ".tmp", _sync_state_path())
+
+
+def load_data(filename):
+    """
+    Loads a saved raw file (NDJSON or JSON array), or an empty list if it does not exist.
+    """
+    filepath = os.path.join(DATA_DIR, filename)
+    if not os.path.exists(filepath):
+        return []
+    return list(iter_records(filepath))
+
+
+def merge_records(existing, new_items, key="id"):
+    """
+    Appends new records to existing ones, a new record replacing an existing one with the same id.
+
+    Returns:
+        list: Merged records, existing order first.
+    """
+    merged = {item[key]: item for item in existing}
+    for item in new_items:
+        merged[item[key]] = item
+    return list(merged.values())
+
+
+def merge_into_file(filename, items_file, field, sync_state, key="id"):
+    """
+    Merges the records of an NDJSON file into a saved NDJSON file without loading either.
+
+    Records past an `id` high-water mark cannot replace saved ones, so they are appended
+    as is. With any other watermark the saved file is streamed into a new copy that skips
+    the replaced records, followed by the new records.
+
+    Args:
+        filename (str): Saved file to merge into.
+        items_file (str): NDJSON file with the new records.
+        field (str): Watermark field of the file.
+        sync_state (dict): Recorded high_water_mark and count of the saved file.
+        key (str): Record id field.
+
+    Returns:
+        tuple: (count, high_water_mark) of the merged file.
+    """
+    filepath = os.path.join(DATA_DIR, filename)
+    if field == key and os.path.exists(filepath):
+        count, high_water_mark = sync_state["count"], sync_state["high_water_mark"]
+        with open(filepath, "a") as out, open(items_file, "r") as f:
+            for line in f:
+                value = json.loads(line).get(field)
+                if value is not None and (high_water_mark is None or value > high_water_mark):
+                    high_water_mark = value
+                out.write(line)
+                count += 1
+        return count, high_water_mark
+
+    # Only the ids of the new records are held in memory
+    new_ids = {item[key] for item in iter_records(items_file)}
+    count, high_water_mark = 0, None
+    with open(filepath + ".tmp", "w") as out:
+        existing = iter_records(filepath) if os.path.exists(filepath) else []
+        for source, skip_replaced in ((existing, True), (iter_records(items_file), False)):
+            for item in source:
+                if skip_replaced and item[key] in new_ids:
+                    continue
+                write_records(out, [item])
+                count += 1
+                value = item.get(field)
+                if value is not None and (high_water_mark is None or value > high_water_mark):
+                    high_water_mark = value
+    os.replace(filepath + ".tmp", filepath)
+    return count, high_water_mark
+
+
+def find_delta_start_page(session, config, high_water_mark, count, base_url=None):
+    """
+    Finds the first page that can hold records newer than the high-water mark.
+
+    Records are served in ascending id order, so new records start after the `count`
+    records already stored: the delta starts at the page holding the last stored record.
+    If records were deleted upstream that page may already start past the mark, so
+    earlier pages are probed until one starts at or below it.
+
+    Returns:
+        int: Page to start the delta fetch at.
+    """
+    field = config.get("watermark", "id")
+    headers = {"Flic-Token": FLIC_TOKEN} if config["requires_auth"] else {}
+    page = max(1, (count - 1) // PAGE_SIZE + 1)
+    while page > 1:
+        url = f"{base_url or BASE_URL}{config['endpoint']}?page={page}&page_size={PAGE_SIZE}"
+        if config["extra_params"]:
+            url += f"&{config['extra_params']}"
+        items = fetch_page(session, url, headers, config["key"])
+        if not items or items[0].get(field) is None or items[0][field] <= high_water_mark:
+            break
+        page -= 1
+    return page
+
+
+def fetch_and_save(filename, config, session=None, base_url=None, incremental=False):
+    """
+    Fetches one endpoint (resuming from its checkpoint) and saves it to its file.
+
+    Pages are streamed to the checkpoint's NDJSON items file as they arrive, so memory
+    holds only the pages in flight; a finished .ndjson fetch is moved into place as is
+    (files named .json are rewritten as one JSON array).
+
+    In incremental mode only records past the file's high-water mark (max `id`, or the
+    endpoint's `watermark` field such as a `*_at` timestamp) are fetched, appended to the
+    local file and deduplicated by id.
+
+    Returns:
+        int: Number of new or updated items.
+    """
+    session = session or create_session()
+    field = config.get("watermark", "id")
+    filepath = os.path.join(DATA_DIR, filename)
+    state = load_sync_state().get(filename) if incremental else None
+    if incremental and (state is None or state.get("field") != field):
+        # No recorded state: derive the mark from the local file
+        update_sync_state(filename, field, iter_records(filepath) if os.path.exists(filepath) else [])
+        state = load_sync_state()[filename]
+
+    high_water_mark = state["high_water_mark"] if incremental else None
+    start_page = 1
+    if high_water_mark is not None:
+        start_page = find_delta_start_page(session, config, high_water_mark, state["count"], base_url)
+
+    checkpoint = checkpoint_state(filename, start_page)
+    if checkpoint["last_page"] >= start_page:
+        print(f"Resuming {config['endpoint']} after page {checkpoint['last_page']}")
+    pages = iter_pages(
+        endpoint=config["endpoint"],
+        requires_auth=config["requires_auth"],
+        key=config["key"],
+        extra_params=config["extra_params"],
+        session=session,
+        base_url=base_url,
+        start_page=checkpoint["last_page"] + 1
+    )
+    for page, items in pages:
+        if high_water_mark is not None:
+            items = [item for item in items if item.get(field) is not None and item[field] > high_water_mark]
+        checkpoint = save_checkpoint(filename, page, items, first_page=start_page)
+
+    items_file = checkpoint_items_file(filename)
+    os.makedirs(os.path.dirname(items_file), exist_ok=True)
+    open(items_file, "a").close()
+    print(f"Fetched {checkpoint['count']} items from {config['endpoint']}")
+
+    if high_water_mark is not None:
+        print(f"{checkpoint['count']} new items for {filename} past {field}={high_water_mark}")
+        if is_ndjson(filename):
+            count, high_water_mark = merge_into_file(filename, items_file, field, state)
+            record_sync_state(filename, field, high_water_mark, count)
+        else:
+            saved = merge_records(load_data(filename), iter_records(items_file))
+            save_data(filename, saved)
+            update_sync_state(filename, field, saved)
+    else:
+        if is_ndjson(filename):
+            os.replace(items_file, filepath)
+            print(f"Data saved to {filepath}")
+        else:
+            save_data(filename, list(iter_records(items_file)))
+        update_sync_state(filename, field, iter_records(filepath))
+
+    clear_checkpoint(filename)
+    return checkpoint["count"]
+
+
+def fetch_and_save_all(api_endpoints=None, max_workers=MAX_ENDPOINT_WORKERS, base_url=None, incremental=False):
+    """
+    Fetches all required data from the APIs, every endpoint in parallel, and saves them to local files.
+
+    Args:
+        api_endpoints (dict): Output filename -> endpoint config; defaults to API_ENDPOINTS.
+        max_workers (int): Endpoints fetched at once.
+        base_url (str): API root; defaults to BASE_URL.
+        incremental (bool): Fetch only records newer than each file's high-water mark.
+
+    Returns:
+        dict: Number of items fetched per file.
+    """
+    api_endpoints = api_endpoints or API_ENDPOINTS
+    session = create_session(max_workers * PAGE_CONCURRENCY)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch-endpoint") as executor:
+        futures = {
+            filename: executor.submit(fetch_and_save, filename, config, session, base_url, incremental)
+            for filename, config in api_endpoints.items()
+        }
+        return {filename: future.result() for filename, future in futures.items()}
 
 if __name__ == "__main__":
-    fetch_and_save_all()
+    parser = argparse.ArgumentParser(description="Fetch the API data into the data directory.")
+    parser.add_argument("--incremental", action="store_true", help="Only fetch records newer than the saved ones.")
+    args = parser.parse_args()
+    fetch_and_save_all(incremental=args.incremental)
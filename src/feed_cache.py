@@ -0,0 +1,161 @@
+import time
+import threading
+from collections import OrderedDict
+
+# Rough per-entry bookkeeping cost (key tuple, OrderedDict node, timestamps) added to the array sizes
+ENTRY_OVERHEAD_BYTES = 256
+
+
+class FeedCache:
+    """
+    In-process LRU + TTL cache of each user's ranked candidate list.
+
+    Entries are keyed by (user_id, model_version), so a model reload never serves
+    stale rankings. The cache is bounded both by entry count and by the total size
+    of the cached arrays; least recently used entries are evicted first.
+
+    Each user also has a generation, bumped by `invalidate_user`. Callers read it with
+    `generation` before ranking and pass it to `put`, so a feed computed before an
+    invalidation cannot be stored after it.
+    """
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024, ttl=300, clock=time.monotonic):
+        """
+        Args:
+            max_entries (int): Maximum number of cached feeds.
+            max_bytes (int): Maximum total size of the cached arrays, in bytes.
+            ttl (float): Seconds a cached feed stays valid.
+            clock (callable): Time source, in seconds.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._generations = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    @staticmethod
+    def _entry_bytes(post_ids, scores):
+        return post_ids.nbytes + scores.nbytes + ENTRY_OVERHEAD_BYTES
+
+    def _remove(self, key):
+        expires_at, post_ids, scores, size = self._entries.pop(key)
+        self._bytes -= size
+        user_keys = self._user_keys.get(key[0])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._user_keys[key[0]]
+
+    def get(self, user_id, model_version):
+        """
+        Returns the cached ranked list of a user, or None on a miss or an expired entry.
+
+        Returns:
+            tuple or None: (post_ids, scores) arrays.
+        """
+        key = (user_id, model_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry[0] <= self.clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def generation(self, user_id):
+        """
+        Returns the user's current generation, to read before computing a feed to `put`.
+        """
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def put(self, user_id, model_version, post_ids, scores, generation=None):
+        """
+        Caches the ranked list of a user, evicting least recently used entries if needed.
+
+        Args:
+            user_id: User the feed belongs to.
+            model_version (str): Version of the models that produced the ranking.
+            post_ids (np.ndarray): Ranked post ids.
+            scores (np.ndarray): Scores aligned with post_ids.
+            generation (int): The user's generation when the ranking started; the feed is
+                not cached if the user was invalidated since.
+        """
+        key = (user_id, model_version)
+        size = self._entry_bytes(post_ids, scores)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if generation is not None and self._generations.get(user_id, 0) != generation:
+                self.stale_puts += 1
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            while self._entries and (len(self._entries) >= self.max_entries or self._bytes + size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+            self._entries[key] = (self.clock() + self.ttl, post_ids, scores, size)
+            self._user_keys.setdefault(user_id, set()).add(key)
+            self._bytes += size
+
+    def invalidate_user(self, user_id):
+        """
+        Drops every cached feed of a user, whatever model version produced it, and bumps the
+        user's generation so feeds still being computed are not cached.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            keys = list(self._user_keys.get(user_id, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit, miss, eviction, expiration, invalidation and stale put counters and the current size.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,210 @@
+import os
+import fcntl
+import argparse
+import numpy as np
+import pandas as pd
+from src.recommendation_engine.datasets import append_dataset
+from src.recommendation_engine.signals import INTERACTION_WEIGHTS
+from contextlib import contextmanager
+from src.recommendation_engine.user_profiles import TIMESTAMP_COLUMNS
+
+# Columns every ingested interaction must have
+REQUIRED_COLUMNS = ('user_id', 'post_id', 'interaction_type')
+
+# Columns written to the interaction log, whatever fields a batch carries
+LOG_COLUMNS = (
+    'user_id', 'post_id', 'interaction_type', 'rating_percent',
+    'viewed_at', 'liked_at', 'inspired_at', 'rated_at'
+)
+
+# Suffix of a log moved aside while it is being compacted
+COMPACTING_SUFFIX = ".compacting"
+
+# Suffixes of the lock files that serialise appends and compactions across processes
+LOCK_SUFFIX = ".lock"
+COMPACTION_LOCK_SUFFIX = ".compact.lock"
+
+
+@contextmanager
+def _file_lock(lock_path):
+    # flock on a separate lock file, so every Gunicorn worker (and the compaction CLI) waits
+    # its turn; the log itself is renamed at compaction and cannot carry the lock
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def validate_interactions(events):
+    """
+    Checks a batch of ingested interaction events and converts them to a DataFrame.
+
+    Args:
+        events (list): Interaction dicts with user_id, post_id and interaction_type, plus optional
+            rating_percent and timestamp fields.
+
+    Returns:
+        pd.DataFrame: The events, with int64 user and post ids and naive UTC timestamps.
+
+    Raises:
+        ValueError: When a required field is missing, an id is not an integer, an
+            interaction_type is not one of INTERACTION_WEIGHTS or a timestamp does not parse.
+    """
+    if not all(isinstance(event, dict) for event in events):
+        raise ValueError("Every interaction must be an object")
+    events_df = pd.DataFrame(events)
+    missing = [column for column in REQUIRED_COLUMNS if column not in events_df.columns]
+    if missing or events_df[list(REQUIRED_COLUMNS)].isna().any().any():
+        raise ValueError(f"Every interaction needs {', '.join(REQUIRED_COLUMNS)}")
+
+    for column in ('user_id', 'post_id'):
+        try:
+            ids = pd.to_numeric(events_df[column], errors="raise")
+        except (TypeError, ValueError):
+            raise ValueError(f"{column} must be an integer")
+        if not pd.api.types.is_numeric_dtype(ids) or (ids % 1 != 0).any():
+            raise ValueError(f"{column} must be an integer")
+        events_df[column] = ids.astype(np.int64)
+
+    unknown = set(events_df['interaction_type']) - set(INTERACTION_WEIGHTS)
+    if unknown:
+        raise ValueError(
+            f"Unknown interaction_type {sorted(map(str, unknown))}. Available: {sorted(INTERACTION_WEIGHTS)}"
+        )
+    if 'rating_percent' in events_df.columns:
+        try:
+            events_df['rating_percent'] = pd.to_numeric(events_df['rating_percent'], errors="raise")
+        except (TypeError, ValueError):
+            raise ValueError("rating_percent must be a number")
+    for column in TIMESTAMP_COLUMNS:
+        if column in events_df.columns:
+            try:
+                events_df[column] = parse_timestamps(events_df[column])
+            except (TypeError, ValueError, OverflowError):
+                raise ValueError(f"{column} must be a timestamp")
+    return events_df
+
+
+def parse_timestamps(values, errors="raise"):
+    """
+    Parses interaction timestamps into naive UTC datetimes, like the processed data holds.
+
+    Timezone-aware values (such as "2024-12-08T10:00:00Z") are converted to UTC; naive
+    values are taken as UTC already.
+
+    Args:
+        values (pd.Series): Timestamp strings; missing values become NaT.
+        errors (str): 'raise' for values that do not parse, or 'coerce' to turn them into NaT.
+
+    Returns:
+        pd.Series: datetime64 timestamps without a timezone.
+    """
+    return pd.to_datetime(values, errors=errors, utc=True, format="mixed").dt.tz_localize(None)
+
+
+def replayable_interactions(logged_df):
+    """
+    Keeps the logged events that can be applied to the models, for replaying the log at load time.
+
+    Rows whose ids, interaction_type or timestamps do not validate (for example lines written
+    by an older version) are skipped with a message instead of failing the whole load.
+
+    Args:
+        logged_df (pd.DataFrame): Events returned by `read_interaction_log`.
+
+    Returns:
+        pd.DataFrame: The valid events, typed as `validate_interactions` returns them.
+    """
+    events_df = logged_df.copy()
+    valid = events_df['interaction_type'].isin(list(INTERACTION_WEIGHTS)).to_numpy()
+    for column in ('user_id', 'post_id'):
+        ids = pd.to_numeric(events_df[column], errors="coerce")
+        valid &= (ids.notna() & (ids % 1 == 0)).to_numpy()
+        events_df[column] = ids.fillna(-1).astype(np.int64)
+    if 'rating_percent' in events_df.columns:
+        rating = pd.to_numeric(events_df['rating_percent'], errors="coerce")
+        valid &= (rating.notna() | events_df['rating_percent'].isna()).to_numpy()
+        events_df['rating_percent'] = rating
+    for column in TIMESTAMP_COLUMNS:
+        if column in events_df.columns:
+            times = parse_timestamps(events_df[column].astype(object), errors="coerce")
+            valid &= (times.notna() | events_df[column].isna()).to_numpy()
+            events_df[column] = times
+
+    if not valid.all():
+        print(f"Skipped {int((~valid).sum())} logged interactions that cannot be applied")
+    return events_df[valid].reset_index(drop=True)
+
+
+def append_interaction_log(path, events_df):
+    """
+    Appends validated events to the interaction log, a CSV file kept apart from the processed data.
+
+    The log is not watched by the model reloader, so ingesting events does not trigger a
+    rebuild; `compact_interaction_log` folds it into the interactions dataset offline.
+
+    Args:
+        path (str): Log file; created with a header on the first append.
+        events_df (pd.DataFrame): Events returned by `validate_interactions`.
+    """
+    with _file_lock(path + LOCK_SUFFIX):
+        write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+        events_df.reindex(columns=LOG_COLUMNS).to_csv(path, mode="a", header=write_header, index=False)
+
+
+def read_interaction_log(path):
+    """
+    Reads the events logged since the last compaction, including a compaction left unfinished.
+
+    Returns:
+        pd.DataFrame: Logged events in LOG_COLUMNS order; empty when there is no log.
+    """
+    parts = [pd.read_csv(part) for part in (path + COMPACTING_SUFFIX, path)
+             if os.path.exists(part) and os.path.getsize(part) > 0]
+    if not parts:
+        return pd.DataFrame(columns=LOG_COLUMNS)
+    return pd.concat(parts, ignore_index=True).reindex(columns=LOG_COLUMNS)
+
+
+def compact_interaction_log(path, dataset_path):
+    """
+    Appends the logged events to the interactions dataset and empties the log.
+
+    The log is first moved aside, so events ingested meanwhile go to a new log. The
+    dataset change is picked up by the model reloader like any other data update.
+    Appends and compactions take file locks, so several app processes and the CLI can
+    share one log without losing or duplicating events.
+
+    Args:
+        path (str): Interaction log file.
+        dataset_path (str): Processed interactions dataset (csv, parquet or feather).
+
+    Returns:
+        int: Number of events moved into the dataset.
+    """
+    compacting_path = path + COMPACTING_SUFFIX
+    # Held for the whole compaction, so two compactions never fold the same events in twice
+    with _file_lock(path + COMPACTION_LOCK_SUFFIX):
+        with _file_lock(path + LOCK_SUFFIX):
+            # A compaction interrupted earlier is finished first
+            if not os.path.exists(compacting_path):
+                if not os.path.exists(path):
+                    return 0
+                os.replace(path, compacting_path)
+
+        events_df = pd.read_csv(compacting_path) if os.path.getsize(compacting_path) > 0 else pd.DataFrame()
+        if len(events_df):
+            append_dataset(dataset_path, events_df)
+        os.remove(compacting_path)
+    print(f"Compacted {len(events_df)} logged interactions into {dataset_path}")
+    return len(events_df)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Folds the interaction log into the processed interactions dataset.")
+    parser.add_argument("--log", default="data/processed/interaction_log.csv", help="Interaction log file.")
+    parser.add_argument("--dataset", default="data/processed/interaction_df.csv", help="Processed interactions dataset.")
+    args = parser.parse_args()
+    compact_interaction_log(args.log, args.dataset)
@@ -0,0 +1,146 @@
+import os
+import time
+import threading
+from datetime import datetime
+
+
+class ModelBundle:
+    """
+    Immutable set of models served together, tagged with a version.
+
+    Request handlers take one reference to the current bundle and use it for the
+    whole request, so a reload never mixes models from two versions.
+    """
+    def __init__(self, version, **models):
+        self.version = version
+        self.loaded_at = datetime.now().isoformat()
+        self.models = models
+        for name, model in models.items():
+            setattr(self, name, model)
+
+
+class ModelReloader:
+    """
+    Loads model bundles in a background thread and atomically swaps the served bundle.
+
+    The watched files are polled every `interval` seconds; when one of them changes,
+    `load_bundle` is called off the request path and the new bundle replaces the
+    current one with a single reference assignment. In-flight requests keep the
+    bundle they started with.
+    """
+    def __init__(self, load_bundle, watch_paths=(), interval=60, after_swap=None):
+        """
+        Args:
+            load_bundle (callable): Returns a new ModelBundle (loading or rebuilding artifacts).
+            watch_paths (iterable): Files whose changes trigger a reload.
+            interval (float): Seconds between checks of the watched files.
+            after_swap (callable): Called with the new bundle once it is served, e.g. to delete
+                artifact versions only the previous bundle used.
+        """
+        self.load_bundle = load_bundle
+        self.after_swap = after_swap
+        self.watch_paths = list(watch_paths)
+        self.interval = interval
+        self.last_reload_seconds = None
+        self.last_error = None
+        self.reload_count = 0
+        self._reload_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self._signature = self._watch_signature()
+        self._bundle = self._timed_load()
+        self._run_after_swap(self._bundle)
+
+    def current(self):
+        """
+        Returns the bundle to serve the current request with.
+        """
+        return self._bundle
+
+    def _watch_signature(self):
+        # Cheap change detection: modification time and size of every watched file
+        signature = []
+        for path in self.watch_paths:
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def _timed_load(self):
+        start = time.perf_counter()
+        bundle = self.load_bundle()
+        self.last_reload_seconds = time.perf_counter() - start
+        self.reload_count += 1
+        print(f"Loaded model bundle {bundle.version} in {self.last_reload_seconds:.3f}s")
+        return bundle
+
+    def _run_after_swap(self, bundle):
+        if self.after_swap is None:
+            return
+        try:
+            self.after_swap(bundle)
+        except Exception as e:
+            print(f"Post-swap hook failed for bundle {bundle.version}: {type(e).__name__}: {e}")
+
+    def reload(self):
+        """
+        Loads a new bundle and swaps it in. Concurrent calls are serialised.
+
+        Returns:
+            bool: True if the reload succeeded; on failure the current bundle keeps serving.
+        """
+        with self._reload_lock:
+            signature = self._watch_signature()
+            try:
+                bundle = self._timed_load()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Model reload failed, keeping bundle {self._bundle.version}: {self.last_error}")
+                return False
+
+            self._signature = signature
+            self.last_error = None
+            self._bundle = bundle
+            self._run_after_swap(bundle)
+            return True
+
+    def reload_async(self):
+        """
+        Starts a reload in a background thread.
+        """
+        threading.Thread(target=self.reload, name="model-reload", daemon=True).start()
+
+    def _watch(self):
+        while not self._stop_event.wait(self.interval):
+            if self._watch_signature() != self._signature:
+                self.reload()
+
+    def start(self):
+        """
+        Starts polling the watched files in a daemon thread.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._watch, name="model-reloader", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def status(self):
+        """
+        Returns:
+            dict: Current model version, when it was loaded, the last reload duration and error.
+        """
+        bundle = self._bundle
+        return {
+            "version": bundle.version,
+            "loaded_at": bundle.loaded_at,
+            "last_reload_seconds": self.last_reload_seconds,
+            "reload_count": self.reload_count,
+            "reloading": self._reload_lock.locked(),
+            "last_error": self.last_error,
+        }
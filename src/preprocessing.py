@@ -1,20 +1,84 @@
 import os
+import glob
 import json
+import shutil
+import argparse
+import tempfile
+import numpy as np
 import pandas as pd
 
+try:
+    from .recommendation_engine.datasets import DatasetWriter, save_dataset
+except ImportError:
+    # Run as a script from the src directory
+    from recommendation_engine.datasets import DatasetWriter, save_dataset
+
 # Define paths
 DATA_DIR = "../data"
 PROCESSED_DIR = "../data/processed"
-os.makedirs(PROCESSED_DIR, exist_ok=True)  # Ensure the processed directory exists
+
+# Output format of the processed datasets: csv, or parquet / feather with compact dtypes
+PROCESSED_FORMAT = os.environ.get("PROCESSED_FORMAT", "csv")
+
+# Records parsed at a time from NDJSON raw files
+CHUNK_SIZE = 50000
+
+# Streaming mode: memory budget, and estimated bytes per interaction record held in a chunk
+# (raw record, processed row and the sorting copies)
+MAX_MEMORY_MB = 512
+INTERACTION_RECORD_BYTES = 1024
 
 # Helper Functions
-def load_json_to_df(filename):
+def raw_file(name):
+    """
+    Returns the raw file of a dataset: the NDJSON file written by the data fetcher if present, else the JSON array file.
+    """
+    if os.path.exists(os.path.join(DATA_DIR, f"{name}.ndjson")):
+        return f"{name}.ndjson"
+    return f"{name}.json"
+
+def iter_json_chunks(filename, chunksize=CHUNK_SIZE):
+    """
+    Reads a raw file as DataFrames of at most `chunksize` records.
+
+    NDJSON files are parsed line by line, so only one chunk of raw records is in memory
+    at a time. JSON array files can only be parsed whole, and are split after loading.
+
+    Args:
+        filename (str): Raw file in DATA_DIR (.ndjson or .json).
+        chunksize (int): Records per DataFrame.
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of records.
+    """
     filepath = os.path.join(DATA_DIR, filename)
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"File not found: {filepath}")
+
     with open(filepath, "r") as f:
-        data = json.load(f)
-    return pd.DataFrame(data)
+        if not filename.endswith(".ndjson"):
+            data = json.load(f)
+            for start in range(0, len(data), chunksize):
+                yield pd.DataFrame(data[start:start + chunksize])
+            return
+
+        records = []
+        for line in f:
+            if not line.strip():
+                continue
+            records.append(json.loads(line))
+            if len(records) == chunksize:
+                yield pd.DataFrame(records)
+                records = []
+        if records:
+            yield pd.DataFrame(records)
+
+def load_json_to_df(filename, chunksize=CHUNK_SIZE):
+    # Materialises the whole file; the chunked pipeline (`main`) reads iter_json_chunks instead
+    chunks = list(iter_json_chunks(filename, chunksize))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
 
 def preprocess_users(users_df):
     users_df.fillna({
@@ -86,55 +150,280 @@ def preprocess_posts(posts_df):
 
 
 
+# Raw interaction file of every interaction type, in concatenation order
+INTERACTION_FILES = {
+    'viewed': 'viewed_posts',
+    'liked': 'liked_posts',
+    'inspired': 'inspired_posts',
+    'rated': 'rated_posts'
+}
+
+# Sort order of the interactions table
+INTERACTION_SORT_COLUMNS = ['user_id', 'viewed_at', 'liked_at', 'inspired_at', 'rated_at']
+
+def tag_interactions(df, interaction):
+    df['interaction_type'] = interaction
+    if interaction != 'rated':
+        df['rating_percent'] = None
+    df[f"{interaction}_at"] = pd.to_datetime(df[f"{interaction}_at"], errors='coerce')
+    return df
+
 def preprocess_interactions(viewed, liked, inspired, rated):
     for df, interaction in zip(
         [viewed, liked, inspired, rated],
         ['viewed', 'liked', 'inspired', 'rated']
     ):
-        df['interaction_type'] = interaction
-        if interaction != 'rated':
-            df['rating_percent'] = None
-        df[f"{interaction}_at"] = pd.to_datetime(df[f"{interaction}_at"], errors='coerce')
+        tag_interactions(df, interaction)
         df.drop_duplicates(inplace=True)
 
     interaction_df = pd.concat([viewed, liked, inspired, rated], ignore_index=True)
-    interaction_df.sort_values(by=['user_id', 'viewed_at', 'liked_at', 'inspired_at', 'rated_at'], inplace=True)
+    interaction_df.sort_values(by=INTERACTION_SORT_COLUMNS, inplace=True)
     interaction_df.reset_index(drop=True, inplace=True)
     return interaction_df
 
-def aggregate_interactions(interaction_df):
-    user_features = interaction_df.groupby('user_id').agg(
-        total_views=('interaction_type', lambda x: (x == 'viewed').sum()),
-        total_likes=('interaction_type', lambda x: (x == 'liked').sum()),
-        total_inspirations=('interaction_type', lambda x: (x == 'inspired').sum()),
-        total_ratings=('interaction_type', lambda x: (x == 'rated').sum()),
-        average_rating=('rating_percent', 'mean')
-    ).fillna(0).reset_index()
-
-    post_features = interaction_df.groupby('post_id').agg(
-        total_views=('interaction_type', lambda x: (x == 'viewed').sum()),
-        total_likes=('interaction_type', lambda x: (x == 'liked').sum()),
-        total_inspirations=('interaction_type', lambda x: (x == 'inspired').sum()),
-        total_ratings=('interaction_type', lambda x: (x == 'rated').sum()),
-        average_rating=('rating_percent', 'mean')
-    ).fillna(0).reset_index()
+# Aggregate count column of every interaction type, in output order
+INTERACTION_TOTALS = {
+    'viewed': 'total_views',
+    'liked': 'total_likes',
+    'inspired': 'total_inspirations',
+    'rated': 'total_ratings'
+}
+
+def interaction_partials(interaction_df, key):
+    """
+    Counts the interactions of every type and sums rating_percent per value of `key`.
+
+    Keys are factorized to dense integer codes and interaction types to categorical
+    codes, so every count comes from one np.bincount over `key code * n_types + type code`.
+    Partials of several chunks add up to the partials of their concatenation.
+
+    Args:
+        interaction_df (pd.DataFrame): Interactions with interaction_type and rating_percent.
+        key (str): Column to group by ('user_id' or 'post_id'); rows with a missing key are dropped.
 
+    Returns:
+        pd.DataFrame: Indexed by sorted key, with the INTERACTION_TOTALS columns,
+            rating_sum and rating_count.
+    """
+    codes, keys = pd.factorize(interaction_df[key], sort=True)
+    types = pd.Categorical(interaction_df['interaction_type'], categories=list(INTERACTION_TOTALS)).codes
+    n_keys, n_types = len(keys), len(INTERACTION_TOTALS)
+
+    counted = (codes >= 0) & (types >= 0)
+    counts = np.bincount(
+        codes[counted] * n_types + types[counted], minlength=n_keys * n_types
+    ).reshape(n_keys, n_types)
+
+    ratings = pd.to_numeric(interaction_df['rating_percent'], errors='coerce').to_numpy(dtype=np.float64)
+    rated = (codes >= 0) & ~np.isnan(ratings)
+
+    partials = pd.DataFrame(counts, columns=list(INTERACTION_TOTALS.values()), index=pd.Index(keys, name=key))
+    partials['rating_sum'] = np.bincount(codes[rated], weights=ratings[rated], minlength=n_keys)
+    partials['rating_count'] = np.bincount(codes[rated], minlength=n_keys)
+    return partials
+
+def features_from_partials(partials):
+    """
+    Returns:
+        pd.DataFrame: One row per key with the INTERACTION_TOTALS columns and
+            average_rating (0 for keys without ratings).
+    """
+    features = partials[list(INTERACTION_TOTALS.values())].astype(np.int64).reset_index()
+    rating_counts = partials['rating_count'].to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        features['average_rating'] = np.where(rating_counts > 0, partials['rating_sum'].to_numpy() / rating_counts, 0.0)
+    return features
+
+def aggregate_by(interaction_df, key):
+    """
+    Counts the interactions of every type and averages rating_percent per value of `key`.
+
+    Returns:
+        pd.DataFrame: One row per key, sorted by key, with the INTERACTION_TOTALS columns
+            and average_rating (0 for keys without ratings).
+    """
+    return features_from_partials(interaction_partials(interaction_df, key))
+
+def aggregate_interactions(interaction_df):
+    user_features = aggregate_by(interaction_df, 'user_id')
+    post_features = aggregate_by(interaction_df, 'post_id')
     return user_features, post_features
 
+class InteractionAggregates:
+    """
+    Running per-user and per-post aggregates, fed one chunk of interactions at a time.
+
+    Only the partial counts and rating sums are kept, so memory grows with the number
+    of users and posts rather than with the number of interactions.
+    """
+    def __init__(self):
+        self.partials = {'user_id': None, 'post_id': None}
+
+    def add(self, interaction_df):
+        for key, partials in self.partials.items():
+            chunk_partials = interaction_partials(interaction_df, key)
+            self.partials[key] = chunk_partials if partials is None else partials.add(chunk_partials, fill_value=0)
+
+    def row_counts(self, key='user_id'):
+        """
+        Returns:
+            pd.Series: Number of interactions per key, sorted by key.
+        """
+        return self.partials[key][list(INTERACTION_TOTALS.values())].sum(axis=1).astype(np.int64)
+
+    def features(self):
+        """
+        Returns:
+            tuple: (user_features, post_features), as returned by aggregate_interactions.
+        """
+        return tuple(features_from_partials(self.partials[key]) for key in ('user_id', 'post_id'))
+
+class HashedKeySet:
+    """
+    Set of 64-bit row hashes, kept as one sorted uint64 array (8 bytes per distinct row).
+
+    Rows are hashed with pd.util.hash_pandas_object over every column, so two rows are
+    duplicates when all their values are equal (up to a negligible hash collision rate).
+    """
+    def __init__(self):
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def add_new(self, df):
+        """
+        Adds the hashes of the rows of df.
+
+        Returns:
+            np.ndarray: Boolean mask of the rows seen for the first time (the first of
+                several equal rows within df counts as new).
+        """
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        new = ~pd.Series(hashes).duplicated().to_numpy()
+        if self.hashes.size:
+            positions = np.minimum(np.searchsorted(self.hashes, hashes), self.hashes.size - 1)
+            new &= self.hashes[positions] != hashes
+        added = np.sort(hashes[new])
+        self.hashes = np.insert(self.hashes, np.searchsorted(self.hashes, added), added)
+        return new
+
+def chunk_size_for_memory(max_memory_mb):
+    """
+    Returns:
+        int: Interaction records per chunk that fit the memory budget.
+    """
+    return max(1000, int(max_memory_mb * 2 ** 20) // INTERACTION_RECORD_BYTES)
+
+def stream_interactions(output_path, chunk_size, spill_dir=None):
+    """
+    Preprocesses the raw interaction files out of core, into the same table as preprocess_interactions.
+
+    1. Every file is read in chunks; each chunk is tagged, deduplicated against a hashed key
+       set of its interaction type, folded into the running aggregates and spilled to disk.
+    2. The per-user row counts split the users into ranges of about `chunk_size` rows,
+       and the spilled rows are routed to their range.
+    3. Ranges are sorted one at a time (by INTERACTION_SORT_COLUMNS, ties in concatenation
+       order) and appended to the output.
+
+    Args:
+        output_path (str): Interactions output file (.csv or .parquet).
+        chunk_size (int): Records per chunk, which bounds the rows in memory.
+        spill_dir (str): Directory for the temporary spill files; the system default when omitted.
+
+    Returns:
+        tuple: (user_features, post_features) of the deduplicated interactions.
+    """
+    aggregates = InteractionAggregates()
+    spill = tempfile.mkdtemp(prefix="interactions-", dir=spill_dir)
+    try:
+        runs, columns, position = [], [], 0
+        for interaction, name in INTERACTION_FILES.items():
+            seen = HashedKeySet()
+            for chunk in iter_json_chunks(raw_file(name), chunk_size):
+                chunk = tag_interactions(chunk, interaction)
+                chunk = chunk[seen.add_new(chunk)].copy()
+                columns.extend(column for column in chunk.columns if column not in columns)
+                chunk['_position'] = np.arange(position, position + len(chunk))
+                position += len(chunk)
+                aggregates.add(chunk)
+                runs.append(os.path.join(spill, f"run_{len(runs):06d}.pkl"))
+                chunk.to_pickle(runs[-1])
+
+        # Users ranges of about chunk_size rows (a single larger user gets a range of its own)
+        user_rows = aggregates.row_counts('user_id') if position else pd.Series(dtype=np.int64)
+        starts = np.cumsum(user_rows.to_numpy()) - user_rows.to_numpy()
+        first_user_of_range = user_rows.index.to_numpy()[np.flatnonzero(np.diff(starts // chunk_size)) + 1]
+
+        for run in runs:
+            run_df = pd.read_pickle(run)
+            os.remove(run)
+            ranges = np.searchsorted(first_user_of_range, run_df['user_id'].to_numpy(), side='right')
+            for user_range in np.unique(ranges):
+                run_df[ranges == user_range].to_pickle(os.path.join(spill, f"range_{user_range:06d}_{os.path.basename(run)}"))
+
+        with DatasetWriter(output_path, columns=columns) as writer:
+            for user_range in range(first_user_of_range.size + 1):
+                parts = sorted(glob.glob(os.path.join(spill, f"range_{user_range:06d}_*.pkl")))
+                if not parts:
+                    continue
+                range_df = pd.concat([pd.read_pickle(part) for part in parts], ignore_index=True)
+                range_df = range_df.reindex(columns=columns + ['_position'])
+                range_df = range_df.sort_values(by=INTERACTION_SORT_COLUMNS + ['_position'])
+                writer.write(range_df.drop(columns='_position'))
+                for part in parts:
+                    os.remove(part)
+            if not writer.rows:
+                writer.write(pd.DataFrame(columns=columns))
+    finally:
+        shutil.rmtree(spill, ignore_errors=True)
+
+    return aggregates.features()
+
+def preprocess_in_chunks(name, preprocess, chunk_size):
+    """
+    Runs a per-record preprocessing function (preprocess_posts, preprocess_users) over a
+    raw file one chunk at a time. Only the preprocessed rows, not the raw records, are
+    kept for the whole file.
+    """
+    chunks = [preprocess(chunk) for chunk in iter_json_chunks(raw_file(name), chunk_size)]
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
 def save_to_csv(df, filename):
+    os.makedirs(PROCESSED_DIR, exist_ok=True)  # Ensure the processed directory exists
     filepath = os.path.join(PROCESSED_DIR, filename)
     df.to_csv(filepath, index=False)
     print(f"Saved {filename} to {PROCESSED_DIR}")
 
+def save_processed(df, name, file_format=None):
+    """
+    Saves a processed dataset as name.<format> in PROCESSED_DIR (PROCESSED_FORMAT by default).
+    """
+    filename = f"{name}.{file_format or PROCESSED_FORMAT}"
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    save_dataset(df, os.path.join(PROCESSED_DIR, filename))
+    print(f"Saved {filename} to {PROCESSED_DIR}")
+
+def merge_post_features(all_posts_df, post_features):
+    return pd.merge(
+        all_posts_df,
+        post_features.rename(columns={"average_rating": "average_rating_features"}),
+        left_on='id',
+        right_on='post_id',
+        how='left'
+    ).fillna(0)
+
 # Main Preprocessing Pipeline
-def main():
-    print("Starting preprocessing pipeline...")
-    viewed_df = load_json_to_df("viewed_posts.json")
-    liked_df = load_json_to_df("liked_posts.json")
-    inspired_df = load_json_to_df("inspired_posts.json")
-    rated_df = load_json_to_df("rated_posts.json")
-    all_posts_df = load_json_to_df("all_posts.json")
-    all_users_df = load_json_to_df("all_users.json")
+def main_in_memory():
+    """
+    Preprocesses the raw files with every table loaded whole; memory grows with the data.
+
+    Kept for small data and for checking `main` against it; `main` produces the same files.
+    """
+    print("Starting in-memory preprocessing pipeline...")
+    viewed_df = load_json_to_df(raw_file("viewed_posts"))
+    liked_df = load_json_to_df(raw_file("liked_posts"))
+    inspired_df = load_json_to_df(raw_file("inspired_posts"))
+    rated_df = load_json_to_df(raw_file("rated_posts"))
+    all_posts_df = load_json_to_df(raw_file("all_posts"))
+    all_users_df = load_json_to_df(raw_file("all_users"))
 
     print("Data loading complete.")
 
@@ -143,19 +432,54 @@ def main():
     interaction_df = preprocess_interactions(viewed_df, liked_df, inspired_df, rated_df)
     user_features, post_features = aggregate_interactions(interaction_df)
 
-    all_posts_with_features = pd.merge(
-        all_posts_df,
-        post_features.rename(columns={"average_rating": "average_rating_features"}),
-        left_on='id',
-        right_on='post_id',
-        how='left'
-    ).fillna(0)
+    all_posts_with_features = merge_post_features(all_posts_df, post_features)
+
+    save_processed(interaction_df, "interaction_df")
+    save_processed(all_posts_with_features, "all_posts_with_features")
+    save_processed(all_users_df, "all_users_processed")
 
-    save_to_csv(interaction_df, "interaction_df.csv")
-    save_to_csv(all_posts_with_features, "all_posts_with_features.csv")
-    save_to_csv(all_users_df, "all_users_processed.csv")
+    print("Preprocessing pipeline completed successfully!")
+
+def main(max_memory_mb=MAX_MEMORY_MB, spill_dir=None):
+    """
+    Preprocesses the raw files out of core into the processed datasets.
+
+    Interactions are processed in chunks sized to `max_memory_mb` (see stream_interactions)
+    and written range by range; posts and users are preprocessed chunk by chunk. Beyond
+    one chunk, memory holds the per-user and per-post aggregates, 8 bytes per distinct
+    interaction for deduplication, and the preprocessed posts and users tables.
+
+    Args:
+        max_memory_mb (float): Memory budget of a chunk, in megabytes.
+        spill_dir (str): Directory for temporary spill files.
+    """
+    print("Starting preprocessing pipeline...")
+    chunk_size = chunk_size_for_memory(max_memory_mb)
+    print(f"Processing {chunk_size} records per chunk ({max_memory_mb} MB budget)")
+
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    interactions_file = f"interaction_df.{PROCESSED_FORMAT}"
+    user_features, post_features = stream_interactions(
+        os.path.join(PROCESSED_DIR, interactions_file), chunk_size, spill_dir=spill_dir
+    )
+    print(f"Saved {interactions_file} to {PROCESSED_DIR}")
+
+    all_posts_df = preprocess_in_chunks("all_posts", preprocess_posts, chunk_size)
+    save_processed(merge_post_features(all_posts_df, post_features), "all_posts_with_features")
+    del all_posts_df
+
+    save_processed(preprocess_in_chunks("all_users", preprocess_users, chunk_size), "all_users_processed")
 
     print("Preprocessing pipeline completed successfully!")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Preprocess the raw data files into the processed datasets.")
+    parser.add_argument("--in-memory", action="store_true", help="Load every raw file whole instead of in chunks.")
+    parser.add_argument("--streaming", action="store_true", help="Process the data in chunks, out of core (the default).")
+    parser.add_argument("--max-memory-mb", type=float, default=MAX_MEMORY_MB, help="Memory budget of a chunk.")
+    parser.add_argument("--spill-dir", help="Directory for temporary files.")
+    args = parser.parse_args()
+    if args.in_memory:
+        main_in_memory()
+    else:
+        main(args.max_memory_mb, args.spill_dir)
@@ -0,0 +1,312 @@
+import os
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# Bump whenever the on-disk layout of saved models changes; older artifacts are rebuilt
+ARTIFACT_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+# Names the published version directory inside an artifact directory
+CURRENT_FILE = "CURRENT"
+# Prefix of version directories still being written; they are never loaded or pruned
+BUILDING_PREFIX = ".build-"
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    Computes the SHA-256 hash of a file, reading it in chunks.
+
+    Args:
+        path (str): Path to the file.
+        chunk_size (int): Bytes read at a time.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(model, source_hash, params):
+    """
+    Describes a saved model: artifact version, model class, source data hash and build parameters.
+
+    Args:
+        model (str): Name of the model class.
+        source_hash (str): Hash of the data file the model was built from.
+        params (dict): JSON-serialisable parameters the model was built with.
+
+    Returns:
+        dict: Manifest to store next to the artifacts.
+    """
+    return {
+        "artifact_version": ARTIFACT_VERSION,
+        "model": model,
+        "source_hash": source_hash,
+        "params": params,
+    }
+
+
+def write_manifest(directory, manifest):
+    # Written last when saving, so a directory without a manifest is never loaded
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def remove_manifest(directory):
+    # Removed first when saving, so a partially written directory is treated as stale
+    path = os.path.join(directory, MANIFEST_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def read_manifest(directory):
+    """
+    Reads the manifest of a saved model.
+
+    Args:
+        directory (str): Artifact directory.
+
+    Returns:
+        dict or None: The manifest, or None if the directory holds no artifacts.
+    """
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def is_stale(directory, model, source_path, params):
+    """
+    Checks whether saved artifacts are missing or were built from other data, parameters or layout.
+
+    Args:
+        directory (str): Artifact directory.
+        model (str): Name of the model class.
+        source_path (str): Path to the current source data file.
+        params (dict): Parameters the model should be built with.
+
+    Returns:
+        bool: True if the artifacts must be rebuilt.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return True
+    return manifest != build_manifest(model, file_hash(source_path), params)
+
+
+@contextmanager
+def _versions_lock(directory):
+    # Serialises publishing and pruning across processes (Gunicorn workers rebuild independently)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def current_version(directory):
+    """
+    Returns the published version directory of an artifact directory.
+
+    Each build is saved to its own version directory and published by atomically
+    replacing the CURRENT file, so files a served model has memory-mapped are never
+    overwritten.
+
+    Args:
+        directory (str): Artifact directory.
+
+    Returns:
+        str or None: Path of the published version, or None if nothing was published yet.
+    """
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), "r") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    version_dir = os.path.join(directory, name)
+    return version_dir if name and os.path.isdir(version_dir) else None
+
+
+def new_version_dir(directory, source_hash):
+    """
+    Returns a fresh directory to save a build to, before `publish_version` makes it current.
+
+    Args:
+        directory (str): Artifact directory.
+        source_hash (str): Hash of the data the model was built from, used in the version name.
+
+    Returns:
+        str: Path of a hidden directory that does not exist yet.
+    """
+    return os.path.join(directory, f"{BUILDING_PREFIX}{source_hash[:12]}-{os.getpid()}-{time.time_ns()}")
+
+
+def publish_version(directory, building_dir):
+    """
+    Makes a saved build the current version: the build directory loses its hidden prefix
+    and CURRENT is replaced with a single os.replace.
+
+    Args:
+        directory (str): Artifact directory.
+        building_dir (str): Directory returned by `new_version_dir`, with the model saved to it.
+
+    Returns:
+        str: Path of the published version directory.
+    """
+    name = os.path.basename(building_dir)[len(BUILDING_PREFIX):]
+    version_dir = os.path.join(directory, name)
+    with _versions_lock(directory):
+        os.rename(building_dir, version_dir)
+        tmp_path = os.path.join(directory, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(name)
+        os.replace(tmp_path, os.path.join(directory, CURRENT_FILE))
+    return version_dir
+
+
+def prune_versions(directory, keep=()):
+    """
+    Deletes the version directories other than the current one and those in `keep`.
+
+    Call it only once no served model uses the old versions any more, i.e. after the
+    bundle loaded from them has been swapped out. Memory maps still open in in-flight
+    requests stay valid, since unlinked files live on until they are unmapped.
+
+    Args:
+        directory (str): Artifact directory.
+        keep (iterable): Version directories to keep as well.
+
+    Returns:
+        int: Number of versions deleted.
+    """
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    with _versions_lock(directory):
+        current = current_version(directory)
+        keep = {os.path.abspath(path) for path in keep if path}
+        if current is not None:
+            keep.add(os.path.abspath(current))
+        for entry in os.scandir(directory):
+            if entry.is_dir() and not entry.name.startswith(".") and os.path.abspath(entry.path) not in keep:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+    return removed
+
+
+def save_array(directory, name, array):
+    np.save(os.path.join(directory, f"{name}.npy"), np.asarray(array))
+
+
+def load_array(directory, name, mmap_mode=None):
+    return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+
+
+def save_csr_arrays(directory, name, matrix):
+    """
+    Saves a CSR matrix as separate .npy arrays so it can be memory-mapped back.
+
+    Args:
+        directory (str): Artifact directory.
+        name (str): Prefix of the array files.
+        matrix (scipy.sparse matrix): Matrix to save.
+    """
+    matrix = sp.csr_matrix(matrix)
+    save_array(directory, f"{name}_data", matrix.data)
+    save_array(directory, f"{name}_indices", matrix.indices)
+    save_array(directory, f"{name}_indptr", matrix.indptr)
+    save_array(directory, f"{name}_shape", np.array(matrix.shape, dtype=np.int64))
+
+
+def load_csr_arrays(directory, name, mmap_mode=None):
+    """
+    Loads a CSR matrix saved with `save_csr_arrays`; with mmap_mode='r' its arrays stay memory-mapped.
+
+    Args:
+        directory (str): Artifact directory.
+        name (str): Prefix of the array files.
+        mmap_mode (str): numpy memory-map mode.
+
+    Returns:
+        scipy.sparse.csr_matrix: The loaded (read-only when memory-mapped) matrix.
+    """
+    shape = tuple(int(size) for size in load_array(directory, f"{name}_shape"))
+    return sp.csr_matrix(
+        (
+            load_array(directory, f"{name}_data", mmap_mode),
+            load_array(directory, f"{name}_indices", mmap_mode),
+            load_array(directory, f"{name}_indptr", mmap_mode),
+        ),
+        shape=shape
+    )
+
+
+def _json_value(value):
+    # Missing values become null; objects JSON cannot hold (such as dicts) are stored as their string form
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NaT:
+        return None
+    return value if isinstance(value, (str, int, float, bool)) else str(value)
+
+
+def save_frame(directory, name, df):
+    """
+    Saves a DataFrame without pickle: numeric, boolean and datetime columns as .npy arrays,
+    the other columns as JSON lists, plus a JSON file with the column order and dtypes.
+
+    Args:
+        directory (str): Artifact directory.
+        name (str): Prefix of the saved files.
+        df (pd.DataFrame): Frame to save; its index is not kept.
+    """
+    columns, text = [], {}
+    for position, column in enumerate(df.columns):
+        values = df[column]
+        if isinstance(values.dtype, np.dtype) and values.dtype.kind in "biufM":
+            save_array(directory, f"{name}_{position}", values.to_numpy())
+            columns.append({"name": column, "dtype": str(values.dtype), "stored": "npy"})
+        else:
+            text[str(position)] = [_json_value(value) for value in values.astype(object)]
+            columns.append({"name": column, "dtype": str(values.dtype), "stored": "json"})
+    with open(os.path.join(directory, f"{name}.json"), "w") as f:
+        json.dump({"rows": len(df), "columns": columns, "text": text}, f)
+
+
+def load_frame(directory, name, mmap_mode=None):
+    """
+    Loads a DataFrame saved with `save_frame`.
+
+    Args:
+        directory (str): Artifact directory.
+        name (str): Prefix of the saved files.
+        mmap_mode (str): numpy memory-map mode for the .npy columns.
+
+    Returns:
+        pd.DataFrame: The frame, with its column order and dtypes.
+    """
+    with open(os.path.join(directory, f"{name}.json"), "r") as f:
+        layout = json.load(f)
+    data = {}
+    for position, column in enumerate(layout["columns"]):
+        if column["stored"] == "npy":
+            data[column["name"]] = load_array(directory, f"{name}_{position}", mmap_mode)
+        else:
+            values = pd.Series(layout["text"][str(position)], dtype=object)
+            values = values.where(values.notna(), np.nan)
+            data[column["name"]] = values if column["dtype"] == "object" else values.astype(column["dtype"])
+    return pd.DataFrame(data, index=pd.RangeIndex(layout["rows"]))
@@ -1,9 +1,71 @@
+import os
+import threading
+import numpy as np
 import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
+import scipy.sparse as sp
+from .artifacts import (
+    build_manifest, current_version, file_hash, is_stale, load_array, load_csr_arrays, new_version_dir,
+    publish_version, read_manifest, remove_manifest, save_array, save_csr_arrays, write_manifest
+)
+from .datasets import INTERACTION_COLUMNS, load_dataset
+from .fusion import RankedList
+from .neighbors import build_neighbor_index, neighbor_similarity_matrix
+from .signals import INTERACTION_WEIGHTS, InteractionSignals
+from .similarity import cooccurrence_matrix, cosine_rows, top_k_per_row, top_n_indices
+
+
+class UserPostMatrix:
+    """
+    Sparse users x posts interaction matrix labelled with user and post ids.
+
+    Exposes the `index`, `columns`, `shape` and `empty` attributes of the pandas
+    pivot table it replaces, so membership checks such as
+    `user_id in user_post_matrix.index` keep working.
+    """
+    def __init__(self, matrix, user_ids, post_ids):
+        self.matrix = matrix
+        self.index = pd.Index(user_ids, name='user_id')
+        self.columns = pd.Index(post_ids, name='post_id')
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    @property
+    def empty(self):
+        return self.matrix.shape[0] == 0 or self.matrix.shape[1] == 0
+
+
+def _remap(matrix, row_positions, column_positions, shape):
+    # Moves the rows and columns of a sparse matrix to new positions in a larger matrix
+    if matrix.shape == shape:
+        return sp.csr_matrix(matrix)
+    matrix = sp.coo_matrix(matrix)
+    return sp.csr_matrix((matrix.data, (row_positions[matrix.row], column_positions[matrix.col])), shape=shape)
+
 
 class CollaborativeRecommender:
-    def __init__(self, interactions_path):
-        self.interactions_df = pd.read_csv(interactions_path)
+    def __init__(self, interactions_path, n_neighbors=100, index_backend='exact', index_params=None,
+                 interaction_weights=None, half_life_days=30.0):
+        """
+        Args:
+            interactions_path (str): Path to the interactions dataset (.csv, .parquet or .feather).
+            n_neighbors (int): Neighbours kept per post.
+            index_backend (str): 'exact' cosine similarity, or a neighbour-index backend.
+            index_params (dict): Parameters of the neighbour index.
+            interaction_weights (dict): Signal weight per interaction_type; defaults to INTERACTION_WEIGHTS.
+            half_life_days (float): Half-life of the signal weights in days; None disables the decay.
+        """
+        self.interactions_path = interactions_path
+        self.source_hash = file_hash(interactions_path)
+        self.interactions_df = load_dataset(interactions_path, columns=INTERACTION_COLUMNS)
+        self.n_neighbors = n_neighbors
+        self.index_backend = index_backend
+        self.index_params = index_params or {}
+        self.interaction_weights = dict(INTERACTION_WEIGHTS if interaction_weights is None else interaction_weights)
+        self.half_life_days = half_life_days
+        self._update_lock = threading.Lock()
+        self._state_lock = threading.Lock()
         # print(f"Interactions DataFrame Loaded: {self.interactions_df.shape} rows, columns: {self.interactions_df.columns.tolist()}")
         # print(self.interactions_df.head())  # Display the first few rows for validation
         self._prepare_data()
@@ -18,39 +80,379 @@ class CollaborativeRecommender:
         self.interactions_df['user_id'] = self.interactions_df['user_id'].astype(int)
         self.interactions_df['post_id'] = self.interactions_df['post_id'].astype(int)
 
-        # Create user-post interaction matrix
-        self.user_post_matrix = self.interactions_df.pivot_table(
-            index='user_id', columns='post_id', values='interaction_type',
-            aggfunc=lambda x: 1 if len(x) > 0 else 0
-        ).fillna(0)
+        # Weighted, time-decayed user-post signal matrix, with sorted user and post id maps
+        signals = self.signals().build(self.interactions_df)
+        self.user_ids, self.post_ids, self.as_of = signals.user_ids, signals.post_ids, signals.as_of
+        interaction_matrix = signals.matrix
+        self.interaction_matrix = interaction_matrix
+        self.user_post_matrix = UserPostMatrix(interaction_matrix, self.user_ids, self.post_ids)
         # print(f"User-Post Matrix Shape: {self.user_post_matrix.shape}")
-        # print("User-Post Interaction Matrix (First Few Rows):")
-        # print(self.user_post_matrix.head())
 
-        # Compute item-item similarity
-        self.item_similarity_matrix = cosine_similarity(self.user_post_matrix.T)
+        # Compute item-item similarity, keeping only the top neighbours of every post
+        self.cooccurrence, self.item_norms = None, None
+        if self.index_backend == 'exact':
+            # The co-occurrence counts and norms are kept for apply_interactions
+            self.cooccurrence = cooccurrence_matrix(interaction_matrix)
+            self.item_norms = np.sqrt(self.cooccurrence.diagonal())
+            self.item_similarity_matrix = cosine_rows(self.cooccurrence, self.item_norms, self.n_neighbors)
+        else:
+            # Approximate neighbour lists from an index over the post (column) vectors
+            item_index = build_neighbor_index(self.index_backend, interaction_matrix.T, **self.index_params)
+            self.item_similarity_matrix = neighbor_similarity_matrix(item_index, self.n_neighbors)
         # print(f"Item-Item Similarity Matrix Shape: {self.item_similarity_matrix.shape}")
 
+    def signals(self):
+        # Signal builder with the model's weights and half-life
+        return InteractionSignals(self.interaction_weights, self.half_life_days)
+
+    @staticmethod
+    def _artifact_params(n_neighbors=100, index_backend='exact', index_params=None, interaction_weights=None,
+                         half_life_days=30.0):
+        # Parameters recorded in the artifact manifest
+        return {
+            "n_neighbors": n_neighbors, "index_backend": index_backend, "index_params": index_params or {},
+            "interaction_weights": dict(INTERACTION_WEIGHTS if interaction_weights is None else interaction_weights),
+            "half_life_days": half_life_days
+        }
+
+    @classmethod
+    def build(cls, interactions_path, **kwargs):
+        """
+        Builds the model from an interactions dataset file (same as calling the constructor).
+        """
+        return cls(interactions_path, **kwargs)
+
+    def save(self, directory):
+        """
+        Saves the model artifacts to a directory.
+
+        The directory holds the user-post signal matrix (.npz), the user and post id maps,
+        the signal reference time and the item neighbour table as CSR arrays (.npy), plus a
+        manifest with the artifact version, source data hash and build parameters.
+
+        Args:
+            directory (str): Artifact directory.
+        """
+        os.makedirs(directory, exist_ok=True)
+        remove_manifest(directory)
+
+        sp.save_npz(os.path.join(directory, "interaction_matrix.npz"), self.interaction_matrix)
+        save_array(directory, "user_ids", self.user_ids)
+        save_array(directory, "post_ids", self.post_ids)
+        save_array(directory, "as_of", np.array([pd.Timestamp(self.as_of).to_datetime64()], dtype='datetime64[ns]'))
+        save_csr_arrays(directory, "item_similarity", self.item_similarity_matrix)
+
+        params = self._artifact_params(
+            self.n_neighbors, self.index_backend, self.index_params, self.interaction_weights, self.half_life_days
+        )
+        write_manifest(directory, build_manifest(type(self).__name__, self.source_hash, params))
+        print(f"Saved {type(self).__name__} artifacts to {directory}")
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Loads model artifacts saved with `save`.
+
+        The raw interactions are not part of the artifacts, so `interactions_df` is None
+        on a loaded model.
+
+        Args:
+            directory (str): Artifact directory.
+            mmap_mode (str): numpy memory-map mode for the .npy arrays; 'r' lets forked workers share pages.
+
+        Returns:
+            CollaborativeRecommender: The loaded model.
+        """
+        manifest = read_manifest(directory)
+        if manifest is None:
+            raise FileNotFoundError(f"No model artifacts found in {directory}")
+
+        params = manifest["params"]
+        model = cls.__new__(cls)
+        model.interactions_path = None
+        model.source_hash = manifest["source_hash"]
+        model.interactions_df = None
+        model.n_neighbors = params["n_neighbors"]
+        model.index_backend = params["index_backend"]
+        model.index_params = params["index_params"]
+        model.interaction_weights = params["interaction_weights"]
+        model.half_life_days = params["half_life_days"]
+        model._update_lock = threading.Lock()
+        model._state_lock = threading.Lock()
+        # Co-occurrence counts are recomputed from the interaction matrix on the first apply_interactions
+        model.cooccurrence, model.item_norms = None, None
+
+        model.user_ids = load_array(directory, "user_ids", mmap_mode)
+        model.post_ids = load_array(directory, "post_ids", mmap_mode)
+        as_of = pd.Timestamp(load_array(directory, "as_of")[0])
+        model.as_of = None if pd.isna(as_of) else as_of
+        model.interaction_matrix = sp.load_npz(os.path.join(directory, "interaction_matrix.npz")).tocsr()
+        model.user_post_matrix = UserPostMatrix(model.interaction_matrix, model.user_ids, model.post_ids)
+        model.item_similarity_matrix = load_csr_arrays(directory, "item_similarity", mmap_mode)
+        return model
+
+    @classmethod
+    def load_or_build(cls, interactions_path, directory, mmap_mode='r', **kwargs):
+        """
+        Loads saved artifacts, rebuilding and saving them first if they are missing or stale.
+
+        Artifacts are stale when their version, source data hash or build parameters
+        differ from the current ones.
+
+        Args:
+            interactions_path (str): Path to the interactions dataset (.csv, .parquet or .feather).
+            directory (str): Artifact directory; each rebuild is saved to a new version directory
+                inside it and published atomically, so served models are never overwritten.
+            mmap_mode (str): numpy memory-map mode used when loading.
+            **kwargs: Constructor parameters.
+
+        Returns:
+            CollaborativeRecommender: The loaded or freshly built model.
+        """
+        version_dir = current_version(directory)
+        if version_dir is None or is_stale(version_dir, cls.__name__, interactions_path, cls._artifact_params(**kwargs)):
+            print(f"Model artifacts in {directory} are missing or stale. Rebuilding.")
+            model = cls.build(interactions_path, **kwargs)
+            # Saved to a new version directory: the files of the current one may be memory-mapped
+            building_dir = new_version_dir(directory, model.source_hash)
+            model.save(building_dir)
+            publish_version(directory, building_dir)
+            return model
+        return cls.load(version_dir, mmap_mode=mmap_mode)
+
+    def snapshot(self):
+        """
+        Returns:
+            tuple: (user_post_matrix, item_similarity_matrix) of the same model state, so a reader
+                never mixes the matrices of two different `apply_interactions` calls.
+        """
+        with self._state_lock:
+            return self.user_post_matrix, self.item_similarity_matrix
+
+    def apply_interactions(self, events):
+        """
+        Folds new interaction events into the model without a full rebuild.
+
+        The events are weighted like the rest of the signal matrix and added to it; when they
+        are newer than `as_of`, the existing signals are first decayed to the newest event
+        (see `decay_to`). The co-occurrences (X^T X) are updated from the rows of the users
+        with new interactions only, and the neighbour lists are recomputed only for the posts
+        whose similarities changed: the posts with new interactions and the posts that
+        co-occur with them. New users and posts are inserted into the sorted id maps.
+
+        Args:
+            events (pd.DataFrame or list): New interactions with user_id and post_id, plus
+                interaction_type, rating_percent and timestamp columns.
+
+        Returns:
+            CollaborativeRecommender: self, for chaining.
+        """
+        if self.index_backend != 'exact':
+            raise ValueError("apply_interactions needs the 'exact' index backend.")
+
+        events = pd.DataFrame(events)
+        if events.empty or not {'user_id', 'post_id'}.issubset(events.columns):
+            return self
+
+        with self._update_lock:
+            events = events.dropna(subset=['user_id', 'post_id'])
+            event_users = events['user_id'].astype(np.int64).to_numpy()
+            event_posts = events['post_id'].astype(np.int64).to_numpy()
+
+            if self.cooccurrence is None:
+                self.cooccurrence = cooccurrence_matrix(self.interaction_matrix)
+                self.item_norms = np.sqrt(self.cooccurrence.diagonal())
+
+            # Age the existing signals to the newest event; cosine similarities do not change
+            signals = self.signals()
+            weights, as_of = signals.event_weights(events, self.as_of)
+            factor = 1.0
+            if self.as_of is not None and as_of is not None and as_of > self.as_of:
+                factor = signals.decay_factor((as_of - self.as_of) / pd.Timedelta(days=1))
+
+            # Insert new ids into the sorted id maps, moving the existing rows and columns
+            user_ids = np.union1d(np.asarray(self.user_ids, dtype=np.int64), event_users)
+            post_ids = np.union1d(np.asarray(self.post_ids, dtype=np.int64), event_posts)
+            user_moves = np.searchsorted(user_ids, self.user_ids)
+            post_moves = np.searchsorted(post_ids, self.post_ids)
+            interaction_matrix = _remap(self.interaction_matrix, user_moves, post_moves, (user_ids.size, post_ids.size))
+            cooccurrence = _remap(self.cooccurrence, post_moves, post_moves, (post_ids.size, post_ids.size))
+            item_similarity_matrix = _remap(self.item_similarity_matrix, post_moves, post_moves, (post_ids.size, post_ids.size))
+            if factor != 1.0:
+                interaction_matrix = interaction_matrix * np.float32(factor)
+                cooccurrence = cooccurrence * np.float32(factor * factor)
+
+            delta = sp.csr_matrix(
+                (weights.astype(np.float32), (np.searchsorted(user_ids, event_users), np.searchsorted(post_ids, event_posts))),
+                shape=interaction_matrix.shape
+            )
+            delta.sum_duplicates()
+            delta.eliminate_zeros()
+
+            if delta.nnz:
+                # Co-occurrence changes come only from the rows of the users with new interactions
+                affected_users = np.unique(delta.nonzero()[0])
+                old_rows = interaction_matrix[affected_users]
+                interaction_matrix = (interaction_matrix + delta).tocsr()
+                new_rows = interaction_matrix[affected_users]
+                cooccurrence = (cooccurrence + (new_rows.T @ new_rows - old_rows.T @ old_rows)).tocsr()
+
+                # Posts with new interactions change their norms, so every post co-occurring with them is affected
+                changed_posts = np.unique(delta.indices)
+                affected = np.union1d(changed_posts, cooccurrence[changed_posts].indices)
+                rows = cosine_rows(cooccurrence, np.sqrt(cooccurrence.diagonal()), self.n_neighbors, affected)
+
+                unchanged = np.ones(post_ids.size, dtype=np.float32)
+                unchanged[affected] = 0.0
+                item_similarity_matrix = (sp.diags(unchanged) @ item_similarity_matrix).tocsr()
+                item_similarity_matrix.eliminate_zeros()
+                scatter = sp.csr_matrix(
+                    (np.ones(affected.size, dtype=np.float32), (affected, np.arange(affected.size))),
+                    shape=(post_ids.size, affected.size)
+                )
+                item_similarity_matrix = (item_similarity_matrix + scatter @ rows).tocsr()
+
+            if self.interactions_df is not None:
+                self.interactions_df = pd.concat([self.interactions_df, events], ignore_index=True)
+
+            with self._state_lock:
+                self.as_of = as_of
+                self.user_ids = user_ids
+                self.post_ids = post_ids
+                self.interaction_matrix = interaction_matrix
+                self.cooccurrence = cooccurrence
+                self.item_norms = np.sqrt(cooccurrence.diagonal())
+                self.item_similarity_matrix = item_similarity_matrix
+                self.user_post_matrix = UserPostMatrix(interaction_matrix, user_ids, post_ids)
+        return self
+
+    def decay_to(self, as_of):
+        """
+        Ages the signal matrix to a later time, e.g. once a day, without going back to the raw events.
+
+        Every weight decays by the same factor, so the user-post matrix and the co-occurrences
+        are only rescaled (and the norms with them); the cosine neighbour lists stay as they are.
+
+        Args:
+            as_of (pd.Timestamp): New reference time; earlier times are ignored.
+
+        Returns:
+            float: The factor applied to the signals.
+        """
+        with self._update_lock:
+            as_of = pd.Timestamp(as_of)
+            if self.as_of is None or as_of <= self.as_of:
+                return 1.0
+            factor = self.signals().decay_factor((as_of - self.as_of) / pd.Timedelta(days=1))
+            interaction_matrix = self.interaction_matrix * np.float32(factor)
+            cooccurrence = None if self.cooccurrence is None else self.cooccurrence * np.float32(factor * factor)
+
+            with self._state_lock:
+                self.as_of = as_of
+                self.interaction_matrix = interaction_matrix
+                self.cooccurrence = cooccurrence
+                self.item_norms = None if self.item_norms is None else self.item_norms * factor
+                self.user_post_matrix = UserPostMatrix(interaction_matrix, self.user_ids, self.post_ids)
+        return factor
+
+    def rank(self, user_id, top_n=10):
+        """
+        Ranks unseen posts for a user.
+
+        Args:
+            user_id: User to recommend posts for.
+            top_n (int): Number of posts to return.
+
+        Returns:
+            RankedList: Post ids and scores, empty for unknown users.
+        """
+        user_post_matrix, item_similarity_matrix = self.snapshot()
+        if user_id not in user_post_matrix.index:
+            return RankedList.empty()
+
+        user_row = user_post_matrix.matrix[user_post_matrix.index.get_loc(user_id)]
+
+        if user_row.nnz == 0:
+            return RankedList.empty()
+
+        # Score every post with a single sparse matrix-vector product
+        scores = user_row.dot(item_similarity_matrix).toarray().ravel()
+
+        # Mask posts the user has already interacted with
+        seen = np.zeros(scores.size, dtype=bool)
+        seen[user_row.indices] = True
+        scores[seen] = 0.0
+
+        # Retrieve top recommendations
+        top_indices = top_n_indices(scores, top_n)
+        top_indices = top_indices[scores[top_indices] > 0]
+
+        post_ids = user_post_matrix.columns.values
+        return RankedList(post_ids[top_indices].astype(np.int64), scores[top_indices].astype(np.float64))
+
+    def score_candidates(self, user_id, post_ids):
+        """
+        Scores the given posts for a user, as `rank` scores every post.
+
+        Only the similarity columns of the given posts are read.
+
+        Args:
+            user_id: User to score for.
+            post_ids (np.ndarray): Posts to score.
+
+        Returns:
+            tuple: (scores, seen) arrays aligned with post_ids. Scores are NaN where `rank` would
+                not return the post (unknown user or post, or no positive score); seen flags the
+                posts the user interacted with.
+        """
+        post_ids = np.asarray(post_ids, dtype=np.int64)
+        scores = np.full(post_ids.size, np.nan)
+        seen = np.zeros(post_ids.size, dtype=bool)
+        user_post_matrix, item_similarity_matrix = self.snapshot()
+        if user_id not in user_post_matrix.index:
+            return scores, seen
+
+        user_row = user_post_matrix.matrix[user_post_matrix.index.get_loc(user_id)]
+        positions = user_post_matrix.columns.get_indexer(post_ids)
+        known = positions >= 0
+        seen[known] = np.isin(positions[known], user_row.indices)
+        if user_row.nnz and known.any():
+            # The user's interactions times the similarity columns of the given posts only
+            neighbourhood = item_similarity_matrix[user_row.indices][:, positions[known]]
+            known_scores = np.asarray(neighbourhood.T @ user_row.data).ravel()
+            scores[known] = np.where(known_scores > 0, known_scores, np.nan)
+        return scores, seen
+
     def recommend(self, user_id, top_n=10):
-        if user_id not in self.user_post_matrix.index:
-            return pd.DataFrame(columns=["post_id", "score"])
-
-        user_interactions = self.user_post_matrix.loc[user_id]
-        interacted_posts = user_interactions[user_interactions > 0].index.tolist()
-
-        if not interacted_posts:
-            return pd.DataFrame(columns=["post_id", "score"])
-
-        # Compute scores for all posts
-        scores = {}
-        for post_id in interacted_posts:
-            post_idx = self.user_post_matrix.columns.get_loc(post_id)
-            similar_posts = self.item_similarity_matrix[post_idx]
-            for idx, score in enumerate(similar_posts):
-                if self.user_post_matrix.columns[idx] not in interacted_posts:
-                    scores[self.user_post_matrix.columns[idx]] = scores.get(self.user_post_matrix.columns[idx], 0) + score
-
-        # Sort scores and retrieve top recommendations
-        recommendations = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_n]
-        recommendations_df = pd.DataFrame(recommendations, columns=["post_id", "score"])
-        return recommendations_df
+        return self.rank(user_id, top_n=top_n).to_frame()
+
+    def recommend_many(self, user_ids, top_n=10):
+        """
+        Recommends posts for a batch of users with one sparse matrix-matrix product.
+
+        Args:
+            user_ids (iterable): User ids to score. Unknown users are skipped.
+            top_n (int): Number of recommendations per user.
+
+        Returns:
+            pd.DataFrame: Columns user_id, post_id and score, ranked per user.
+        """
+        user_post_matrix, item_similarity_matrix = self.snapshot()
+        user_positions = user_post_matrix.index.get_indexer(np.asarray(list(user_ids)))
+        user_positions = user_positions[user_positions >= 0]
+
+        if user_positions.size == 0:
+            return pd.DataFrame(columns=["user_id", "post_id", "score"])
+
+        user_rows = user_post_matrix.matrix[user_positions]
+        scores = user_rows.dot(item_similarity_matrix).tocsr()
+
+        # Drop posts each user has already interacted with
+        scores = scores - scores.multiply(user_rows > 0)
+
+        rows, columns, values = top_k_per_row(scores, top_n)
+        return pd.DataFrame({
+            "user_id": user_post_matrix.index.values[user_positions[rows]].astype(int),
+            "post_id": user_post_matrix.columns.values[columns].astype(int),
+            "score": values.astype(float)
+        })
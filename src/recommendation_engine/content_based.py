@@ -1,26 +1,106 @@
+import os
+import json
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 from scipy.sparse import hstack
 import string
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import TreebankWordTokenizer
 from nltk.stem import WordNetLemmatizer
+from .artifacts import (
+    build_manifest, current_version, file_hash, is_stale, load_array, load_frame, new_version_dir, publish_version,
+    read_manifest, remove_manifest, save_array, save_frame, write_manifest
+)
+from .datasets import CONTENT_COLUMNS, load_dataset
+from .fusion import RankedList
+from .neighbors import build_neighbor_index, load_neighbor_index
+from .post_index import InvertedPostIndex
+from .similarity import top_k_dense_rows, top_k_neighbors
 
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from scipy.sparse import hstack
-import string
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import TreebankWordTokenizer
-from nltk.stem import WordNetLemmatizer
+# Punctuation removal table and size of the lemmatized-token memo
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+LEMMA_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=None)
+def _text_resources():
+    # The NLTK tokenizer, lemmatizer and stop words are built once per process
+    return TreebankWordTokenizer(), WordNetLemmatizer(), frozenset(stopwords.words('english'))
+
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def _lemmatize(token):
+    return _text_resources()[1].lemmatize(token)
+
+
+def preprocess_title(text):
+    """
+    Cleans, tokenizes, removes stop words from and lemmatizes a post title.
+
+    Args:
+        text (str): Raw title; NaN or None become an empty string.
+
+    Returns:
+        str: Space-separated lemmatized tokens.
+    """
+    # Ensure the text is a string, and handle NaN or None values
+    if not isinstance(text, str):
+        text = str(text) if text is not None else ""  # Convert to empty string if None
+
+    # Text cleaning and tokenization
+    text = text.lower().translate(PUNCTUATION_TABLE)
+
+    # Tokenization and Lemmatization
+    tokenizer, _, stop_words = _text_resources()
+    tokens = [word for word in tokenizer.tokenize(text) if word not in stop_words]
+
+    return ' '.join(_lemmatize(token) for token in tokens)
+
+
+def preprocess_titles(titles, n_jobs=1, chunksize=2000):
+    """
+    Preprocesses a sequence of titles, optionally across a process pool.
+
+    Args:
+        titles (iterable): Raw titles.
+        n_jobs (int): Number of worker processes; 1 preprocesses in this process.
+        chunksize (int): Titles sent to a worker at a time.
+
+    Returns:
+        list: Preprocessed titles, in input order.
+    """
+    titles = list(titles)
+    if n_jobs <= 1 or len(titles) <= chunksize:
+        return [preprocess_title(title) for title in titles]
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        return list(executor.map(preprocess_title, titles, chunksize=chunksize))
+
+
+# 'on_demand' queries the neighbour index at request time,
+# 'precomputed' looks neighbours up in a top-K table built at load time.
+SIMILARITY_MODES = ('on_demand', 'precomputed')
 
 class ContentBasedRecommender:
-    def __init__(self, posts_path):
-        self.posts_df = pd.read_csv(posts_path)
+    def __init__(self, posts_path, similarity_mode='on_demand', n_neighbors=50, index_backend='exact', index_params=None,
+                 n_jobs=1):
+        if similarity_mode not in SIMILARITY_MODES:
+            raise ValueError(f"similarity_mode must be one of {SIMILARITY_MODES}, got '{similarity_mode}'.")
+
+        self.similarity_mode = similarity_mode
+        self.n_neighbors = n_neighbors
+        self.index_backend = index_backend
+        self.index_params = index_params or {}
+        self.n_jobs = n_jobs
+        self.posts_path = posts_path
+        self.source_hash = file_hash(posts_path)
+        self.posts_df = load_dataset(posts_path, columns=CONTENT_COLUMNS)
 
         # Inspect the first few rows to verify correct loading
         print(self.posts_df.head())
@@ -43,11 +123,19 @@ class ContentBasedRecommender:
             self.category_encoded = None
             self.moods_encoded = None
             self.combined_features = None
-            self.similarity_matrix = None
+            self.neighbor_index = None
+            self.neighbor_indices = None
+            self.neighbor_scores = None
+            self.post_positions = {}
+            self._sorted_post_ids = np.empty(0, dtype=np.int64)
+            self._sorted_post_positions = np.empty(0, dtype=np.int64)
+            self._build_post_index()
             return
 
+        self._index_posts()
+
         # Preprocess text for titles
-        self.posts_df['processed_title'] = self.posts_df['title'].apply(self._preprocess_text)
+        self.posts_df['processed_title'] = preprocess_titles(self.posts_df['title'], n_jobs=self.n_jobs)
 
         # Vectorize titles using TF-IDF
         self.tfidf = TfidfVectorizer()
@@ -59,97 +147,327 @@ class ContentBasedRecommender:
         # Process moods: handle NaN or non-string values and vectorize
         self.posts_df['moods'] = self.posts_df['moods'].fillna("").astype(str)  # Ensure all values are strings
         self.posts_df['processed_moods'] = self.posts_df['moods'].apply(lambda x: ' '.join(x.split(',')))  # Treat as text
-        self.moods_tfidf_matrix = self.tfidf.fit_transform(self.posts_df['processed_moods'])
-
-        # Combine all features (Title + Category + Moods)
-        self.combined_features = hstack([self.title_tfidf_matrix, self.category_encoded.values, 0.5 * self.moods_tfidf_matrix])
-
-        # Compute similarity matrix (cosine similarity)
-        self.similarity_matrix = cosine_similarity(self.combined_features, self.combined_features)
+        self.moods_tfidf = TfidfVectorizer()
+        self.moods_tfidf_matrix = self.moods_tfidf.fit_transform(self.posts_df['processed_moods'])
+
+        # Combine all features (Title + Category + Moods), L2-normalised so a dot product is the cosine similarity
+        combined_features = hstack([
+            self.title_tfidf_matrix,
+            self.category_encoded.values.astype(float),
+            0.5 * self.moods_tfidf_matrix
+        ])
+        self.combined_features = normalize(combined_features.tocsr().astype(np.float32))
+
+        # Neighbour index used for on-demand queries ('exact' brute force or approximate 'ivf')
+        self.neighbor_index = build_neighbor_index(self.index_backend, self.combined_features, **self.index_params)
+
+        # Inverted category and mood index for filtered queries
+        self._build_post_index()
+
+        # Only the precomputed mode keeps a (posts x n_neighbors) table; no posts x posts matrix is ever stored
+        self.neighbor_indices = None
+        self.neighbor_scores = None
+        if self.similarity_mode == 'precomputed':
+            self.neighbor_indices, self.neighbor_scores = top_k_neighbors(self.combined_features, self.n_neighbors)
+
+    def _index_posts(self):
+        # Map post ids to row positions (first occurrence wins for duplicated ids)
+        positions = pd.Series(np.arange(len(self.posts_df)), index=self.posts_df['id'].values)
+        self.post_positions = positions[~positions.index.duplicated()].to_dict()
+
+        # Sorted id -> position arrays for vectorised lookups (a stable sort keeps the first occurrence first)
+        order = np.argsort(self.posts_df['id'].values, kind='stable')
+        self._sorted_post_ids = self.posts_df['id'].values[order]
+        self._sorted_post_positions = order
+
+    def positions_of(self, post_ids):
+        """
+        Maps post ids to their row positions in posts_df.
+
+        Args:
+            post_ids (iterable): Post ids.
+
+        Returns:
+            np.ndarray: Row positions, -1 for unknown posts.
+        """
+        post_ids = np.asarray(post_ids)
+        if self._sorted_post_ids.size == 0 or post_ids.size == 0:
+            return np.full(post_ids.size, -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(self._sorted_post_ids, post_ids), self._sorted_post_ids.size - 1)
+        return np.where(self._sorted_post_ids[found] == post_ids, self._sorted_post_positions[found], -1).astype(np.int64)
+
+    @staticmethod
+    def _artifact_params(similarity_mode='on_demand', n_neighbors=50, index_backend='exact', index_params=None, n_jobs=1):
+        # Parameters recorded in the artifact manifest (n_jobs does not change the built model)
+        return {
+            "similarity_mode": similarity_mode,
+            "n_neighbors": n_neighbors,
+            "index_backend": index_backend,
+            "index_params": index_params or {},
+        }
+
+    @classmethod
+    def build(cls, posts_path, **kwargs):
+        """
+        Builds the model from a posts dataset file (same as calling the constructor).
+        """
+        return cls(posts_path, **kwargs)
+
+    def save(self, directory):
+        """
+        Saves the model artifacts to a directory.
+
+        The directory holds the posts table (.npy columns and JSON, no pickle), the TF-IDF vocabularies and idf weights,
+        the feature matrix (.npz), the id map and neighbour tables (.npy) and the
+        neighbour index, plus a manifest with the artifact version, source data hash
+        and build parameters.
+
+        Args:
+            directory (str): Artifact directory.
+        """
+        os.makedirs(directory, exist_ok=True)
+        remove_manifest(directory)
+
+        save_frame(directory, "posts", self.posts_df)
+        if self.combined_features is not None:
+            with open(os.path.join(directory, "vocabulary.json"), "w") as f:
+                json.dump({
+                    "title": {term: int(column) for term, column in self.tfidf.vocabulary_.items()},
+                    "moods": {term: int(column) for term, column in self.moods_tfidf.vocabulary_.items()},
+                }, f)
+            save_array(directory, "title_idf", self.tfidf.idf_)
+            save_array(directory, "moods_idf", self.moods_tfidf.idf_)
+            sp.save_npz(os.path.join(directory, "combined_features.npz"), self.combined_features)
+            save_array(directory, "post_ids", self.posts_df['id'].values)
+            if self.neighbor_indices is not None:
+                save_array(directory, "neighbor_indices", self.neighbor_indices)
+                save_array(directory, "neighbor_scores", self.neighbor_scores)
+            self.neighbor_index.save(os.path.join(directory, "index"), include_vectors=False)
+
+        params = self._artifact_params(self.similarity_mode, self.n_neighbors, self.index_backend, self.index_params)
+        write_manifest(directory, build_manifest(type(self).__name__, self.source_hash, params))
+        print(f"Saved {type(self).__name__} artifacts to {directory}")
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Loads model artifacts saved with `save`.
+
+        Args:
+            directory (str): Artifact directory.
+            mmap_mode (str): numpy memory-map mode for the .npy arrays; 'r' lets forked workers share pages.
+
+        Returns:
+            ContentBasedRecommender: The loaded model.
+        """
+        manifest = read_manifest(directory)
+        if manifest is None:
+            raise FileNotFoundError(f"No model artifacts found in {directory}")
+
+        params = manifest["params"]
+        model = cls.__new__(cls)
+        model.similarity_mode = params["similarity_mode"]
+        model.n_neighbors = params["n_neighbors"]
+        model.index_backend = params["index_backend"]
+        model.index_params = params["index_params"]
+        model.n_jobs = 1
+        model.posts_path = None
+        model.source_hash = manifest["source_hash"]
+        model.posts_df = load_frame(directory, "posts")
+
+        if model.posts_df.empty:
+            model._prepare_data()
+            return model
+
+        model._index_posts()
+
+        with open(os.path.join(directory, "vocabulary.json"), "r") as f:
+            vocabulary = json.load(f)
+        model.tfidf = TfidfVectorizer(vocabulary=vocabulary["title"])
+        model.tfidf.idf_ = load_array(directory, "title_idf")
+        model.moods_tfidf = TfidfVectorizer(vocabulary=vocabulary["moods"])
+        model.moods_tfidf.idf_ = load_array(directory, "moods_idf")
+        model.title_tfidf_matrix = None
+        model.moods_tfidf_matrix = None
+        model.category_encoded = None
+        model.moods_encoded = None
+
+        model.combined_features = sp.load_npz(os.path.join(directory, "combined_features.npz")).tocsr()
+        model.neighbor_index = load_neighbor_index(
+            os.path.join(directory, "index"), mmap_mode=mmap_mode, vectors=model.combined_features
+        )
+        model.neighbor_indices = None
+        model.neighbor_scores = None
+        if model.similarity_mode == 'precomputed':
+            model.neighbor_indices = load_array(directory, "neighbor_indices", mmap_mode)
+            model.neighbor_scores = load_array(directory, "neighbor_scores", mmap_mode)
+
+        model._build_post_index()
+        return model
+
+    @classmethod
+    def load_or_build(cls, posts_path, directory, mmap_mode='r', **kwargs):
+        """
+        Loads saved artifacts, rebuilding and saving them first if they are missing or stale.
+
+        Artifacts are stale when their version, source data hash or build parameters
+        differ from the current ones.
+
+        Args:
+            posts_path (str): Path to the posts dataset (.csv, .parquet or .feather).
+            directory (str): Artifact directory; each rebuild is saved to a new version directory
+                inside it and published atomically, so served models are never overwritten.
+            mmap_mode (str): numpy memory-map mode used when loading.
+            **kwargs: Constructor parameters.
+
+        Returns:
+            ContentBasedRecommender: The loaded or freshly built model.
+        """
+        version_dir = current_version(directory)
+        if version_dir is None or is_stale(version_dir, cls.__name__, posts_path, cls._artifact_params(**kwargs)):
+            print(f"Model artifacts in {directory} are missing or stale. Rebuilding.")
+            model = cls.build(posts_path, **kwargs)
+            # Saved to a new version directory: the files of the current one may be memory-mapped
+            building_dir = new_version_dir(directory, model.source_hash)
+            model.save(building_dir)
+            publish_version(directory, building_dir)
+            return model
+        return cls.load(version_dir, mmap_mode=mmap_mode)
+
+    def _build_post_index(self):
+        self.post_index = InvertedPostIndex.from_posts(self.posts_df)
+        self._filter_masks = {}
+
+    def filter_mask(self, category_id=None, mood=None):
+        """
+        Builds the boolean mask of a filtered query from the inverted category and mood index.
+
+        Args:
+            category_id: Category id or category name to keep.
+            mood (str): Mood to keep; matches every mood token containing it, case-insensitively.
+
+        Returns:
+            np.ndarray or None: Boolean mask over posts_df rows, or None when no filter is given.
+        """
+        key = (category_id, mood)
+        if key not in self._filter_masks:
+            post_ids = self.post_index.lookup(category_id=category_id, mood=mood)
+            if post_ids is None:
+                return None
+            if len(self._filter_masks) >= 256:
+                self._filter_masks.clear()
+            mask = np.zeros(len(self.posts_df), dtype=bool)
+            mask[self.positions_of(post_ids)] = True
+            self._filter_masks[key] = mask
+        return self._filter_masks[key]
 
     def _preprocess_text(self, text):
-        # Ensure the text is a string, and handle NaN or None values
-        if not isinstance(text, str):
-            text = str(text) if text is not None else ""  # Convert to empty string if None
-
-        # Text cleaning and tokenization
-        text = text.lower().translate(str.maketrans('', '', string.punctuation))
-        
-        # Tokenization and Lemmatization
-        tokenizer = TreebankWordTokenizer()
-        lemmatizer = WordNetLemmatizer()
-        stop_words = set(stopwords.words('english'))
-
-        tokens = [word for word in tokenizer.tokenize(text) if word not in stop_words]
-        lemmatized = [lemmatizer.lemmatize(token) for token in tokens]
-
-        return ' '.join(lemmatized)
-
-    def recommend(self, post_id, top_n=10, category_id=None, mood=None):
-        if self.similarity_matrix is None:
-            print("Similarity matrix not computed. Unable to provide recommendations.")
-            return pd.DataFrame()
-
-        if post_id not in self.posts_df['id'].values:
+        return preprocess_title(text)
+
+    def _similar_posts(self, post_index, top_n, mask=None):
+        if self.similarity_mode == 'precomputed':
+            indices = self.neighbor_indices[post_index]
+            scores = self.neighbor_scores[post_index]
+            if mask is not None:
+                keep = mask[indices]
+                indices, scores = indices[keep], scores[keep]
+            if len(indices) >= top_n:
+                return indices[:top_n], scores[:top_n]
+            # The neighbour table is exhausted: fall back to scoring this post on demand
+
+        # Query one extra neighbour since the post itself is usually its own nearest neighbour
+        indices, scores = self.neighbor_index.query(self.combined_features[post_index], top_n + 1, mask)
+        keep = indices != post_index
+        return indices[keep][:top_n], scores[keep][:top_n]
+
+    def rank(self, post_id, top_n=10, category_id=None, mood=None):
+        """
+        Ranks the posts most similar to a given post.
+
+        Args:
+            post_id: Query post.
+            top_n (int): Number of posts to return.
+            category_id: Optional category id or name filter.
+            mood (str): Optional mood filter.
+
+        Returns:
+            RankedList: Post ids and scores, empty for unknown posts or when nothing matches the filters.
+        """
+        if self.combined_features is None:
+            print("Post features not computed. Unable to provide recommendations.")
+            return RankedList.empty()
+
+        if post_id not in self.post_positions:
             print(f"Post ID {post_id} not found in posts data.")
-            return pd.DataFrame(columns=['post_id', 'score'])
+            return RankedList.empty()
 
         # Locate the post index
-        post_index = self.posts_df[self.posts_df['id'] == post_id].index[0]
+        post_index = self.post_positions[post_id]
 
-        # Apply category and mood filtering before generating recommendations
-        filtered_posts = self.posts_df
+        # Apply category and mood filtering as a precomputed mask over the fixed feature matrix
+        mask = self.filter_mask(category_id=category_id, mood=mood)
 
-        if category_id:
-            # Check if category_name column exists and filter accordingly
-            if 'category_name' in filtered_posts.columns:
-                filtered_posts = filtered_posts[filtered_posts['category_name'] == category_id]  # Filter by category_name
-            else:
-                print("category_name column is not available for filtering.")
-                return pd.DataFrame()
-
-        if mood:
-            filtered_posts = filtered_posts[filtered_posts['moods'].str.contains(mood, case=False, na=False)]
-
-        if filtered_posts.empty:
+        if mask is not None and not mask.any():
             print(f"No posts found matching the category or mood filters.")
-            return pd.DataFrame(columns=['post_id', 'score'])
-
-        # Recalculate the similarity matrix for the filtered posts
-        filtered_title_tfidf_matrix = self.tfidf.transform(filtered_posts['processed_title'])
-        filtered_moods_tfidf_matrix = self.tfidf.transform(filtered_posts['processed_moods'])
-        filtered_combined_features = hstack([filtered_title_tfidf_matrix, self.category_encoded.loc[filtered_posts.index].values, 0.5 * filtered_moods_tfidf_matrix])
-        filtered_similarity_matrix = cosine_similarity(filtered_combined_features, filtered_combined_features)
-
-        # Calculate similarity scores for the filtered posts
-        similarity_scores = list(enumerate(filtered_similarity_matrix[post_index]))
-
-        # Sort and retrieve top N recommendations
-        similarity_scores = sorted(similarity_scores, key=lambda x: x[1], reverse=True)[1:top_n + 1]
-        recommendations = [filtered_posts.iloc[i[0]]['id'] for i in similarity_scores]
-
-        return pd.DataFrame({'post_id': recommendations, 'score': [score for _, score in similarity_scores]})
+            return RankedList.empty()
 
+        # Retrieve top N recommendations
+        indices, scores = self._similar_posts(post_index, top_n, mask)
+        return RankedList(self.posts_df['id'].values[indices], scores.astype(np.float64))
 
-    def _recommend_cold_start(self, user_mood, top_n):
-        # Normalize the user mood to lowercase
-        user_mood = user_mood.lower()
-
-        # Split the moods in the dataset into a list of individual moods
-        self.posts_df['moods_list'] = self.posts_df['moods'].apply(lambda x: [mood.strip().lower() for mood in x.split(',')] if isinstance(x, str) else [])
-
-        # Now check if the user mood is a substring of any post's moods list
-        matching_posts = self.posts_df[self.posts_df['moods_list'].apply(lambda moods: any(user_mood in mood for mood in moods))]
-
-        if matching_posts.empty:
-            print(f"No matching posts found for mood: {user_mood}")
+    def recommend(self, post_id, top_n=10, category_id=None, mood=None):
+        if self.combined_features is None:
+            print("Post features not computed. Unable to provide recommendations.")
             return pd.DataFrame()
 
-        # Create a score column for the cold start recommendations (for now, we set it to a constant value, e.g., 1.0)
-        matching_posts['score'] = 1.0  # You can modify this logic to assign different scores based on additional criteria
-
-        # Return the top N recommendations, sorted by score (descending)
-        recommendations = matching_posts[['id', 'score']].sort_values(by='score', ascending=False).head(top_n)
-        
-        # Reset index and return
-        return recommendations.reset_index(drop=True)
+        return self.rank(post_id, top_n=top_n, category_id=category_id, mood=mood).to_frame()
+
+    def recommend_many(self, post_ids, top_n=10, category_id=None, mood=None, batch_size=512):
+        """
+        Recommends similar posts for a batch of query posts with blocked sparse matrix products.
+
+        Args:
+            post_ids (iterable): Query post ids. Unknown posts are skipped.
+            top_n (int): Number of recommendations per query post.
+            category_id: Optional category id or name filter.
+            mood (str): Optional mood filter.
+            batch_size (int): Query posts scored per matrix product.
+
+        Returns:
+            pd.DataFrame: Columns query_post_id, post_id and score, ranked per query post.
+        """
+        columns = ['query_post_id', 'post_id', 'score']
+        if self.combined_features is None:
+            return pd.DataFrame(columns=columns)
+
+        query_ids = np.asarray(list(post_ids))
+        positions = self.positions_of(query_ids)
+        query_ids, positions = query_ids[positions >= 0], positions[positions >= 0]
+
+        mask = self.filter_mask(category_id=category_id, mood=mood)
+        n_candidates = len(self.posts_df) if mask is None else int(mask.sum())
+        k = min(top_n, n_candidates)
+        if positions.size == 0 or k == 0:
+            return pd.DataFrame(columns=columns)
+
+        features_t = self.combined_features.T.tocsc()
+        post_id_values = self.posts_df['id'].values
+        frames = []
+        for start in range(0, positions.size, batch_size):
+            batch = positions[start:start + batch_size]
+            block = (self.combined_features[batch] @ features_t).toarray()
+
+            # Exclude the query posts themselves and the filtered-out posts
+            block[np.arange(batch.size), batch] = -np.inf
+            if mask is not None:
+                block[:, ~mask] = -np.inf
+
+            indices, scores = top_k_dense_rows(block, k)
+            valid = np.isfinite(scores)
+            frames.append(pd.DataFrame({
+                'query_post_id': np.repeat(query_ids[start:start + batch_size], k)[valid.ravel()],
+                'post_id': post_id_values[indices[valid]],
+                'score': scores[valid].astype(float)
+            }))
+
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,194 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Processed dataset formats, picked by file extension; Parquet and Feather need pyarrow
+DATASET_FORMATS = ('csv', 'parquet', 'feather')
+
+# Columns each recommender reads from the processed datasets
+CONTENT_COLUMNS = (
+    'id', 'title', 'category_id', 'category_name', 'moods',
+    'total_views', 'total_likes', 'total_inspirations', 'total_ratings', 'average_rating_features'
+)
+INTERACTION_COLUMNS = (
+    'id', 'user_id', 'post_id', 'interaction_type', 'rating_percent',
+    'viewed_at', 'liked_at', 'inspired_at', 'rated_at'
+)
+
+# Compact dtypes of the columnar formats
+ID_COLUMNS = ('id', 'post_id', 'user_id', 'category_id')
+CATEGORICAL_COLUMNS = ('interaction_type', 'category_name', 'role')
+DATETIME_COLUMNS = ('viewed_at', 'liked_at', 'inspired_at', 'rated_at', 'created_at', 'last_login')
+FLOAT32_COLUMNS = ('rating_percent',)
+
+
+def dataset_format(path):
+    """
+    Returns:
+        str: Format of a processed dataset file, from its extension.
+    """
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    if extension not in DATASET_FORMATS:
+        raise ValueError(f"Unsupported dataset format '{extension}'. Available: {DATASET_FORMATS}")
+    return extension
+
+
+def compact_dtypes(df):
+    """
+    Converts the known columns of a processed dataset to compact dtypes.
+
+    Id columns become int32 (when they have no missing values and fit), low-cardinality
+    strings become categoricals and timestamps become datetime64 (unparseable values,
+    such as "Never Logged In", become NaT).
+
+    Returns:
+        pd.DataFrame: A converted copy.
+    """
+    df = df.copy()
+    int32 = np.iinfo(np.int32)
+    for column in ID_COLUMNS:
+        if column in df.columns and pd.api.types.is_numeric_dtype(df[column]) and df[column].notna().all():
+            values = df[column]
+            if values.empty or (values.min() >= int32.min and values.max() <= int32.max and (values % 1 == 0).all()):
+                df[column] = values.astype(np.int32)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    for column in DATETIME_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+    for column in FLOAT32_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(np.float32)
+    return df
+
+
+def save_dataset(df, path):
+    """
+    Saves a processed dataset as CSV, or as Parquet / Feather with compact dtypes.
+
+    Args:
+        df (pd.DataFrame): Dataset to save.
+        path (str): Output file; the extension selects the format.
+    """
+    file_format = dataset_format(path)
+    if file_format == 'csv':
+        df.to_csv(path, index=False)
+        return
+
+    df = compact_dtypes(df).reset_index(drop=True)
+    # Nested values (such as the baseToken dicts) are stored as their string form, like in the CSV
+    for column in df.columns[df.dtypes == object]:
+        if df[column].map(lambda value: isinstance(value, (dict, list))).any():
+            df[column] = df[column].astype(str)
+    if file_format == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_feather(path)
+
+
+def load_dataset(path, columns=None):
+    """
+    Loads a processed dataset, reading only the requested columns.
+
+    Args:
+        path (str): Dataset file (.csv, .parquet or .feather).
+        columns (iterable): Columns to read; columns missing from the file are skipped.
+            Every column is read when omitted.
+
+    Returns:
+        pd.DataFrame: The dataset, in file column order.
+    """
+    file_format = dataset_format(path)
+    wanted = None if columns is None else set(columns)
+    if file_format == 'csv':
+        usecols = None if wanted is None else (lambda column: column.strip() in wanted)
+        return pd.read_csv(path, usecols=usecols)
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if file_format == 'parquet':
+        names = pq.read_schema(path).names
+    else:
+        with pa.memory_map(path) as source:
+            names = pa.ipc.open_file(source).schema.names
+    selected = None if wanted is None else [name for name in names if name.strip() in wanted]
+    if file_format == 'parquet':
+        df = pd.read_parquet(path, columns=selected)
+    else:
+        df = pd.read_feather(path, columns=selected)
+
+    # Missing strings come back as None; make them NaN, as read_csv returns them
+    for column in df.columns[df.dtypes == object]:
+        df[column] = df[column].where(df[column].notna(), np.nan)
+    return df
+
+
+def append_dataset(path, df):
+    """
+    Appends rows to a processed dataset, aligned to its columns.
+
+    CSV files are appended to in place; Parquet and Feather files are rewritten.
+    """
+    if dataset_format(path) == 'csv':
+        columns = pd.read_csv(path, nrows=0).columns
+        df.reindex(columns=columns).to_csv(path, mode="a", header=False, index=False)
+        return
+
+    existing = load_dataset(path)
+    new_rows = df.reindex(columns=existing.columns).dropna(axis=1, how='all')
+    appended = pd.concat([existing, new_rows], ignore_index=True)
+    save_dataset(appended, path + ".tmp." + dataset_format(path))
+    os.replace(path + ".tmp." + dataset_format(path), path)
+
+
+class DatasetWriter:
+    """
+    Writes a processed dataset chunk by chunk, into a temporary file moved into place on close.
+
+    CSV chunks are appended under a single header; Parquet chunks (with compact dtypes)
+    become row groups of one file. Feather files cannot be written incrementally.
+    """
+    def __init__(self, path, columns=None):
+        """
+        Args:
+            path (str): Output file; the extension selects the format.
+            columns (list): Column order of every chunk; missing columns are written empty.
+        """
+        self.path = path
+        self.format = dataset_format(path)
+        if self.format == 'feather':
+            raise ValueError("Feather datasets cannot be written in chunks; use csv or parquet.")
+        self.columns = columns
+        self.rows = 0
+        self._temporary_path = f"{path}.tmp.{self.format}"
+        self._parquet_writer = None
+
+    def write(self, df):
+        if self.columns is not None:
+            df = df.reindex(columns=self.columns)
+        if self.format == 'csv':
+            df.to_csv(self._temporary_path, mode='a' if self.rows else 'w', header=not self.rows, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(compact_dtypes(df).reset_index(drop=True), preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self._temporary_path, table.schema)
+            self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+        self.rows += len(df)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if os.path.exists(self._temporary_path):
+            os.replace(self._temporary_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._parquet_writer is not None:
+            self._parquet_writer.close()
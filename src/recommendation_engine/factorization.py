@@ -0,0 +1,372 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from .artifacts import (
+    build_manifest, current_version, file_hash, is_stale, load_array, load_csr_arrays, new_version_dir,
+    publish_version, read_manifest, remove_manifest, save_array, save_csr_arrays, write_manifest
+)
+from .datasets import INTERACTION_COLUMNS, load_dataset
+from .fusion import RankedList
+from .signals import INTERACTION_WEIGHTS, InteractionSignals
+from .similarity import top_k_dense_rows, top_n_indices
+
+# Users (or posts) solved together in one vectorized conjugate-gradient block
+SOLVE_BLOCK_SIZE = 1024
+
+
+def _row_dot(a, b):
+    return np.einsum('ij,ij->i', a, b)
+
+
+def _sorted_positions(sorted_ids, ids):
+    # Positions of ids in a sorted id array, -1 for ids that are not in it
+    ids = np.asarray(ids, dtype=np.int64)
+    if sorted_ids.size == 0:
+        return np.full(ids.size, -1, dtype=np.int64)
+    found = np.minimum(np.searchsorted(sorted_ids, ids), sorted_ids.size - 1)
+    return np.where(sorted_ids[found] == ids, found, -1)
+
+
+def _solve_block(confidence, factors, gram, initial, cg_steps):
+    """
+    Runs a few conjugate-gradient steps of the implicit-ALS normal equations for a block of rows.
+
+    Row u solves (Y^T Y + reg I + Y^T (C_u - I) Y) x_u = Y^T C_u p_u, where Y are the fixed
+    factors, C_u the confidences of the row and p_u its binary preferences.
+
+    Args:
+        confidence (scipy.sparse.csr_matrix): Block rows x columns confidences (1 + alpha * strength).
+        factors (np.ndarray): Fixed factors Y of the columns.
+        gram (np.ndarray): Y^T Y + reg I.
+        initial (np.ndarray): Current factors of the block rows, used as the starting point.
+        cg_steps (int): Conjugate-gradient steps.
+
+    Returns:
+        np.ndarray: Updated float32 factors of the block rows.
+    """
+    rows = np.repeat(np.arange(confidence.shape[0]), np.diff(confidence.indptr))
+    item_factors = factors[confidence.indices]
+    extra = sp.csr_matrix((confidence.data - 1.0, confidence.indices, confidence.indptr), shape=confidence.shape)
+
+    def product(vectors):
+        # (Y^T Y + reg I) v + Y^T (C_u - I) Y v, for every row at once
+        weighted = extra.data * _row_dot(item_factors, vectors[rows])
+        return vectors @ gram + sp.csr_matrix((weighted, extra.indices, extra.indptr), shape=extra.shape) @ factors
+
+    x = initial.copy()
+    residual = confidence @ factors - product(x)
+    direction = residual.copy()
+    residual_norm = _row_dot(residual, residual)
+    for _ in range(cg_steps):
+        step = product(direction)
+        denominator = _row_dot(direction, step)
+        alpha = np.divide(residual_norm, denominator, out=np.zeros_like(residual_norm), where=denominator > 0)
+        x += alpha[:, None] * direction
+        residual -= alpha[:, None] * step
+        new_norm = _row_dot(residual, residual)
+        beta = np.divide(new_norm, residual_norm, out=np.zeros_like(new_norm), where=residual_norm > 0)
+        direction = residual + beta[:, None] * direction
+        residual_norm = new_norm
+    return x.astype(np.float32)
+
+
+def als_half_step(confidence, factors, current, regularization, cg_steps, executor):
+    """
+    Recomputes the factors of every row of `confidence` with the column factors fixed.
+
+    Rows are solved in blocks of SOLVE_BLOCK_SIZE on the executor's threads (NumPy and
+    SciPy release the GIL in the heavy operations).
+
+    Returns:
+        np.ndarray: New float32 row factors.
+    """
+    gram = factors.T @ factors + np.float32(regularization) * np.eye(factors.shape[1], dtype=np.float32)
+    updated = np.empty_like(current)
+
+    def solve(start):
+        end = min(start + SOLVE_BLOCK_SIZE, confidence.shape[0])
+        updated[start:end] = _solve_block(confidence[start:end], factors, gram, current[start:end], cg_steps)
+
+    list(executor.map(solve, range(0, confidence.shape[0], SOLVE_BLOCK_SIZE)))
+    return updated
+
+
+class ImplicitALSRecommender:
+    """
+    Implicit-feedback matrix factorization (alternating least squares with confidence weights).
+
+    Every (user, post) pair gets a confidence of `1 + alpha * strength`, where the strength
+    is the pair's entry in the InteractionSignals matrix (interaction weights per
+    interaction_type, ratings scaled by their rating percent, optionally time-decayed).
+    Users and posts are embedded in `factors` dimensions; a user's ranking is one dot
+    product of their factors against the float32 post-factor matrix.
+    """
+    def __init__(self, interactions_path, factors=64, regularization=0.01, alpha=10.0, iterations=15,
+                 cg_steps=3, interaction_weights=None, half_life_days=None, n_threads=None, random_state=0):
+        """
+        Args:
+            interactions_path (str): Path to the interactions dataset (.csv, .parquet or .feather).
+            factors (int): Dimensions of the user and post factors.
+            regularization (float): L2 regularization of the factors.
+            alpha (float): Scale of the interaction strengths in the confidences.
+            iterations (int): ALS sweeps over users and posts.
+            cg_steps (int): Conjugate-gradient steps per row and sweep.
+            interaction_weights (dict): Weight per interaction_type; defaults to INTERACTION_WEIGHTS.
+            half_life_days (float): Half-life of the interaction weights in days; None (default) disables the decay.
+            n_threads (int): Solver threads; defaults to the number of CPUs.
+            random_state (int): Seed of the initial factors.
+        """
+        self.interactions_path = interactions_path
+        self.source_hash = file_hash(interactions_path)
+        self.interactions_df = load_dataset(interactions_path, columns=INTERACTION_COLUMNS)
+        self.factors = factors
+        self.regularization = regularization
+        self.alpha = alpha
+        self.iterations = iterations
+        self.cg_steps = cg_steps
+        self.interaction_weights = dict(INTERACTION_WEIGHTS if interaction_weights is None else interaction_weights)
+        self.half_life_days = half_life_days
+        self.n_threads = n_threads or os.cpu_count() or 1
+        self.random_state = random_state
+        self._prepare_data()
+        self.fit()
+
+    def _prepare_data(self):
+        if 'user_id' not in self.interactions_df.columns or 'post_id' not in self.interactions_df.columns:
+            raise ValueError("Interaction data must contain 'user_id' and 'post_id' columns.")
+
+        self.interactions_df = self.interactions_df.dropna(subset=['user_id', 'post_id'])
+
+        # Summed interaction strength of every (user, post) pair
+        signals = InteractionSignals(self.interaction_weights, self.half_life_days).build(self.interactions_df)
+        self.user_ids, self.post_ids, self.strength_matrix = signals.user_ids, signals.post_ids, signals.matrix
+
+        # Posts each user interacted with, masked out of their rankings
+        self.seen_matrix = self.strength_matrix.copy()
+        self.seen_matrix.data[:] = 1.0
+
+    def fit(self):
+        """
+        Learns the user and post factors with `iterations` ALS sweeps.
+
+        Returns:
+            ImplicitALSRecommender: self, for chaining.
+        """
+        rng = np.random.default_rng(self.random_state)
+        n_users, n_posts = self.strength_matrix.shape
+        self.user_factors = (rng.standard_normal((n_users, self.factors)) * 0.01).astype(np.float32)
+        self.item_factors = (rng.standard_normal((n_posts, self.factors)) * 0.01).astype(np.float32)
+
+        # Confidence 1 + alpha * strength on the observed pairs; unobserved pairs have confidence 1
+        user_confidence = self.strength_matrix.copy()
+        user_confidence.data = 1.0 + np.float32(self.alpha) * user_confidence.data
+        post_confidence = user_confidence.T.tocsr()
+
+        with ThreadPoolExecutor(max_workers=self.n_threads, thread_name_prefix="als-solve") as executor:
+            for _ in range(self.iterations):
+                self.user_factors = als_half_step(
+                    user_confidence, self.item_factors, self.user_factors, self.regularization, self.cg_steps, executor
+                )
+                self.item_factors = als_half_step(
+                    post_confidence, self.user_factors, self.item_factors, self.regularization, self.cg_steps, executor
+                )
+        return self
+
+    @staticmethod
+    def _artifact_params(factors=64, regularization=0.01, alpha=10.0, iterations=15, cg_steps=3,
+                         interaction_weights=None, half_life_days=None, n_threads=None, random_state=0):
+        # Parameters recorded in the artifact manifest (the thread count does not change the model)
+        return {
+            "factors": factors, "regularization": regularization, "alpha": alpha, "iterations": iterations,
+            "cg_steps": cg_steps, "interaction_weights": dict(INTERACTION_WEIGHTS if interaction_weights is None else interaction_weights),
+            "half_life_days": half_life_days, "random_state": random_state
+        }
+
+    @classmethod
+    def build(cls, interactions_path, **kwargs):
+        """
+        Builds and trains the model from an interactions dataset file (same as calling the constructor).
+        """
+        return cls(interactions_path, **kwargs)
+
+    def save(self, directory):
+        """
+        Saves the model artifacts to a directory.
+
+        The directory holds the float32 user and post factors, the user and post id maps
+        and the seen-post matrix as .npy arrays, plus a manifest.
+
+        Args:
+            directory (str): Artifact directory.
+        """
+        os.makedirs(directory, exist_ok=True)
+        remove_manifest(directory)
+
+        save_array(directory, "user_factors", self.user_factors)
+        save_array(directory, "item_factors", self.item_factors)
+        save_array(directory, "user_ids", self.user_ids)
+        save_array(directory, "post_ids", self.post_ids)
+        save_csr_arrays(directory, "seen", self.seen_matrix)
+
+        params = self._artifact_params(
+            self.factors, self.regularization, self.alpha, self.iterations, self.cg_steps,
+            self.interaction_weights, self.half_life_days, random_state=self.random_state
+        )
+        write_manifest(directory, build_manifest(type(self).__name__, self.source_hash, params))
+        print(f"Saved {type(self).__name__} artifacts to {directory}")
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Loads model artifacts saved with `save`.
+
+        The raw interactions are not part of the artifacts, so `interactions_df` and
+        `strength_matrix` are None on a loaded model.
+
+        Args:
+            directory (str): Artifact directory.
+            mmap_mode (str): numpy memory-map mode for the .npy arrays.
+
+        Returns:
+            ImplicitALSRecommender: The loaded model.
+        """
+        manifest = read_manifest(directory)
+        if manifest is None:
+            raise FileNotFoundError(f"No model artifacts found in {directory}")
+
+        params = manifest["params"]
+        model = cls.__new__(cls)
+        model.interactions_path = None
+        model.source_hash = manifest["source_hash"]
+        model.interactions_df = None
+        model.strength_matrix = None
+        model.factors = params["factors"]
+        model.regularization = params["regularization"]
+        model.alpha = params["alpha"]
+        model.iterations = params["iterations"]
+        model.cg_steps = params["cg_steps"]
+        model.interaction_weights = params["interaction_weights"]
+        model.half_life_days = params["half_life_days"]
+        model.n_threads = os.cpu_count() or 1
+        model.random_state = params["random_state"]
+
+        model.user_factors = load_array(directory, "user_factors", mmap_mode)
+        model.item_factors = load_array(directory, "item_factors", mmap_mode)
+        model.user_ids = load_array(directory, "user_ids", mmap_mode)
+        model.post_ids = load_array(directory, "post_ids", mmap_mode)
+        model.seen_matrix = load_csr_arrays(directory, "seen", mmap_mode)
+        return model
+
+    @classmethod
+    def load_or_build(cls, interactions_path, directory, mmap_mode='r', **kwargs):
+        """
+        Loads saved artifacts, retraining and saving them first if they are missing or stale.
+
+        Args:
+            interactions_path (str): Path to the interactions dataset (.csv, .parquet or .feather).
+            directory (str): Artifact directory; each rebuild is saved to a new version directory
+                inside it and published atomically, so served models are never overwritten.
+            mmap_mode (str): numpy memory-map mode used when loading.
+            **kwargs: Constructor parameters.
+
+        Returns:
+            ImplicitALSRecommender: The loaded or freshly trained model.
+        """
+        version_dir = current_version(directory)
+        if version_dir is None or is_stale(version_dir, cls.__name__, interactions_path, cls._artifact_params(**kwargs)):
+            print(f"Model artifacts in {directory} are missing or stale. Rebuilding.")
+            model = cls.build(interactions_path, **kwargs)
+            # Saved to a new version directory: the files of the current one may be memory-mapped
+            building_dir = new_version_dir(directory, model.source_hash)
+            model.save(building_dir)
+            publish_version(directory, building_dir)
+            return model
+        return cls.load(version_dir, mmap_mode=mmap_mode)
+
+    def _user_positions(self, user_ids):
+        # Row positions of user ids, -1 for unknown users
+        return _sorted_positions(self.user_ids, user_ids)
+
+    def rank(self, user_id, top_n=10):
+        """
+        Ranks unseen posts for a user by the dot product of their factors with every post's factors.
+
+        Args:
+            user_id: User to recommend posts for.
+            top_n (int): Number of posts to return.
+
+        Returns:
+            RankedList: Post ids and scores, empty for unknown users.
+        """
+        position = self._user_positions([user_id])[0]
+        if position < 0:
+            return RankedList.empty()
+
+        scores = self.item_factors @ self.user_factors[position]
+        scores[self.seen_matrix.indices[self.seen_matrix.indptr[position]:self.seen_matrix.indptr[position + 1]]] = -np.inf
+
+        top_indices = top_n_indices(scores, top_n)
+        top_indices = top_indices[np.isfinite(scores[top_indices])]
+        return RankedList(self.post_ids[top_indices].astype(np.int64), scores[top_indices].astype(np.float64))
+
+    def score_candidates(self, user_id, post_ids):
+        """
+        Scores the given posts for a user, as `rank` scores every post.
+
+        Args:
+            user_id: User to score for.
+            post_ids (np.ndarray): Posts to score.
+
+        Returns:
+            tuple: (scores, seen) arrays aligned with post_ids. Scores are NaN for unknown users
+                and posts; seen flags the posts the user interacted with.
+        """
+        post_ids = np.asarray(post_ids, dtype=np.int64)
+        scores = np.full(post_ids.size, np.nan)
+        seen = np.zeros(post_ids.size, dtype=bool)
+        position = self._user_positions([user_id])[0]
+        if position < 0:
+            return scores, seen
+
+        post_positions = _sorted_positions(self.post_ids, post_ids)
+        known = post_positions >= 0
+        user_seen = self.seen_matrix.indices[self.seen_matrix.indptr[position]:self.seen_matrix.indptr[position + 1]]
+        seen[known] = np.isin(post_positions[known], user_seen)
+        scores[known] = self.item_factors[post_positions[known]] @ self.user_factors[position]
+        return scores, seen
+
+    def recommend(self, user_id, top_n=10):
+        return self.rank(user_id, top_n=top_n).to_frame()
+
+    def recommend_many(self, user_ids, top_n=10):
+        """
+        Recommends posts for a batch of users with one dense matrix product.
+
+        Args:
+            user_ids (iterable): User ids to score. Unknown users are skipped.
+            top_n (int): Number of recommendations per user.
+
+        Returns:
+            pd.DataFrame: Columns user_id, post_id and score, ranked per user.
+        """
+        user_positions = self._user_positions(list(user_ids))
+        user_positions = user_positions[user_positions >= 0]
+        k = min(top_n, self.post_ids.size)
+        if user_positions.size == 0 or k <= 0:
+            return pd.DataFrame(columns=["user_id", "post_id", "score"])
+
+        scores = self.user_factors[user_positions] @ self.item_factors.T
+        seen = self.seen_matrix[user_positions].tocoo()
+        scores[seen.row, seen.col] = -np.inf
+
+        columns, values = top_k_dense_rows(scores, k)
+        rows = np.repeat(np.arange(user_positions.size), k)
+        columns, values = columns.ravel(), values.ravel()
+        keep = np.isfinite(values)
+        return pd.DataFrame({
+            "user_id": self.user_ids[user_positions[rows[keep]]].astype(int),
+            "post_id": self.post_ids[columns[keep]].astype(int),
+            "score": values[keep].astype(float)
+        })
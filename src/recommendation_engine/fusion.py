@@ -0,0 +1,86 @@
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from .similarity import top_n_indices
+
+FUSION_METHODS = ('weighted_sum', 'reciprocal_rank', 'max')
+
+
+class RankedList(NamedTuple):
+    """
+    Lightweight ranked recommendation list: post ids and scores sorted by descending score.
+    """
+    post_ids: np.ndarray
+    scores: np.ndarray
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+
+    def __len__(self):
+        return len(self.post_ids)
+
+    def head(self, top_n):
+        return RankedList(self.post_ids[:top_n], self.scores[:top_n])
+
+    def to_frame(self, score_column="score"):
+        return pd.DataFrame({"post_id": self.post_ids, score_column: self.scores})
+
+
+def fuse_ranked_lists(components, id_space, method='weighted_sum', top_n=10, rrf_k=60, mask=None):
+    """
+    Fuses the ranked lists of several models into one ranking.
+
+    Post ids are mapped to dense positions in `id_space` and scores are combined
+    with NumPy over the union of candidates only; the top N are picked with argpartition.
+
+    Args:
+        components (list): (RankedList, weight) pairs, one per model.
+        id_space (np.ndarray): Sorted array of every post id the models can return.
+        method (str): 'weighted_sum' (sum of weight * score), 'reciprocal_rank'
+            (sum of weight / (rrf_k + rank)) or 'max' (max of weight * score).
+        top_n (int): Number of posts to return.
+        rrf_k (int): Rank offset of reciprocal-rank fusion.
+        mask (np.ndarray): Optional boolean array over id_space; only posts where it is True are kept.
+
+    Returns:
+        RankedList: Fused ranking.
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method '{method}'. Available: {FUSION_METHODS}")
+
+    if id_space.size == 0:
+        return RankedList.empty()
+
+    positions, contributions = [], []
+    for ranked, weight in components:
+        if len(ranked) == 0:
+            continue
+        post_positions = np.searchsorted(id_space, ranked.post_ids)
+        known = (post_positions < id_space.size) & (id_space[np.minimum(post_positions, id_space.size - 1)] == ranked.post_ids)
+        if method == 'reciprocal_rank':
+            contribution = weight / (rrf_k + np.arange(1, len(ranked) + 1))
+        else:
+            contribution = weight * np.asarray(ranked.scores, dtype=np.float64)
+        positions.append(post_positions[known])
+        contributions.append(contribution[known])
+
+    if not positions:
+        return RankedList.empty()
+
+    positions = np.concatenate(positions)
+    contributions = np.concatenate(contributions)
+    candidates, inverse = np.unique(positions, return_inverse=True)
+
+    if method == 'max':
+        fused = np.full(candidates.size, -np.inf)
+        np.maximum.at(fused, inverse, contributions)
+    else:
+        fused = np.bincount(inverse, weights=contributions, minlength=candidates.size)
+
+    if mask is not None:
+        keep = mask[candidates]
+        candidates, fused = candidates[keep], fused[keep]
+
+    top = top_n_indices(fused, top_n)
+    return RankedList(id_space[candidates[top]], fused[top])
@@ -1,73 +1,298 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import numpy as np
 import pandas as pd
+from .fusion import FUSION_METHODS, RankedList, fuse_ranked_lists
+from .user_profiles import UserProfiles
+
+# Threads shared by every HybridRecommender (models are rebuilt on reload, the pool is not);
+# sized for several concurrent requests of a few component models each
+FAN_OUT_WORKERS = 32
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _fan_out_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FAN_OUT_WORKERS, thread_name_prefix="hybrid-fan-out")
+        return _executor
+
 
 class HybridRecommender:
-    def __init__(self, content_model, collaborative_model, weight_content=0.3, weight_collaborative=0.7):
+    def __init__(self, content_model, collaborative_model, weight_content=0.3, weight_collaborative=0.7,
+                 fusion_method='weighted_sum', rrf_k=60, timeout=None, user_profiles=None):
+        """
+        Args:
+            content_model (ContentBasedRecommender): Content-based model.
+            collaborative_model (CollaborativeRecommender): Collaborative model.
+            weight_content (float): Weight of the content-based scores.
+            weight_collaborative (float): Weight of the collaborative scores.
+            fusion_method (str): Default score fusion, one of FUSION_METHODS.
+            rrf_k (int): Rank offset used by reciprocal-rank fusion.
+            timeout (float): Default latency budget of each model, in seconds (None waits indefinitely).
+            user_profiles (UserProfiles): Content profiles of the users. Built from the collaborative
+                model's interactions when omitted (a model loaded from artifacts has none, so pass them).
+        """
+        if fusion_method not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method '{fusion_method}'. Available: {FUSION_METHODS}")
+
         self.content_model = content_model
         self.collaborative_model = collaborative_model
         self.weight_content = weight_content
         self.weight_collaborative = weight_collaborative
+        self.fusion_method = fusion_method
+        self.rrf_k = rrf_k
+        self.timeout = timeout
+
+        # The content half scores users through their profile vectors, not post-to-post similarity
+        if user_profiles is None:
+            user_profiles = UserProfiles(content_model).build(getattr(collaborative_model, 'interactions_df', None))
+        self.user_profiles = user_profiles
+
+        # Component models queried concurrently: name -> (model, weight, timeout)
+        self.components = {}
+        self.timeout_counts = {}
+        self._stats_lock = threading.Lock()
+        self.post_ids = np.empty(0, dtype=np.int64)
+
+        self.add_model("content", user_profiles, weight_content)
+        self.add_model("collaborative", collaborative_model, weight_collaborative)
+
+    def add_model(self, name, model, weight, timeout=None):
+        """
+        Adds a component model to the fan-out.
+
+        The model needs a `rank(user_id, top_n=...)` method returning a RankedList and
+        a `post_ids` attribute (or a `posts_df` with an 'id' column) listing every post it can return.
+
+        Args:
+            name (str): Component name, used in timeout reports.
+            model: Model to query.
+            weight (float): Weight of the model's scores.
+            timeout (float): Latency budget of the model in seconds; defaults to the recommender's timeout.
+        """
+        self.components[name] = (model, weight, timeout)
+        self.timeout_counts.setdefault(name, 0)
+        self.refresh_post_ids()
+
+    def refresh_post_ids(self):
+        """
+        Recomputes the shared id space from the component models.
+
+        Call it after a component learns new posts in place (such as the collaborative
+        model's `apply_interactions`); fusion drops the posts missing from the id space.
+
+        Returns:
+            np.ndarray: The sorted id space.
+        """
+        # Dense id space shared by every model: every post any of them can return
+        post_ids = np.empty(0, dtype=np.int64)
+        for model, _, _ in self.components.values():
+            model_post_ids = model.post_ids if hasattr(model, 'post_ids') else model.posts_df['id'].values
+            post_ids = np.union1d(post_ids, np.asarray(model_post_ids, dtype=np.int64))
+        # One reference assignment, so concurrent requests see either the old or the new id space
+        self.post_ids = post_ids
+        return post_ids
+
+    def _category_mask(self, category_id, post_ids):
+        # Maps the content model's category mask onto the shared id space
+        if category_id is None:
+            return None
+        content_mask = self.content_model.filter_mask(category_id=category_id)
+        if content_mask is None:
+            return None
+        mask = np.zeros(post_ids.size, dtype=bool)
+        mask[np.searchsorted(post_ids, self.content_model.posts_df['id'].values[content_mask])] = True
+        return mask
+
+    def fan_out(self, user_id, top_n=10, report=None):
+        """
+        Queries every component model concurrently on the shared thread pool.
+
+        Each model gets its own deadline, counted from the moment its task starts running,
+        so time spent queued behind other requests' tasks does not use up the budget. A task
+        that has not started within its budget of the fan-out itself is cancelled, so a
+        saturated pool cannot block the request. Models that miss a deadline are left out
+        of the result (their threads finish in the background).
+
+        Args:
+            user_id: User to rank for.
+            top_n (int): Posts requested from each model.
+            report (dict): Optional dict filled with 'timed_out' (component names) and
+                'latency' (seconds per component that answered in time, from the start of its task).
+
+        Returns:
+            list: (RankedList, weight) pairs of the models that answered in time.
+        """
+        executor = _fan_out_executor()
+        submitted_at = time.perf_counter()
+        tasks = {}
+        for name, (model, weight, timeout) in self.components.items():
+            started = {"event": threading.Event(), "at": None}
+            tasks[name] = (executor.submit(self._timed_rank, model, user_id, top_n, started), started)
+
+        results, timed_out, latency = [], [], {}
+        for name, (future, started) in tasks.items():
+            model, weight, timeout = self.components[name]
+            timeout = self.timeout if timeout is None else timeout
+            remaining = None
+            if timeout is not None:
+                # A task still queued when the request's own deadline passes is given up
+                if not started["event"].wait(max(0.0, submitted_at + timeout - time.perf_counter())):
+                    future.cancel()
+                    timed_out.append(name)
+                    continue
+                remaining = max(0.0, started["at"] + timeout - time.perf_counter())
+            try:
+                ranked, latency[name] = future.result(timeout=remaining)
+            except TimeoutError:
+                timed_out.append(name)
+                continue
+            results.append((ranked, weight))
+
+        if timed_out:
+            with self._stats_lock:
+                for name in timed_out:
+                    self.timeout_counts[name] += 1
+            print(f"Hybrid recommendations for {user_id} degraded: {', '.join(timed_out)} missed the deadline")
+
+        if report is not None:
+            report["timed_out"] = timed_out
+            report["latency"] = latency
+        return results
+
+    @staticmethod
+    def _timed_rank(model, user_id, top_n, started):
+        # The deadline of the task starts here, not when it was queued
+        started["at"] = time.perf_counter()
+        started["event"].set()
+        ranked = model.rank(user_id, top_n=top_n)
+        return ranked, time.perf_counter() - started["at"]
+
+    def rank_hybrid(self, user_id, top_n=10, category_id=None, method=None, report=None):
+        """
+        Fuses the rankings of the component models with NumPy over the shared post id space.
+
+        Args:
+            user_id: User to rank for.
+            top_n (int): Number of posts to return.
+            category_id: Optional category filter.
+            method (str): Fusion method; defaults to the recommender's fusion_method.
+            report (dict): Optional dict filled with the fan-out report (see fan_out).
+
+        Returns:
+            RankedList: Fused post ids and scores.
+        """
+        post_ids = self.post_ids
+        return fuse_ranked_lists(
+            self.fan_out(user_id, top_n=top_n, report=report),
+            post_ids,
+            method=method or self.fusion_method,
+            top_n=top_n,
+            rrf_k=self.rrf_k,
+            mask=self._category_mask(category_id, post_ids)
+        )
+
+    def rank_candidates(self, user_id, candidates, top_n=10):
+        """
+        Ranks a given candidate set with every component model and fuses the rankings.
+
+        Each component with a `score_candidates(user_id, post_ids)` method scores only the
+        candidates; the unseen candidates it scores form its ranked list, and the lists are
+        fused with the model weights and fusion_method, as in rank_hybrid. Posts any model
+        reports as seen are dropped; candidates no model scores come last, at a score of 0
+        (or of the lowest fused score, when that is negative).
+
+        Args:
+            user_id: User to rank for.
+            candidates (np.ndarray): Candidate post ids.
+            top_n (int): Number of posts to return.
+
+        Returns:
+            RankedList: Top ranked candidates.
+        """
+        candidates = np.unique(np.asarray(candidates, dtype=np.int64))
+        seen = np.zeros(candidates.size, dtype=bool)
+        model_scores = []
+        for model, weight, _ in self.components.values():
+            if not hasattr(model, 'score_candidates'):
+                continue
+            scores, model_seen = model.score_candidates(user_id, candidates)
+            model_scores.append((scores, weight))
+            seen |= model_seen
+
+        candidates = candidates[~seen]
+        ranked_lists = []
+        for scores, weight in model_scores:
+            scores = scores[~seen]
+            scored = np.flatnonzero(~np.isnan(scores))
+            order = scored[np.argsort(-scores[scored], kind='stable')]
+            ranked_lists.append((RankedList(candidates[order], scores[order]), weight))
+
+        fused = fuse_ranked_lists(ranked_lists, candidates, method=self.fusion_method, top_n=top_n, rrf_k=self.rrf_k)
+        if len(fused) >= top_n:
+            return fused
+        rest = candidates[~np.isin(candidates, fused.post_ids)][:top_n - len(fused)]
+        rest_score = min(0.0, fused.scores[-1]) if len(fused) else 0.0
+        return RankedList(
+            np.concatenate([fused.post_ids, rest]), np.concatenate([fused.scores, np.full(rest.size, rest_score)])
+        )
 
     def recommend_hybrid(self, user_id, category_id=None, top_n=10):
-        try:
-            # Get recommendations from both models
-            content_recommendations = self.content_model.recommend(user_id, top_n=top_n)
-            collaborative_recommendations = self.collaborative_model.recommend(user_id, top_n=top_n)
-
-            # Handle content-based recommendations
-            content_df = content_recommendations if not content_recommendations.empty else pd.DataFrame(columns=["post_id", "score", "category_id"])
-
-            # Handle collaborative recommendations
-            if isinstance(collaborative_recommendations, list):
-                collaborative_df = pd.DataFrame(
-                    collaborative_recommendations,
-                    columns=["post_id", "score"] if isinstance(collaborative_recommendations[0], tuple) else ["post_id"]
+        return self.rank_hybrid(user_id, top_n=top_n, category_id=category_id).to_frame("weighted_score")
+
+    def recommend_hybrid_many(self, user_ids, top_n=10, batch_size=512):
+        """
+        Hybrid recommendations for a batch of users, using the batched scoring of the models.
+
+        Mirrors rank_hybrid: each model with a `recommend_many` method contributes its top_n
+        posts per user, and every user's lists are fused with fuse_ranked_lists, the
+        recommender's fusion_method and the model weights.
+
+        Args:
+            user_ids (iterable): User ids to score.
+            top_n (int): Number of recommendations per user.
+            batch_size (int): Users scored per batch.
+
+        Returns:
+            pd.DataFrame: Columns user_id, post_id and weighted_score, ranked per user.
+        """
+        user_ids = list(user_ids)
+        post_ids = self.post_ids
+        fused_users, fused_posts, fused_scores = [], [], []
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+
+            # Ranked list of every model, per user
+            user_lists = {}
+            for model, weight, _ in self.components.values():
+                if not hasattr(model, 'recommend_many'):
+                    continue
+                model_df = model.recommend_many(batch, top_n=top_n)
+                if model_df.empty:
+                    continue
+                model_post_ids = model_df['post_id'].to_numpy(dtype=np.int64)
+                model_scores = model_df['score'].to_numpy(dtype=np.float64)
+                for user_id, rows in model_df.groupby('user_id', sort=False).indices.items():
+                    user_lists.setdefault(int(user_id), []).append(
+                        (RankedList(model_post_ids[rows], model_scores[rows]), weight)
+                    )
+
+            for user_id, components in user_lists.items():
+                fused = fuse_ranked_lists(
+                    components, post_ids, method=self.fusion_method, top_n=top_n, rrf_k=self.rrf_k
                 )
-                if "score" not in collaborative_df.columns:
-                    collaborative_df["score"] = 1.0  # Assign default score
-                collaborative_df["category_id"] = 1  # Add default category_id if missing
-            else:
-                collaborative_df = collaborative_recommendations if not collaborative_recommendations.empty else pd.DataFrame(columns=["post_id", "score", "category_id"])
-
-            # Log columns of DataFrames
-            print(f"Content DataFrame Columns: {content_df.columns.tolist()}")
-            print(f"Collaborative DataFrame Columns: {collaborative_df.columns.tolist()}")
-
-            # Handle category_id filtering
-            if category_id:
-                if 'category_id' in content_df.columns:
-                    content_df = content_df[content_df['category_id'] == category_id]
-                else:
-                    print("Warning: 'category_id' not found in content recommendations. Skipping filtering.")
-
-                if 'category_id' in collaborative_df.columns:
-                    collaborative_df = collaborative_df[collaborative_df['category_id'] == category_id]
-                else:
-                    print("Warning: 'category_id' not found in collaborative recommendations. Skipping filtering.")
-
-            # Apply weights to both content and collaborative recommendations
-            if not content_df.empty:
-                content_df["weight"] = self.weight_content
-                content_df["weighted_score"] = content_df["score"] * content_df["weight"]
-
-            if not collaborative_df.empty:
-                collaborative_df["weight"] = self.weight_collaborative
-                collaborative_df["weighted_score"] = collaborative_df["score"] * collaborative_df["weight"]
-
-            # Combine DataFrames safely
-            combined_df = pd.concat([content_df.dropna(axis=1, how='all'), collaborative_df.dropna(axis=1, how='all')], ignore_index=True)
-
-            # Aggregate and sort recommendations by weighted score
-            final_recommendations = (
-                combined_df.groupby("post_id", as_index=False)["weighted_score"]
-                .sum()
-                .sort_values(by="weighted_score", ascending=False)
-                .head(top_n)
-            )
-
-            print(f"Final Hybrid Recommendations:\n{final_recommendations}")
-            return final_recommendations
-
-        except Exception as e:
-            print(f"Error fetching recommendations: {e}")
-            raise
+                fused_users.append(np.full(len(fused), user_id, dtype=np.int64))
+                fused_posts.append(fused.post_ids)
+                fused_scores.append(fused.scores)
 
+        if not fused_users:
+            return pd.DataFrame(columns=["user_id", "post_id", "weighted_score"])
+        return pd.DataFrame({
+            "user_id": np.concatenate(fused_users),
+            "post_id": np.concatenate(fused_posts),
+            "weighted_score": np.concatenate(fused_scores)
+        })
@@ -0,0 +1,351 @@
+import os
+import json
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+from .similarity import top_k_dense_rows, top_k_neighbors, top_n_indices
+
+
+def _as_dense_query(vec):
+    # Query vectors are densified once; a CSR matrix times a dense vector is the cheapest product
+    if sp.issparse(vec):
+        return vec.toarray().ravel()
+    return np.asarray(vec, dtype=np.float32).ravel()
+
+
+def _ranges(starts, ends):
+    # Concatenation of np.arange(start, end) for every (start, end) pair, without a Python loop
+    lengths = ends - starts
+    return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+
+class ExactNeighborIndex:
+    """
+    Brute-force cosine neighbour index over L2-normalised row vectors.
+    """
+    backend = 'exact'
+
+    def __init__(self):
+        self.vectors = None
+
+    def build(self, vectors):
+        # Normalises in place when given a float32 CSR matrix, so callers can share the same buffers
+        self.vectors = normalize(sp.csr_matrix(vectors, dtype=np.float32), copy=False)
+        return self
+
+    def _params(self):
+        return {}
+
+    def query(self, vec, k, mask=None):
+        """
+        Finds the k rows most similar to a query vector.
+
+        Args:
+            vec (scipy.sparse matrix or np.ndarray): Query vector (1 x dim).
+            k (int): Number of neighbours to return.
+            mask (np.ndarray): Optional boolean array; only rows where it is True are returned.
+
+        Returns:
+            tuple: (indices, scores) arrays sorted by descending score.
+        """
+        scores = self.vectors @ _as_dense_query(vec)
+        if mask is not None:
+            scores[~mask] = -np.inf
+
+        indices = top_n_indices(scores, k)
+        indices = indices[np.isfinite(scores[indices])]
+        return indices, scores[indices]
+
+    def all_neighbors(self, k, batch_size=1024):
+        """
+        Finds the k most similar other rows of every indexed row, one block of rows at a time.
+
+        Args:
+            k (int): Number of neighbours per row.
+            batch_size (int): Rows scored per block.
+
+        Returns:
+            tuple: (rows, columns, scores) arrays of the neighbours with a positive score,
+                ordered by row and then by descending score.
+        """
+        indices, scores = top_k_neighbors(self.vectors, k, batch_size=batch_size)
+        keep = np.isfinite(scores) & (scores > 0)
+        rows = np.repeat(np.arange(indices.shape[0]), indices.shape[1]).reshape(indices.shape)
+        return rows[keep], indices[keep], scores[keep]
+
+    def _save_arrays(self, path):
+        pass
+
+    def _load_arrays(self, path, mmap_mode):
+        pass
+
+    def save(self, path, include_vectors=True):
+        """
+        Saves the index to a directory.
+
+        Args:
+            path (str): Directory to write the index files to.
+            include_vectors (bool): Whether to save the indexed vectors; skip it when the
+                caller already stores them and passes them back to `load`.
+        """
+        os.makedirs(path, exist_ok=True)
+        if include_vectors:
+            sp.save_npz(os.path.join(path, "vectors.npz"), self.vectors)
+        self._save_arrays(path)
+        with open(os.path.join(path, "index.json"), "w") as f:
+            json.dump({"backend": self.backend, "params": self._params()}, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None, vectors=None):
+        """
+        Loads an index saved with `save`.
+
+        Args:
+            path (str): Directory the index was saved to.
+            mmap_mode (str): Optional numpy memory-map mode for the dense arrays (e.g. 'r').
+            vectors (scipy.sparse matrix): The indexed vectors, if they were saved separately.
+
+        Returns:
+            The loaded index.
+        """
+        with open(os.path.join(path, "index.json"), "r") as f:
+            meta = json.load(f)
+        index = cls(**meta["params"])
+        index.vectors = vectors if vectors is not None else sp.load_npz(os.path.join(path, "vectors.npz")).tocsr()
+        index._load_arrays(path, mmap_mode)
+        return index
+
+
+class IVFNeighborIndex(ExactNeighborIndex):
+    """
+    Approximate cosine neighbour index using an inverted-file (IVF) coarse quantizer.
+
+    Rows are clustered with spherical k-means into `n_lists` lists. A query is
+    compared with the centroids and only the rows of the `n_probe` closest lists
+    are scored exactly, so query cost grows with the list sizes rather than the
+    number of rows.
+    """
+    backend = 'ivf'
+
+    def __init__(self, n_lists=None, n_probe=8, n_iter=10, seed=0):
+        super().__init__()
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.centroids = None
+        self.list_offsets = None
+        self.list_items = None
+        self.list_vectors = None
+
+    def _params(self):
+        return {"n_lists": self.n_lists, "n_probe": self.n_probe, "n_iter": self.n_iter, "seed": self.seed}
+
+    def build(self, vectors):
+        super().build(vectors)
+        n_rows = self.vectors.shape[0]
+        if n_rows == 0:
+            self.centroids = np.zeros((0, self.vectors.shape[1]), dtype=np.float32)
+            self.list_items = np.zeros(0, dtype=np.int32)
+            self.list_offsets = np.zeros(1, dtype=np.int64)
+            self.list_vectors = self.vectors
+            return self
+
+        if self.n_lists is None:
+            self.n_lists = max(1, int(np.sqrt(n_rows)))
+        n_lists = min(self.n_lists, max(n_rows, 1))
+
+        # Spherical k-means on the normalised rows, seeded with random rows
+        rng = np.random.default_rng(self.seed)
+        centroids = self.vectors[rng.choice(n_rows, n_lists, replace=False)].toarray()
+        for _ in range(self.n_iter):
+            assignments = np.asarray((self.vectors @ centroids.T).argmax(axis=1)).ravel()
+            membership = sp.csr_matrix(
+                (np.ones(n_rows, dtype=np.float32), (assignments, np.arange(n_rows))),
+                shape=(n_lists, n_rows)
+            )
+            sums = (membership @ self.vectors).toarray()
+
+            # Re-seed empty lists with random rows
+            empty = np.flatnonzero(np.asarray(membership.sum(axis=1)).ravel() == 0)
+            if empty.size:
+                sums[empty] = self.vectors[rng.choice(n_rows, empty.size, replace=False)].toarray()
+            centroids = normalize(sums)
+
+        assignments = np.asarray((self.vectors @ centroids.T).argmax(axis=1)).ravel()
+        self.centroids = centroids.astype(np.float32)
+
+        # Inverted lists: rows sorted by list, with offsets into the sorted array
+        self.list_items = np.argsort(assignments, kind='stable').astype(np.int32)
+        self.list_offsets = np.searchsorted(assignments[self.list_items], np.arange(n_lists + 1)).astype(np.int64)
+
+        # Rows stored list by list, so every probed list is a contiguous slice
+        self.list_vectors = self.vectors[self.list_items]
+        return self
+
+    def query(self, vec, k, mask=None):
+        n_lists = self.centroids.shape[0]
+        if n_lists == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        query = _as_dense_query(vec)
+        list_order = np.argsort(-(self.centroids @ query), kind='stable')
+
+        # Probe the closest lists, widening the search until enough candidates pass the mask
+        n_probe = min(self.n_probe, n_lists)
+        probed = 0
+        candidates, scores = [], []
+        n_candidates = 0
+        while probed < n_probe:
+            # The rows of every newly probed list are scored in one sparse product
+            positions = _ranges(self.list_offsets[list_order[probed:n_probe]], self.list_offsets[list_order[probed:n_probe] + 1])
+            items = self.list_items[positions]
+            list_scores = self.list_vectors[positions] @ query
+            if mask is not None:
+                keep = mask[items]
+                items, list_scores = items[keep], list_scores[keep]
+            candidates.append(items)
+            scores.append(list_scores)
+            n_candidates += items.size
+            probed = n_probe
+            if n_candidates < k:
+                n_probe = min(n_probe * 2, n_lists)
+
+        candidates = np.concatenate(candidates)
+        scores = np.concatenate(scores)
+        top = top_n_indices(scores, k)
+        return candidates[top], scores[top]
+
+    def all_neighbors(self, k, batch_size=256):
+        """
+        Finds the approximate k most similar other rows of every indexed row, like `query` does
+        for each row, one block of rows at a time.
+
+        Rows are taken in list order, so the rows of a block probe mostly the same lists; the
+        block is scored in one sparse product against the union of its probed lists, and each
+        row only keeps the candidates of its own `n_probe` lists. Rows whose probed lists hold
+        fewer than k other rows are queried one by one, with the widening search of `query`.
+
+        Args:
+            k (int): Number of neighbours per row.
+            batch_size (int): Rows scored per block.
+
+        Returns:
+            tuple: (rows, columns, scores) arrays of the neighbours with a positive score,
+                ordered by row and then by descending score.
+        """
+        n_lists = self.centroids.shape[0]
+        n_rows = self.vectors.shape[0]
+        k = max(min(k, n_rows - 1), 0)
+        if n_lists == 0 or k == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0, dtype=np.float32)
+
+        n_probe = min(self.n_probe, n_lists)
+        list_lengths = np.diff(self.list_offsets)
+        rows, columns, values = [], [], []
+        for start in range(0, n_rows, batch_size):
+            end = min(start + batch_size, n_rows)
+            block = self.list_vectors[start:end]
+            block_rows = self.list_items[start:end].astype(np.int64)
+
+            # Lists probed by every row of the block, and their union
+            probed_lists, _ = top_k_dense_rows(np.asarray(block @ self.centroids.T), n_probe)
+            probed = np.zeros((end - start, n_lists), dtype=bool)
+            np.put_along_axis(probed, probed_lists, True, axis=1)
+            union = np.flatnonzero(probed.any(axis=0))
+
+            positions = _ranges(self.list_offsets[union], self.list_offsets[union + 1])
+            items = self.list_items[positions]
+            scores = (block @ self.list_vectors[positions].T).toarray()
+
+            # Each row keeps the rows of its own probed lists, except itself
+            allowed = probed[:, np.repeat(union, list_lengths[union])] & (items[None, :] != block_rows[:, None])
+            scores[~allowed] = -np.inf
+            widen = allowed.sum(axis=1) < k
+
+            top, top_scores = top_k_dense_rows(scores, min(k, scores.shape[1]))
+            keep = np.isfinite(top_scores) & (top_scores > 0) & ~widen[:, None]
+            rows.append(np.broadcast_to(block_rows[:, None], top.shape)[keep])
+            columns.append(items[top[keep]].astype(np.int64))
+            values.append(top_scores[keep])
+
+            for row in block_rows[widen]:
+                indices, row_scores = self.query(self.vectors[row], k + 1)
+                row_keep = (indices != row) & (row_scores > 0)
+                indices, row_scores = indices[row_keep][:k], row_scores[row_keep][:k]
+                rows.append(np.full(indices.size, row, dtype=np.int64))
+                columns.append(indices.astype(np.int64))
+                values.append(row_scores)
+
+        rows, columns, values = np.concatenate(rows), np.concatenate(columns), np.concatenate(values)
+        order = np.lexsort((-values, rows))
+        return rows[order], columns[order], values[order]
+
+    def _save_arrays(self, path):
+        np.save(os.path.join(path, "centroids.npy"), self.centroids)
+        np.save(os.path.join(path, "list_offsets.npy"), self.list_offsets)
+        np.save(os.path.join(path, "list_items.npy"), self.list_items)
+
+    def _load_arrays(self, path, mmap_mode):
+        self.centroids = np.load(os.path.join(path, "centroids.npy"), mmap_mode=mmap_mode)
+        self.list_offsets = np.load(os.path.join(path, "list_offsets.npy"), mmap_mode=mmap_mode)
+        self.list_items = np.load(os.path.join(path, "list_items.npy"), mmap_mode=mmap_mode)
+        self.list_vectors = self.vectors[self.list_items]
+
+
+NEIGHBOR_INDEXES = {
+    ExactNeighborIndex.backend: ExactNeighborIndex,
+    IVFNeighborIndex.backend: IVFNeighborIndex,
+}
+
+
+def build_neighbor_index(backend, vectors, **params):
+    """
+    Builds a neighbour index with the given backend.
+
+    Args:
+        backend (str): One of the keys of NEIGHBOR_INDEXES ('exact' or 'ivf').
+        vectors (scipy.sparse matrix): Row vectors to index.
+        **params: Backend-specific parameters (e.g. n_lists, n_probe for 'ivf').
+
+    Returns:
+        The built index.
+    """
+    if backend not in NEIGHBOR_INDEXES:
+        raise ValueError(f"Unknown neighbour index backend '{backend}'. Available: {list(NEIGHBOR_INDEXES)}")
+    return NEIGHBOR_INDEXES[backend](**params).build(vectors)
+
+
+def load_neighbor_index(path, mmap_mode=None, vectors=None):
+    """
+    Loads a neighbour index saved with `save`, whatever its backend.
+
+    Args:
+        path (str): Directory the index was saved to.
+        mmap_mode (str): Optional numpy memory-map mode for the dense arrays.
+        vectors (scipy.sparse matrix): The indexed vectors, if they were saved separately.
+
+    Returns:
+        The loaded index.
+    """
+    with open(os.path.join(path, "index.json"), "r") as f:
+        backend = json.load(f)["backend"]
+    return NEIGHBOR_INDEXES[backend].load(path, mmap_mode=mmap_mode, vectors=vectors)
+
+
+def neighbor_similarity_matrix(index, k):
+    """
+    Builds a sparse top-k similarity matrix from the neighbours of every indexed row.
+
+    Args:
+        index: A built neighbour index.
+        k (int): Number of neighbours to keep per row (the row itself is excluded).
+
+    Returns:
+        scipy.sparse.csr_matrix: Rows x rows similarity matrix.
+    """
+    n_rows = index.vectors.shape[0]
+    rows, columns, values = index.all_neighbors(k)
+    return sp.csr_matrix(
+        (np.asarray(values, dtype=np.float32), (rows, columns)), shape=(n_rows, n_rows)
+    )
@@ -0,0 +1,181 @@
+import time
+import numpy as np
+from .popularity import PopularityRecommender
+
+
+class CollaborativeCandidates:
+    """
+    Posts from the item-item neighbourhoods of the posts the user interacted with.
+    """
+    name = "collaborative"
+
+    def __init__(self, collaborative_model):
+        self.collaborative_model = collaborative_model
+
+    def generate(self, user_id, n, category_id=None, mood=None):
+        return self.collaborative_model.rank(user_id, top_n=n).post_ids
+
+
+class ContentCandidates:
+    """
+    Posts closest to the user's content profile, looked up in the content model's neighbour index.
+    """
+    name = "content"
+
+    def __init__(self, content_model, user_profiles):
+        self.content_model = content_model
+        self.user_profiles = user_profiles
+
+    def generate(self, user_id, n, category_id=None, mood=None):
+        user_index = self.user_profiles.user_index
+        if self.content_model.neighbor_index is None or user_id not in user_index:
+            return np.empty(0, dtype=np.int64)
+
+        profile = self.user_profiles.profiles[user_index.get_loc(user_id)]
+        if profile.nnz == 0:
+            return np.empty(0, dtype=np.int64)
+
+        indices, _ = self.content_model.neighbor_index.query(profile, n)
+        return self.content_model.posts_df['id'].values[indices]
+
+
+class TrendingCandidates:
+    """
+    Most popular posts, globally or within the requested category, from the popularity tables.
+    """
+    name = "trending"
+
+    def __init__(self, popularity):
+        self.popularity = popularity
+
+    def generate(self, user_id, n, category_id=None, mood=None):
+        return self.popularity.top(n, category_id=category_id).post_ids
+
+
+class MoodCandidates:
+    """
+    Most popular posts matching the requested mood; nothing without a mood.
+    """
+    name = "mood"
+
+    def __init__(self, popularity):
+        self.popularity = popularity
+
+    def generate(self, user_id, n, category_id=None, mood=None):
+        if not mood:
+            return np.empty(0, dtype=np.int64)
+        return self.popularity.top(n, mood=mood).post_ids
+
+
+class RecommendationPipeline:
+    """
+    Staged retrieval: candidate generators feed a bounded candidate set to a ranker.
+
+    Every generator contributes up to `max_candidates / len(generators)` posts; only the
+    union of those candidates is scored by the hybrid's models, so the cost of a request
+    depends on `max_candidates` rather than on the size of the catalog.
+    """
+    def __init__(self, hybrid_recommender, generators=None, max_candidates=500, popularity=None):
+        """
+        Args:
+            hybrid_recommender (HybridRecommender): Provides the models and the ranking weights.
+            generators (list): Candidate generators (objects with a `name` and a
+                `generate(user_id, n, category_id, mood)` method returning post ids).
+                Defaults to collaborative, content, trending and mood generators.
+            max_candidates (int): Upper bound on the candidate set passed to the ranker.
+            popularity (PopularityRecommender): Popularity tables of the trending and mood generators;
+                built from the content and collaborative models when omitted.
+        """
+        self.hybrid = hybrid_recommender
+        self.content_model = hybrid_recommender.content_model
+        self.collaborative_model = hybrid_recommender.collaborative_model
+        self.user_profiles = hybrid_recommender.user_profiles
+        self.max_candidates = max_candidates
+
+        if popularity is None:
+            popularity = PopularityRecommender(
+                self.content_model.posts_df,
+                getattr(self.collaborative_model, 'interactions_df', None),
+                post_index=self.content_model.post_index
+            )
+        self.popularity = popularity
+
+        if generators is None:
+            generators = [
+                CollaborativeCandidates(self.collaborative_model),
+                ContentCandidates(self.content_model, self.user_profiles),
+                TrendingCandidates(popularity),
+                MoodCandidates(popularity),
+            ]
+        self.generators = generators
+
+    def generate_candidates(self, user_id, category_id=None, mood=None, stats=None):
+        """
+        Runs every candidate generator and returns the union of their candidates.
+
+        Args:
+            user_id: User to generate candidates for.
+            category_id: Optional category filter, passed to the generators.
+            mood (str): Optional mood filter, passed to the generators.
+            stats (dict): Optional dict filled with per-generator seconds and candidate counts.
+
+        Returns:
+            np.ndarray: Unique candidate post ids, at most max_candidates.
+        """
+        quota = max(1, self.max_candidates // max(1, len(self.generators)))
+        candidates = []
+        for generator in self.generators:
+            start = time.perf_counter()
+            post_ids = np.asarray(generator.generate(user_id, quota, category_id=category_id, mood=mood), dtype=np.int64)
+            if stats is not None:
+                stats[generator.name] = {"seconds": time.perf_counter() - start, "candidates": int(post_ids.size)}
+            candidates.append(post_ids[:quota])
+
+        return np.unique(np.concatenate(candidates)) if candidates else np.empty(0, dtype=np.int64)
+
+    def rank_candidates(self, user_id, candidates, top_n=10, category_id=None, mood=None):
+        """
+        Scores the candidates with every hybrid model, after the category and mood filters.
+
+        The ranking is the hybrid's (`HybridRecommender.rank_candidates`): each component model
+        scores the candidates only, and the scores are fused with the hybrid weights and fusion
+        method. Posts the user already interacted with are dropped.
+
+        Returns:
+            RankedList: Top ranked candidates.
+        """
+        mask = self.content_model.filter_mask(category_id=category_id, mood=mood)
+        if mask is not None:
+            content_positions = self.content_model.positions_of(candidates)
+            keep = content_positions >= 0
+            keep[keep] = mask[content_positions[keep]]
+            candidates = candidates[keep]
+
+        return self.hybrid.rank_candidates(user_id, candidates, top_n=top_n)
+
+    def recommend(self, user_id, top_n=10, category_id=None, mood=None, stats=None):
+        """
+        Generates candidates and ranks them.
+
+        Args:
+            user_id: User to recommend posts for.
+            top_n (int): Number of posts to return.
+            category_id: Optional category filter.
+            mood (str): Optional mood filter.
+            stats (dict): Optional dict filled with per-stage 'seconds' and 'candidates'
+                under 'stages', the candidate set size and the ranking time.
+
+        Returns:
+            RankedList: Ranked post ids and scores.
+        """
+        stages = {}
+        candidates = self.generate_candidates(user_id, category_id=category_id, mood=mood, stats=stages)
+
+        start = time.perf_counter()
+        ranked = self.rank_candidates(user_id, candidates, top_n=top_n, category_id=category_id, mood=mood)
+
+        if stats is not None:
+            stats["stages"] = stages
+            stats["candidates"] = int(candidates.size)
+            stats["ranking_seconds"] = time.perf_counter() - start
+        return ranked
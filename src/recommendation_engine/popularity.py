@@ -0,0 +1,215 @@
+import threading
+import numpy as np
+import pandas as pd
+from .fusion import RankedList
+from .post_index import InvertedPostIndex
+from .signals import INTERACTION_WEIGHTS, interaction_strengths
+from .similarity import top_n_indices
+from .user_profiles import interaction_times
+
+# Aggregated count column of each interaction type in the posts data
+TOTAL_COLUMNS = {'viewed': 'total_views', 'liked': 'total_likes', 'rated': 'total_ratings', 'inspired': 'total_inspirations'}
+
+
+class PopularityRecommender:
+    """
+    Time-decayed popularity of every post, with precomputed ranked tables.
+
+    The score of a post is a decayed sum of its weighted interactions (halving every
+    `half_life_days`), seeded with `prior_weight` times its all-time totals
+    (total_views, total_likes, total_inspirations and total_ratings scaled by
+    average_rating_features). Ranked post arrays are kept globally, per category and
+    per mood token. Since every score decays by the same factor, the order of the
+    tables only changes for posts with new interactions, so `update` re-sorts only those.
+    """
+    def __init__(self, posts_df, interactions_df=None, half_life_days=7.0, interaction_weights=None,
+                 prior_weight=0.2, post_index=None):
+        """
+        Args:
+            posts_df (pd.DataFrame): Posts with id, category_id, category_name, moods and total_* columns.
+            interactions_df (pd.DataFrame): Optional interactions with post_id, interaction_type,
+                rating_percent and timestamp columns.
+            half_life_days (float): Age, in days, at which an interaction counts half.
+            interaction_weights (dict): Weight per interaction_type; defaults to INTERACTION_WEIGHTS.
+            prior_weight (float): Weight of the all-time totals in the initial scores.
+            post_index (InvertedPostIndex): Category and mood index of posts_df; built when omitted.
+        """
+        self.half_life_days = half_life_days
+        self.interaction_weights = dict(INTERACTION_WEIGHTS if interaction_weights is None else interaction_weights)
+        self.prior_weight = prior_weight
+        self.post_index = post_index if post_index is not None else InvertedPostIndex.from_posts(posts_df)
+        self.post_ids = np.asarray(posts_df['id'].values, dtype=np.int64)
+        self.as_of = None
+        self._update_lock = threading.Lock()
+
+        self._sorted_order = np.argsort(self.post_ids, kind='stable')
+        self._sorted_ids = self.post_ids[self._sorted_order]
+
+        self.scores = self.prior_weight * self._prior_scores(posts_df)
+        if interactions_df is not None and not interactions_df.empty:
+            positions, weights, self.as_of = self._decayed_interactions(interactions_df)
+            self.scores += np.bincount(positions, weights=weights, minlength=self.post_ids.size)
+
+        self._build_tables()
+
+    def _prior_scores(self, posts_df):
+        # All-time interaction totals, weighted like individual interactions
+        prior = np.zeros(len(posts_df))
+        for interaction_type, column in TOTAL_COLUMNS.items():
+            if column not in posts_df.columns:
+                continue
+            totals = posts_df[column].fillna(0).to_numpy(dtype=np.float64)
+            if interaction_type == 'rated' and 'average_rating_features' in posts_df.columns:
+                totals = totals * posts_df['average_rating_features'].fillna(0).to_numpy(dtype=np.float64) / 100.0
+            prior += self.interaction_weights.get(interaction_type, 0.0) * totals
+        return prior
+
+    def _positions(self, post_ids):
+        # Row positions of post ids, -1 for unknown posts
+        post_ids = np.asarray(post_ids, dtype=np.int64)
+        if self._sorted_ids.size == 0:
+            return np.full(post_ids.size, -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(self._sorted_ids, post_ids), self._sorted_ids.size - 1)
+        return np.where(self._sorted_ids[found] == post_ids, self._sorted_order[found], -1)
+
+    def _decayed_interactions(self, interactions_df, as_of=None):
+        """
+        Returns:
+            tuple: (positions, weights, as_of) of the known posts' interactions, decayed to the newest timestamp.
+        """
+        interactions_df = interactions_df.dropna(subset=['post_id'])
+        positions = self._positions(interactions_df['post_id'].astype(np.int64).to_numpy())
+
+        weights = interaction_strengths(interactions_df, self.interaction_weights)
+
+        times = interaction_times(interactions_df)
+        newest = times.max()
+        if pd.notna(newest) and (as_of is None or newest > as_of):
+            as_of = newest
+        if as_of is not None:
+            ages = ((as_of - times) / pd.Timedelta(days=1)).fillna(0.0).clip(lower=0.0).to_numpy()
+            weights = weights * self._decay(ages)
+
+        known = positions >= 0
+        return positions[known], weights[known], as_of
+
+    def _decay(self, age_days):
+        return np.power(0.5, np.asarray(age_days, dtype=np.float64) / self.half_life_days)
+
+    def _build_tables(self):
+        # Global, per-category and per-mood row positions, by descending score
+        self.global_order = np.argsort(-self.scores, kind='stable')
+        self.category_orders = {
+            key: self._sort_positions(self._positions(post_ids)) for key, post_ids in self.post_index.categories.items()
+        }
+        self.mood_orders = {
+            token: self._sort_positions(self._positions(post_ids))
+            for token, post_ids in zip(self.post_index.tokens, self.post_index.postings)
+        }
+
+        # Tables each post appears in, to re-sort only those on update
+        self._post_tables = [[] for _ in range(self.post_ids.size)]
+        for tables in (self.category_orders, self.mood_orders):
+            for key, order in tables.items():
+                for position in order.tolist():
+                    self._post_tables[position].append((tables is self.mood_orders, key))
+
+    def _sort_positions(self, positions, scores=None):
+        scores = self.scores if scores is None else scores
+        positions = positions[positions >= 0]
+        return positions[np.argsort(-scores[positions], kind='stable')]
+
+    @staticmethod
+    def _resort(order, moved, scores):
+        # Moves the changed posts of a ranked table to their new places
+        is_moved = moved[order]
+        if not is_moved.any():
+            return order
+        rest = order[~is_moved]
+        moving = order[is_moved]
+        moving = moving[np.argsort(-scores[moving], kind='stable')]
+        return np.insert(rest, np.searchsorted(-scores[rest], -scores[moving], side='right'), moving)
+
+    def update(self, interactions_df):
+        """
+        Folds new interactions into the scores and re-sorts the affected posts in their tables.
+
+        Args:
+            interactions_df (pd.DataFrame): New interactions with post_id, interaction_type and timestamp columns.
+
+        Returns:
+            PopularityRecommender: self, for chaining.
+        """
+        if interactions_df is None or interactions_df.empty:
+            return self
+
+        with self._update_lock:
+            positions, weights, as_of = self._decayed_interactions(interactions_df, self.as_of)
+            if positions.size == 0:
+                return self
+
+            # Decaying every score by the same factor keeps every table in order
+            scores = self.scores.copy()
+            if self.as_of is not None and as_of != self.as_of:
+                scores *= self._decay((as_of - self.as_of) / pd.Timedelta(days=1))
+            scores += np.bincount(positions, weights=weights, minlength=scores.size)
+
+            affected = np.unique(positions)
+            moved = np.zeros(scores.size, dtype=bool)
+            moved[affected] = True
+
+            # Re-sort each table holding a changed post, once
+            tables = {key for position in affected.tolist() for key in self._post_tables[position]}
+            category_orders, mood_orders = dict(self.category_orders), dict(self.mood_orders)
+            for is_mood, key in tables:
+                orders = mood_orders if is_mood else category_orders
+                orders[key] = self._resort(orders[key], moved, scores)
+            global_order = self._resort(self.global_order, moved, scores)
+
+            self.as_of = as_of
+            self.global_order = global_order
+            self.category_orders = category_orders
+            self.mood_orders = mood_orders
+            self.scores = scores
+        return self
+
+    def top(self, n=10, category_id=None, mood=None):
+        """
+        Returns the most popular posts, optionally within a category and/or mood.
+
+        A single exact filter is a slice of a precomputed table; other filters (mood
+        substrings, category and mood together) rank the matching posts with argpartition.
+
+        Args:
+            n (int): Number of posts to return.
+            category_id: Optional category id or name.
+            mood (str): Optional mood; matches every mood token containing it.
+
+        Returns:
+            RankedList: Post ids and popularity scores.
+        """
+        scores = self.scores
+        mood_tokens = self.post_index.matching_tokens(mood) if mood else []
+        if category_id is None and not mood:
+            order = self.global_order[:n]
+        elif category_id is not None and not mood:
+            order = self.category_orders.get(category_id, np.empty(0, dtype=np.int64))[:n]
+        elif category_id is None and len(mood_tokens) == 1:
+            order = self.mood_orders[mood_tokens[0]][:n]
+        else:
+            positions = self._positions(self.post_index.lookup(category_id=category_id, mood=mood))
+            order = positions[top_n_indices(scores[positions], n)]
+        return RankedList(self.post_ids[order], scores[order])
+
+    def rank(self, user_id, top_n=10):
+        # Same ranking for every user, so popularity can join the hybrid fan-out
+        return self.top(top_n)
+
+    def recommend_cold_start(self, top_n=10, category_id=None, mood=None):
+        """
+        Ranked feed for users without interactions.
+
+        Returns:
+            pd.DataFrame: Columns post_id and score, by descending popularity.
+        """
+        return self.top(top_n, category_id=category_id, mood=mood).to_frame()
@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+
+MATCH_MODES = ('exact', 'prefix', 'substring')
+
+
+def normalize_token(token):
+    """
+    Normalises a mood token or query: stripped and lowercase.
+    """
+    return str(token).strip().lower()
+
+
+class _TrieNode:
+    __slots__ = ('children', 'token_ids')
+
+    def __init__(self):
+        self.children = {}
+        self.token_ids = []
+
+
+class TokenTrie:
+    """
+    Character trie over a token vocabulary.
+
+    Every node keeps the ids of the tokens inserted through it, so a lookup is one walk
+    down the trie. With `suffixes=True` every suffix of every token is inserted, which
+    turns prefix lookups into substring lookups (a suffix trie).
+    """
+    def __init__(self, suffixes=False):
+        self.suffixes = suffixes
+        self.root = _TrieNode()
+
+    def insert(self, token, token_id):
+        starts = range(len(token)) if self.suffixes else (0,)
+        for start in starts:
+            node = self.root
+            for char in token[start:]:
+                node = node.children.setdefault(char, _TrieNode())
+                # A token is recorded once per node even if several of its suffixes pass through it
+                if not node.token_ids or node.token_ids[-1] != token_id:
+                    node.token_ids.append(token_id)
+
+    def lookup(self, query):
+        """
+        Returns:
+            list: Ids of the tokens starting with (or, for a suffix trie, containing) the query.
+        """
+        node = self.root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.token_ids
+
+
+class InvertedPostIndex:
+    """
+    Inverted index from category and normalised mood token to sorted post-id arrays.
+
+    Category lookups accept both category ids and category names. Mood lookups match
+    tokens exactly, by prefix or by substring (through token tries); the posting lists
+    of the matching tokens are merged, and filters are combined by intersecting sorted arrays.
+    """
+    def __init__(self, post_ids, category_ids=None, category_names=None, moods=None):
+        """
+        Args:
+            post_ids (array-like): Post ids.
+            category_ids (array-like): Category id of every post.
+            category_names (array-like): Category name of every post.
+            moods (array-like): Comma-separated mood string of every post.
+        """
+        post_ids = np.asarray(post_ids, dtype=np.int64)
+        self.post_ids = np.unique(post_ids)
+
+        self.categories = {}
+        for values in (category_ids, category_names):
+            if values is not None:
+                self.categories.update(self._posting_lists(post_ids, pd.Series(values).to_numpy()))
+
+        # Flatten the mood lists into (post id, token) pairs
+        self.tokens = np.empty(0, dtype=object)
+        self.postings = []
+        if moods is not None:
+            mood_lists = pd.Series(moods).fillna("").astype(str).str.split(',')
+            owners = np.repeat(post_ids, mood_lists.str.len().values)
+            tokens = np.array([normalize_token(mood) for moods in mood_lists for mood in moods], dtype=object)
+            keep = tokens != ""
+            postings = self._posting_lists(owners[keep], tokens[keep])
+            self.tokens = np.array(list(postings), dtype=object)
+            self.postings = list(postings.values())
+
+        self.token_ids = {token: token_id for token_id, token in enumerate(self.tokens)}
+        self.prefix_trie = TokenTrie()
+        self.substring_trie = TokenTrie(suffixes=True)
+        for token_id, token in enumerate(self.tokens):
+            self.prefix_trie.insert(token, token_id)
+            self.substring_trie.insert(token, token_id)
+        self._mood_cache = {}
+
+    @classmethod
+    def from_posts(cls, posts_df):
+        """
+        Builds the index from a posts DataFrame with id, category_id, category_name and moods columns.
+        """
+        return cls(
+            posts_df['id'].values,
+            category_ids=posts_df['category_id'].values if 'category_id' in posts_df.columns else None,
+            category_names=posts_df['category_name'].values if 'category_name' in posts_df.columns else None,
+            moods=posts_df['moods'].values if 'moods' in posts_df.columns else None
+        )
+
+    @staticmethod
+    def _posting_lists(post_ids, keys):
+        # Groups post ids by key into sorted, duplicate-free arrays
+        codes, values = pd.factorize(keys)
+        order = np.lexsort((post_ids, codes))
+        boundaries = np.searchsorted(codes[order], np.arange(len(values) + 1))
+        sorted_ids = post_ids[order]
+        return {
+            value: np.unique(sorted_ids[boundaries[code]:boundaries[code + 1]])
+            for code, value in enumerate(values)
+        }
+
+    def category(self, category_id):
+        """
+        Returns:
+            np.ndarray: Sorted ids of the posts in the category (by id or name), empty if unknown.
+        """
+        return self.categories.get(category_id, np.empty(0, dtype=np.int64))
+
+    def matching_tokens(self, query, match='substring'):
+        """
+        Returns:
+            list: Mood tokens matching the query.
+        """
+        return [self.tokens[token_id] for token_id in self._token_ids(normalize_token(query), match)]
+
+    def _token_ids(self, query, match):
+        if match not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode '{match}'. Available: {MATCH_MODES}")
+        if match == 'exact':
+            return [self.token_ids[query]] if query in self.token_ids else []
+        if match == 'prefix':
+            return self.prefix_trie.lookup(query)
+        return self.substring_trie.lookup(query)
+
+    def mood(self, query, match='substring'):
+        """
+        Returns the posts having a mood token that matches the query.
+
+        Args:
+            query (str): Mood to look up, normalised like the tokens.
+            match (str): 'exact', 'prefix' or 'substring' (the behaviour of str.contains).
+
+        Returns:
+            np.ndarray: Sorted post ids.
+        """
+        query = normalize_token(query)
+        key = (query, match)
+        if key not in self._mood_cache:
+            if len(self._mood_cache) >= 256:
+                self._mood_cache.clear()
+            token_ids = self._token_ids(query, match)
+            if not token_ids:
+                post_ids = np.empty(0, dtype=np.int64)
+            elif len(token_ids) == 1:
+                post_ids = self.postings[token_ids[0]]
+            else:
+                post_ids = np.unique(np.concatenate([self.postings[token_id] for token_id in token_ids]))
+            self._mood_cache[key] = post_ids
+        return self._mood_cache[key]
+
+    def lookup(self, category_id=None, mood=None, match='substring'):
+        """
+        Intersects the category and mood posting lists.
+
+        Returns:
+            np.ndarray or None: Sorted post ids matching every given filter, or None when no filter is given.
+        """
+        post_ids = None
+        if category_id is not None:
+            post_ids = self.category(category_id)
+        if mood:
+            mood_ids = self.mood(mood, match=match)
+            post_ids = mood_ids if post_ids is None else np.intersect1d(post_ids, mood_ids, assume_unique=True)
+        return post_ids
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from .user_profiles import interaction_times
+
+# Weight of one interaction of each type (ratings are further scaled by their rating percent)
+INTERACTION_WEIGHTS = {'viewed': 1.0, 'liked': 3.0, 'rated': 2.0, 'inspired': 4.0}
+
+
+def interaction_strengths(interactions_df, interaction_weights):
+    """
+    Weighs every interaction by its type; ratings are further scaled by their rating percent.
+
+    Args:
+        interactions_df (pd.DataFrame): Interactions with interaction_type and optional rating_percent.
+        interaction_weights (dict): Weight per interaction_type; unknown types weigh 0.
+
+    Returns:
+        np.ndarray: float64 weight of every interaction.
+    """
+    weights = interactions_df['interaction_type'].map(interaction_weights).astype(np.float64).fillna(0.0).to_numpy()
+    if 'rating_percent' in interactions_df.columns:
+        rated = (interactions_df['interaction_type'] == 'rated').to_numpy()
+        rating = interactions_df['rating_percent'].fillna(100.0).to_numpy(dtype=np.float64) / 100.0
+        weights = np.where(rated, weights * rating, weights)
+    return weights
+
+
+class InteractionSignals:
+    """
+    Weighted, time-decayed users x posts signal matrix built from the interaction log.
+
+    Every interaction weighs its type's weight (ratings scaled by their rating percent)
+    times `0.5 ** (age / half_life_days)`, with ages counted back from the newest
+    interaction (`as_of`); weights of repeated (user, post) pairs add up. Since every
+    weight decays by the same factor, moving `as_of` forward (`decay_to`) only rescales
+    the matrix, without going back to the raw events.
+    """
+    def __init__(self, interaction_weights=None, half_life_days=30.0):
+        """
+        Args:
+            interaction_weights (dict): Weight per interaction_type; defaults to INTERACTION_WEIGHTS.
+                Without an interaction_type column every interaction weighs 1.
+            half_life_days (float): Age, in days, at which an interaction weighs half; None disables the decay.
+        """
+        self.interaction_weights = dict(INTERACTION_WEIGHTS if interaction_weights is None else interaction_weights)
+        self.half_life_days = half_life_days
+        self.as_of = None
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.post_ids = np.empty(0, dtype=np.int64)
+        self.matrix = sp.csr_matrix((0, 0), dtype=np.float32)
+
+    def decay_factor(self, days):
+        """
+        Returns:
+            float: Factor applied to a weight that ages by `days` (1 when the decay is disabled).
+        """
+        if self.half_life_days is None:
+            return 1.0
+        return float(np.power(0.5, np.asarray(days, dtype=np.float64) / self.half_life_days))
+
+    def event_weights(self, interactions_df, as_of=None):
+        """
+        Computes the weight of every interaction in one vectorized pass.
+
+        Args:
+            interactions_df (pd.DataFrame): Interactions with interaction_type, rating_percent and timestamp columns.
+            as_of (pd.Timestamp): Time ages are counted from; the newest interaction (or the
+                given as_of, if later) is used.
+
+        Returns:
+            tuple: (weights, as_of). Interactions without a timestamp are weighted as if they happened at as_of.
+        """
+        if 'interaction_type' in interactions_df.columns:
+            weights = interaction_strengths(interactions_df, self.interaction_weights)
+        else:
+            weights = np.ones(len(interactions_df))
+        if self.half_life_days is None:
+            return weights, as_of
+
+        times = interaction_times(interactions_df)
+        newest = times.max()
+        if pd.notna(newest) and (as_of is None or newest > as_of):
+            as_of = newest
+        if as_of is not None:
+            ages = ((as_of - times) / pd.Timedelta(days=1)).fillna(0.0).clip(lower=0.0).to_numpy()
+            weights = weights * np.power(0.5, ages / self.half_life_days)
+        return weights, as_of
+
+    def build(self, interactions_df):
+        """
+        Computes the signal matrix from scratch.
+
+        Args:
+            interactions_df (pd.DataFrame): Interactions with user_id and post_id, plus interaction_type,
+                rating_percent and timestamp columns when available.
+
+        Returns:
+            InteractionSignals: self, for chaining.
+        """
+        interactions_df = interactions_df.dropna(subset=['user_id', 'post_id'])
+        weights, self.as_of = self.event_weights(interactions_df)
+
+        # Map user and post ids to dense integer positions
+        self.user_ids, user_codes = np.unique(interactions_df['user_id'].astype(np.int64).to_numpy(), return_inverse=True)
+        self.post_ids, post_codes = np.unique(interactions_df['post_id'].astype(np.int64).to_numpy(), return_inverse=True)
+
+        matrix = sp.csr_matrix(
+            (weights.astype(np.float32), (user_codes, post_codes)), shape=(len(self.user_ids), len(self.post_ids))
+        )
+        matrix.sum_duplicates()
+        matrix.eliminate_zeros()
+        self.matrix = matrix
+        return self
+
+    def decay_to(self, as_of):
+        """
+        Ages every weight to a later time by rescaling the matrix with one constant factor.
+
+        Args:
+            as_of (pd.Timestamp): New reference time; earlier times are ignored.
+
+        Returns:
+            float: The factor applied to the weights.
+        """
+        as_of = pd.Timestamp(as_of)
+        if self.half_life_days is None or self.as_of is None or as_of <= self.as_of:
+            if self.as_of is None:
+                self.as_of = as_of
+            return 1.0
+        factor = self.decay_factor((as_of - self.as_of) / pd.Timedelta(days=1))
+        self.matrix = self.matrix * np.float32(factor)
+        self.as_of = as_of
+        return factor
@@ -0,0 +1,178 @@
+import numpy as np
+import scipy.sparse as sp
+
+
+def top_n_indices(scores, top_n):
+    """
+    Selects the positions of the top_n largest scores with argpartition.
+
+    Args:
+        scores (np.ndarray): One-dimensional array of scores.
+        top_n (int): Number of positions to return.
+
+    Returns:
+        np.ndarray: Positions of the best scores, sorted by descending score.
+    """
+    if top_n <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.intp)
+
+    if top_n < scores.size:
+        candidates = np.argpartition(-scores, top_n - 1)[:top_n]
+    else:
+        candidates = np.arange(scores.size)
+
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def top_k_per_row(matrix, k):
+    """
+    Finds the k largest stored entries of every row of a sparse matrix.
+
+    Args:
+        matrix (scipy.sparse matrix): Matrix to search.
+        k (int): Number of entries to keep per row.
+
+    Returns:
+        tuple: (rows, columns, values) arrays, ordered by row and then by descending value.
+    """
+    matrix = sp.csr_matrix(matrix)
+    matrix.eliminate_zeros()
+    matrix.sort_indices()
+
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+
+    # Sort entries by row, then by descending value, and rank them inside their row
+    order = np.lexsort((-matrix.data, rows))
+    rank = np.arange(order.size) - matrix.indptr[rows]
+    keep = order[rank < k]
+
+    return rows[keep], matrix.indices[keep], matrix.data[keep]
+
+
+def prune_top_k(matrix, k):
+    """
+    Keeps only the k largest entries of every row of a sparse matrix.
+
+    Args:
+        matrix (scipy.sparse matrix): Similarity matrix to prune.
+        k (int): Number of entries to keep per row.
+
+    Returns:
+        scipy.sparse.csr_matrix: Pruned matrix with the same shape.
+    """
+    rows, columns, values = top_k_per_row(matrix, k)
+    return sp.csr_matrix((values, (rows, columns)), shape=matrix.shape)
+
+
+def cooccurrence_matrix(interaction_matrix):
+    """
+    Computes the item co-occurrence matrix X^T X of a users x items interaction matrix.
+
+    For a binary matrix, entry (i, j) counts the users who interacted with both items and
+    the diagonal holds the squared item norms.
+
+    Returns:
+        scipy.sparse.csr_matrix: Items x items co-occurrence matrix.
+    """
+    interaction_matrix = sp.csc_matrix(interaction_matrix, dtype=np.float32)
+    return (interaction_matrix.T @ interaction_matrix).tocsr()
+
+
+def cosine_rows(cooccurrence, norms, k, rows=None):
+    """
+    Computes rows of the item-item cosine similarity from co-occurrence counts and item norms,
+    keeping the top k neighbours per item.
+
+    Args:
+        cooccurrence (scipy.sparse.csr_matrix): Items x items co-occurrence matrix.
+        norms (np.ndarray): Norm of every item column (the square root of the diagonal).
+        k (int): Number of neighbours to keep per item.
+        rows (np.ndarray): Items to compute the rows of; every item when omitted.
+
+    Returns:
+        scipy.sparse.csr_matrix: len(rows) x items similarity rows without self-similarity.
+    """
+    rows = np.arange(cooccurrence.shape[0]) if rows is None else np.asarray(rows)
+    inverse = np.zeros(norms.size, dtype=np.float32)
+    inverse[norms > 0] = 1.0 / norms[norms > 0]
+
+    similarity = sp.csr_matrix(cooccurrence[rows], dtype=np.float32)
+    row_of_entry = np.repeat(np.arange(rows.size), np.diff(similarity.indptr))
+    similarity.data *= inverse[rows][row_of_entry] * inverse[similarity.indices]
+
+    # An item is not its own neighbour
+    similarity.data[similarity.indices == rows[row_of_entry]] = 0.0
+
+    return prune_top_k(similarity, k)
+
+
+def cosine_item_similarity(interaction_matrix, k):
+    """
+    Computes a sparse item-item cosine similarity matrix, keeping the top k neighbours per item.
+
+    Args:
+        interaction_matrix (scipy.sparse matrix): Users x items interaction matrix.
+        k (int): Number of neighbours to keep per item.
+
+    Returns:
+        scipy.sparse.csr_matrix: Items x items similarity matrix without self-similarity.
+    """
+    cooccurrence = cooccurrence_matrix(interaction_matrix)
+    return cosine_rows(cooccurrence, np.sqrt(cooccurrence.diagonal()), k)
+
+
+def top_k_neighbors(features, k, batch_size=1024):
+    """
+    Builds an exact top-k cosine neighbour table for the rows of an L2-normalised matrix.
+
+    Similarities are computed one block of rows at a time, so the full
+    rows x rows similarity matrix is never materialised.
+
+    Args:
+        features (scipy.sparse matrix): L2-normalised row vectors.
+        k (int): Number of neighbours to keep per row.
+        batch_size (int): Number of rows scored per block.
+
+    Returns:
+        tuple: (indices, scores) arrays of shape (rows, k), sorted by descending score.
+    """
+    features = sp.csr_matrix(features)
+    n_rows = features.shape[0]
+    k = max(min(k, n_rows - 1), 0)
+
+    indices = np.empty((n_rows, k), dtype=np.int32)
+    scores = np.empty((n_rows, k), dtype=np.float32)
+    if k == 0:
+        return indices, scores
+
+    features_t = features.T.tocsc()
+    for start in range(0, n_rows, batch_size):
+        end = min(start + batch_size, n_rows)
+        block = (features[start:end] @ features_t).toarray()
+
+        # A row is not its own neighbour
+        block[np.arange(end - start), np.arange(start, end)] = -np.inf
+
+        indices[start:end], scores[start:end] = top_k_dense_rows(block, k)
+
+    return indices, scores
+
+
+def top_k_dense_rows(block, k):
+    """
+    Selects the k largest entries of every row of a dense score block with argpartition.
+
+    Args:
+        block (np.ndarray): Scores of shape (rows, columns).
+        k (int): Number of entries per row, at most the number of columns.
+
+    Returns:
+        tuple: (indices, scores) arrays of shape (rows, k), sorted by descending score.
+    """
+    if k <= 0:
+        return np.empty((block.shape[0], 0), dtype=np.intp), np.empty((block.shape[0], 0), dtype=block.dtype)
+
+    top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(block, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
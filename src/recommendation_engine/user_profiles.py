@@ -0,0 +1,255 @@
+import threading
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from .fusion import RankedList
+from .similarity import top_k_dense_rows, top_n_indices
+
+# Interaction timestamp columns, in order of preference
+TIMESTAMP_COLUMNS = ('viewed_at', 'liked_at', 'inspired_at', 'rated_at')
+
+
+def interaction_times(interactions_df):
+    """
+    Returns the timestamp of every interaction: the first of TIMESTAMP_COLUMNS that is set.
+
+    Returns:
+        pd.Series: datetime64 timestamps, NaT when no timestamp column is set.
+    """
+    times = pd.Series(pd.NaT, index=interactions_df.index, dtype='datetime64[ns]')
+    for column in TIMESTAMP_COLUMNS:
+        if column in interactions_df.columns:
+            times = times.fillna(pd.to_datetime(interactions_df[column], errors='coerce'))
+    return times
+
+
+class UserProfiles:
+    """
+    Content profile of every user: the time-weighted mean of the `combined_features`
+    rows of the posts the user interacted with.
+
+    Profiles are kept as one sparse users x features matrix, so scoring a user against
+    every post is a single sparse matrix-vector product. Interactions are weighted by
+    `0.5 ** (age / half_life_days)`; new interactions are folded in incrementally by
+    `update`, without revisiting the old ones.
+    """
+    def __init__(self, content_model, half_life_days=30.0):
+        """
+        Args:
+            content_model (ContentBasedRecommender): Model providing posts_df and combined_features.
+            half_life_days (float): Age, in days, at which an interaction weighs half as much as a new one.
+        """
+        self.content_model = content_model
+        self.half_life_days = half_life_days
+        self.post_ids = np.asarray(content_model.posts_df['id'].values, dtype=np.int64)
+        self.as_of = None
+        self.user_index = pd.Index([], dtype=np.int64, name='user_id')
+        n_posts = len(self.post_ids)
+        n_features = 0 if content_model.combined_features is None else content_model.combined_features.shape[1]
+        self.interaction_weights = sp.csr_matrix((0, n_posts), dtype=np.float32)
+        self.weight_totals = np.zeros(0, dtype=np.float64)
+        self.profiles = sp.csr_matrix((0, n_features), dtype=np.float32)
+        self._features_t = None if content_model.combined_features is None else content_model.combined_features.T.tocsc()
+        self._update_lock = threading.Lock()
+
+    def build(self, interactions_df):
+        """
+        Computes the profiles of every user from scratch.
+
+        Args:
+            interactions_df (pd.DataFrame): Interactions with user_id, post_id and timestamp columns.
+
+        Returns:
+            UserProfiles: self, for chaining.
+        """
+        self.as_of = None
+        self.user_index = pd.Index([], dtype=np.int64, name='user_id')
+        self.interaction_weights = sp.csr_matrix((0, len(self.post_ids)), dtype=np.float32)
+        self.weight_totals = np.zeros(0, dtype=np.float64)
+        return self.update(interactions_df)
+
+    def _decay(self, age_days):
+        return np.power(0.5, np.asarray(age_days, dtype=np.float64) / self.half_life_days)
+
+    def update(self, interactions_df):
+        """
+        Folds new interactions into the profiles.
+
+        Existing weights are decayed to the newest timestamp with one constant factor (which
+        leaves every mean unchanged), the new interactions are added to the sparse
+        users x posts weight matrix, and only the profiles of the affected users are recomputed.
+        Interactions without a timestamp are weighted as if they happened now.
+
+        Args:
+            interactions_df (pd.DataFrame): New interactions with user_id, post_id and timestamp columns.
+
+        Returns:
+            UserProfiles: self, for chaining.
+        """
+        if self._features_t is None or interactions_df is None or interactions_df.empty:
+            return self
+
+        with self._update_lock:
+            interactions_df = interactions_df.dropna(subset=['user_id', 'post_id'])
+            positions = self.content_model.positions_of(interactions_df['post_id'].astype(int).to_numpy())
+            known = positions >= 0
+            interactions_df, positions = interactions_df[known], positions[known]
+            if interactions_df.empty:
+                return self
+
+            # Decay the existing weights to the newest interaction time
+            times = interaction_times(interactions_df)
+            newest = times.max()
+            as_of = self.as_of
+            if pd.notna(newest) and (as_of is None or newest > as_of):
+                as_of = newest
+            factor = 1.0
+            if self.as_of is not None and as_of != self.as_of:
+                factor = float(self._decay((as_of - self.as_of) / pd.Timedelta(days=1)))
+            ages = np.zeros(len(times))
+            if as_of is not None:
+                ages = ((as_of - times) / pd.Timedelta(days=1)).fillna(0.0).clip(lower=0.0).to_numpy()
+            weights = self._decay(ages)
+
+            # New users get rows appended at the end, so existing row positions never move
+            user_ids = interactions_df['user_id'].astype(np.int64).to_numpy()
+            new_users = pd.Index(np.unique(user_ids)).difference(self.user_index)
+            user_index = self.user_index.append(new_users.astype(np.int64)).rename('user_id')
+            rows = user_index.get_indexer(user_ids)
+
+            n_users = len(user_index)
+            delta = sp.csr_matrix(
+                (weights.astype(np.float32), (rows, positions)), shape=(n_users, len(self.post_ids))
+            )
+            interaction_weights = self.interaction_weights * np.float32(factor)
+            interaction_weights.resize((n_users, len(self.post_ids)))
+            interaction_weights = (interaction_weights + delta).tocsr()
+
+            weight_totals = np.zeros(n_users, dtype=np.float64)
+            weight_totals[:len(self.weight_totals)] = self.weight_totals * factor
+            weight_totals += np.bincount(rows, weights=weights, minlength=n_users)
+
+            # Recompute only the rows of the users with new interactions
+            affected = np.unique(rows)
+            affected_profiles = sp.diags(1.0 / weight_totals[affected]) @ interaction_weights[affected] @ self.content_model.combined_features
+            unchanged = np.ones(self.profiles.shape[0], dtype=np.float32)
+            unchanged[affected[affected < unchanged.size]] = 0.0
+            profiles = (sp.diags(unchanged) @ self.profiles).tocsr()
+            profiles.resize((n_users, self.profiles.shape[1]))
+            scatter = sp.csr_matrix(
+                (np.ones(affected.size, dtype=np.float32), (affected, np.arange(affected.size))), shape=(n_users, affected.size)
+            )
+            profiles = (profiles + scatter @ affected_profiles.astype(np.float32)).tocsr()
+            profiles.eliminate_zeros()
+
+            # Readers look up user_index first, so it is swapped in last
+            self.as_of = as_of
+            self.weight_totals = weight_totals
+            self.interaction_weights = interaction_weights
+            self.profiles = profiles
+            self.user_index = user_index
+        return self
+
+    def rank(self, user_id, top_n=10):
+        """
+        Ranks the posts the user has not interacted with by similarity to their profile.
+
+        Args:
+            user_id: User to rank for.
+            top_n (int): Number of posts to return.
+
+        Returns:
+            RankedList: Post ids and scores, empty for users without a profile.
+        """
+        user_index = self.user_index
+        if user_id not in user_index:
+            return RankedList.empty()
+        row = user_index.get_loc(user_id)
+        profiles, interaction_weights = self.profiles, self.interaction_weights
+
+        profile = profiles[row]
+        if profile.nnz == 0:
+            return RankedList.empty()
+
+        # One sparse dot product scores every post
+        scores = (profile @ self._features_t).toarray().ravel()
+        scores[interaction_weights[row].indices] = 0.0
+
+        top_indices = top_n_indices(scores, top_n)
+        top_indices = top_indices[scores[top_indices] > 0]
+        return RankedList(self.post_ids[top_indices], scores[top_indices].astype(np.float64))
+
+    def score_candidates(self, user_id, post_ids):
+        """
+        Scores the given posts for a user, as `rank` scores every post.
+
+        Args:
+            user_id: User to score for.
+            post_ids (np.ndarray): Posts to score.
+
+        Returns:
+            tuple: (scores, seen) arrays aligned with post_ids. Scores are NaN where `rank` would
+                not return the post (unknown post, no profile or no positive similarity); seen
+                flags the posts the user interacted with.
+        """
+        post_ids = np.asarray(post_ids, dtype=np.int64)
+        scores = np.full(post_ids.size, np.nan)
+        seen = np.zeros(post_ids.size, dtype=bool)
+        user_index = self.user_index
+        if self._features_t is None or user_id not in user_index:
+            return scores, seen
+        row = user_index.get_loc(user_id)
+        profiles, interaction_weights = self.profiles, self.interaction_weights
+
+        positions = self.content_model.positions_of(post_ids)
+        known = positions >= 0
+        seen[known] = np.isin(positions[known], interaction_weights[row].indices)
+        profile = profiles[row]
+        if profile.nnz and known.any():
+            known_scores = (profile @ self._features_t[:, positions[known]]).toarray().ravel()
+            scores[known] = np.where(known_scores > 0, known_scores, np.nan)
+        return scores, seen
+
+    def recommend(self, user_id, top_n=10):
+        return self.rank(user_id, top_n=top_n).to_frame()
+
+    def recommend_many(self, user_ids, top_n=10, batch_size=512):
+        """
+        Ranks posts for a batch of users with blocked sparse matrix products.
+
+        Args:
+            user_ids (iterable): Users to rank for. Users without a profile are skipped.
+            top_n (int): Number of posts per user.
+            batch_size (int): Users scored per matrix product.
+
+        Returns:
+            pd.DataFrame: Columns user_id, post_id and score, ranked per user.
+        """
+        columns = ['user_id', 'post_id', 'score']
+        user_index = self.user_index
+        user_ids = np.asarray(list(user_ids), dtype=np.int64)
+        rows = user_index.get_indexer(user_ids)
+        user_ids, rows = user_ids[rows >= 0], rows[rows >= 0]
+        k = min(top_n, len(self.post_ids))
+        if self._features_t is None or rows.size == 0 or k == 0:
+            return pd.DataFrame(columns=columns)
+
+        profiles, interaction_weights = self.profiles, self.interaction_weights
+        frames = []
+        for start in range(0, rows.size, batch_size):
+            batch = rows[start:start + batch_size]
+            block = (profiles[batch] @ self._features_t).toarray()
+
+            # Mask the posts every user has already interacted with
+            seen = interaction_weights[batch].tocoo()
+            block[seen.row, seen.col] = 0.0
+
+            indices, scores = top_k_dense_rows(block, k)
+            valid = scores > 0
+            frames.append(pd.DataFrame({
+                'user_id': np.repeat(user_ids[start:start + batch_size], k)[valid.ravel()],
+                'post_id': self.post_ids[indices[valid]],
+                'score': scores[valid].astype(float)
+            }))
+
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import pandas as pd
+from src.recommendation_engine.artifacts import current_version, prune_versions
+from src.recommendation_engine.content_based import ContentBasedRecommender
+from src.recommendation_engine.collaborative import CollaborativeRecommender
+
+# Paths to test datasets
+posts_csv_path = "data/processed/all_posts_with_features.csv"
+interactions_csv_path = "data/processed/interaction_df.csv"
+
+with tempfile.TemporaryDirectory() as artifacts_dir:
+    content_dir = f"{artifacts_dir}/content"
+    collaborative_dir = f"{artifacts_dir}/collaborative"
+
+    # First call builds and saves the artifacts, second call memory-maps them
+    built_content = ContentBasedRecommender.load_or_build(posts_csv_path, content_dir, similarity_mode='precomputed')
+    loaded_content = ContentBasedRecommender.load_or_build(posts_csv_path, content_dir, similarity_mode='precomputed')
+
+    valid_post_id = built_content.posts_df['id'].iloc[0]
+    print(f"Content recommendations from the built model:\n{built_content.recommend(valid_post_id, top_n=10)}")
+    print(f"Content recommendations from the loaded model:\n{loaded_content.recommend(valid_post_id, top_n=10)}")
+    assert built_content.recommend(valid_post_id, top_n=10).equals(loaded_content.recommend(valid_post_id, top_n=10))
+
+    # The posts table is stored as .npy columns and JSON, without pickle
+    assert not any(name.endswith(".pkl") for name in os.listdir(current_version(content_dir)))
+    pd.testing.assert_frame_equal(built_content.posts_df.reset_index(drop=True), loaded_content.posts_df)
+
+    built_collaborative = CollaborativeRecommender.load_or_build(interactions_csv_path, collaborative_dir)
+    loaded_collaborative = CollaborativeRecommender.load_or_build(interactions_csv_path, collaborative_dir)
+
+    valid_user_id = 1
+    print(f"Collaborative recommendations from the built model:\n{built_collaborative.recommend(valid_user_id, top_n=10)}")
+    print(f"Collaborative recommendations from the loaded model:\n{loaded_collaborative.recommend(valid_user_id, top_n=10)}")
+    assert built_collaborative.recommend(valid_user_id, top_n=10).equals(loaded_collaborative.recommend(valid_user_id, top_n=10))
+
+    # Changing a build parameter makes the saved artifacts stale, so the model is rebuilt
+    loaded_collaborative_version = current_version(collaborative_dir)
+    rebuilt_collaborative = CollaborativeRecommender.load_or_build(interactions_csv_path, collaborative_dir, n_neighbors=20)
+    print(f"Rebuilt collaborative model keeps {rebuilt_collaborative.n_neighbors} neighbours per post")
+
+    # The rebuild went to a new version directory; the memory-mapped model keeps working on the old one
+    assert current_version(collaborative_dir) != loaded_collaborative_version
+    assert loaded_collaborative.recommend(valid_user_id, top_n=10).equals(built_collaborative.recommend(valid_user_id, top_n=10))
+
+    # Old versions are deleted once nothing serves them; open memory maps stay valid
+    removed = prune_versions(collaborative_dir)
+    print(f"Pruned {removed} old collaborative artifact versions")
+    assert removed == 1
+    assert [entry.name for entry in os.scandir(collaborative_dir) if entry.is_dir()] == [
+        os.path.basename(current_version(collaborative_dir))
+    ]
+    assert loaded_collaborative.recommend(valid_user_id, top_n=10).equals(built_collaborative.recommend(valid_user_id, top_n=10))
@@ -17,3 +17,48 @@ invalid_user_id = 9999  # Use an ID that doesn't exist in the dataset
 print(f"\nTesting Collaborative Recommender with invalid user_id: {invalid_user_id}")
 invalid_recommendations = collaborative_recommender.recommend(invalid_user_id, top_n=10)
 print(f"Collaborative Recommendations for user_id {invalid_user_id}:\n{invalid_recommendations}")
+
+# Test batch recommendations for several users at once (unknown users are skipped)
+batch_user_ids = [valid_user_id, invalid_user_id] + collaborative_recommender.user_ids[:5].tolist()
+print(f"\nTesting Collaborative Recommender batch scoring for user_ids: {batch_user_ids}")
+batch_recommendations = collaborative_recommender.recommend_many(batch_user_ids, top_n=10)
+print(f"Batch Collaborative Recommendations:\n{batch_recommendations}")
+
+# Test incremental updates: applying the newest interactions must give the model built from all of them
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+interactions_df = pd.read_csv(interactions_csv_path)
+base_df, events_df = interactions_df.iloc[:-300], interactions_df.iloc[-300:]
+events_df = pd.concat([events_df, pd.DataFrame([
+    {"user_id": 100000, "post_id": 11, "interaction_type": "liked", "liked_at": "2024-12-08 10:00:00"},
+    {"user_id": 1, "post_id": 999999, "interaction_type": "viewed", "viewed_at": "2024-12-08 11:00:00"}
+])])
+with tempfile.TemporaryDirectory() as directory:
+    base_path = os.path.join(directory, "interaction_df.csv")
+    base_df.to_csv(base_path, index=False)
+    incremental = CollaborativeRecommender(base_path).apply_interactions(events_df)
+    pd.concat([base_df, events_df]).to_csv(base_path, index=False)
+    rebuilt = CollaborativeRecommender(base_path)
+print(f"\nTesting incremental updates with {len(events_df)} events")
+assert (incremental.post_ids == rebuilt.post_ids).all() and (incremental.user_ids == rebuilt.user_ids).all()
+assert incremental.as_of == rebuilt.as_of
+assert abs(incremental.interaction_matrix - rebuilt.interaction_matrix).max() < 1e-5
+
+
+# Neighbour lists match up to float rounding (near-ties at the top-k cut may swap neighbours)
+def sorted_neighbour_scores(similarity):
+    rows = np.repeat(np.arange(similarity.shape[0]), np.diff(similarity.indptr))
+    return similarity.data[np.lexsort((-similarity.data, rows))]
+
+
+assert (incremental.item_similarity_matrix.indptr == rebuilt.item_similarity_matrix.indptr).all()
+assert np.allclose(sorted_neighbour_scores(incremental.item_similarity_matrix), sorted_neighbour_scores(rebuilt.item_similarity_matrix), atol=1e-5)
+assert np.allclose(incremental.rank(100000, top_n=10).scores, rebuilt.rank(100000, top_n=10).scores, atol=1e-5)
+
+# A daily re-decay rescales the signals without changing the neighbour lists
+factor = incremental.decay_to(incremental.as_of + pd.Timedelta(days=1))
+print(f"Re-decayed the signals by {factor:.4f}")
+assert abs(factor - 0.5 ** (1 / 30)) < 1e-9
+assert np.isclose(incremental.interaction_matrix.sum(), rebuilt.interaction_matrix.sum() * factor, rtol=1e-5)
@@ -5,6 +5,7 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 
 from recommendation_engine.content_based import ContentBasedRecommender
+from recommendation_engine.popularity import PopularityRecommender
 import pandas as pd
 
 # Path to your posts CSV file
@@ -21,6 +22,20 @@ print(f"Testing valid post_id: {valid_post_id}")
 valid_recommendations = content_recommender.recommend(valid_post_id, top_n=10)
 print(f"Recommendations for valid post_id {valid_post_id}:\n{valid_recommendations}")
 
+# Test the precomputed top-K neighbour table mode with the same post_id
+precomputed_recommender = ContentBasedRecommender(posts_csv_path, similarity_mode='precomputed', n_neighbors=50)
+precomputed_recommendations = precomputed_recommender.recommend(valid_post_id, top_n=10)
+print(f"Precomputed-mode recommendations for valid post_id {valid_post_id}:\n{precomputed_recommendations}")
+
+# Test filtered recommendations (category and mood masks over the same feature matrix)
+filtered_recommendations = content_recommender.recommend(valid_post_id, top_n=10, category_id="Vible", mood="passion")
+print(f"Filtered recommendations (category 'Vible', mood 'passion') for valid post_id {valid_post_id}:\n{filtered_recommendations}")
+
+# Test batched recommendations for several query posts at once
+batch_post_ids = content_recommender.posts_df['id'].iloc[:5].tolist()
+batch_recommendations = content_recommender.recommend_many(batch_post_ids, top_n=5)
+print(f"Batched recommendations for post_ids {batch_post_ids}:\n{batch_recommendations}")
+
 # 2. Test with an invalid post_id (not present in the dataset)
 invalid_post_id = 9999  # Ensure this ID is not in your dataset
 print(f"Testing invalid post_id: {invalid_post_id}")
@@ -99,5 +114,5 @@ print(f"Recommendations based on moods:\n{moods_recommendations}")
 
 # Test with a new user who has no interaction history
 new_user_mood = "passion"  # Assuming the new user selects this mood
-recommendations = content_recommender._recommend_cold_start(user_mood=new_user_mood, top_n=10)
+recommendations = PopularityRecommender(content_recommender.posts_df).recommend_cold_start(top_n=10, mood=new_user_mood)
 print(f"Cold Start Recommendations for mood '{new_user_mood}':\n{recommendations}")
@@ -0,0 +1,140 @@
+import json
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from src import data_fetcher, preprocessing
+
+# Stub of the API paging contract: ?page=N&page_size=M, items under "posts" or "users", an empty list past the end
+DATASETS = {
+    "/posts/view": ("posts", [{"id": i, "post_id": i % 97, "user_id": i % 13} for i in range(1, 2501)]),
+    "/users/get_all": ("users", [{"id": i, "username": f"user{i}"} for i in range(1, 1201)]),
+}
+requests_seen = []
+failures = {}  # (path, page) -> number of 503 responses still to send
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        page, page_size = int(query["page"][0]), int(query["page_size"][0])
+        requests_seen.append((url.path, page))
+
+        if failures.get((url.path, page), 0) > 0:
+            failures[(url.path, page)] -= 1
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+
+        key, items = DATASETS[url.path]
+        body = json.dumps({key: items[(page - 1) * page_size:page * page_size]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+data_dir = tempfile.mkdtemp()
+original_data_dir = preprocessing.DATA_DIR
+original_settings = (data_fetcher.DATA_DIR, data_fetcher.PAGE_SIZE, data_fetcher.BACKOFF_SECONDS)
+data_fetcher.DATA_DIR = data_dir
+data_fetcher.PAGE_SIZE = 100
+data_fetcher.BACKOFF_SECONDS = 0.01
+
+try:
+    # Concurrent fetch of one endpoint returns every item, in page order, despite throttled pages
+    failures[("/posts/view", 3)] = 2
+    items = data_fetcher.fetch_paginated_data("/posts/view", key="posts", base_url=base_url)
+    print(f"Fetched {len(items)} posts, first ids: {[item['id'] for item in items[:3]]}")
+    assert [item["id"] for item in items] == list(range(1, 2501))
+
+    # An interrupted fetch resumes after the last completed page
+    requests_seen.clear()
+    failures[("/users/get_all", 8)] = data_fetcher.MAX_RETRIES + 1
+    try:
+        data_fetcher.fetch_paginated_data("/users/get_all", key="users", checkpoint_name="all_users.json", base_url=base_url)
+        raise AssertionError("Expected the fetch to fail")
+    except data_fetcher.RetryableError as e:
+        print(f"Fetch interrupted: {e.args[0]}")
+    last_page, saved = data_fetcher.load_checkpoint("all_users.json")
+    print(f"Checkpoint after the interruption: page {last_page}, {len(saved)} users")
+    assert last_page == 7 and len(saved) == 700
+
+    requests_seen.clear()
+    users = data_fetcher.fetch_paginated_data("/users/get_all", key="users", checkpoint_name="all_users.json", base_url=base_url)
+    resumed_pages = sorted(page for path, page in requests_seen)
+    print(f"Pages requested after resuming: {resumed_pages}")
+    assert min(resumed_pages) == 8
+    assert [user["id"] for user in users] == list(range(1, 1201))
+
+    # Every endpoint fetched in parallel and saved, with the checkpoints cleared
+    endpoints = {
+        "viewed_posts.ndjson": {"endpoint": "/posts/view", "requires_auth": False, "key": "posts", "extra_params": ""},
+        "all_users.json": {"endpoint": "/users/get_all", "requires_auth": True, "key": "users", "extra_params": ""},
+    }
+    counts = data_fetcher.fetch_and_save_all(endpoints, base_url=base_url)
+    print(f"Saved items per file: {counts}")
+    assert counts == {"viewed_posts.ndjson": 2500, "all_users.json": 1200}
+    assert data_fetcher.load_checkpoint("all_users.json") == (0, [])
+
+    # NDJSON files hold one record per line; .json files keep the JSON array format
+    with open(f"{data_dir}/viewed_posts.ndjson") as f:
+        lines = f.readlines()
+    print(f"viewed_posts.ndjson: {len(lines)} lines, first: {lines[0].strip()}")
+    assert len(lines) == 2500 and json.loads(lines[0])["id"] == 1
+    assert len(data_fetcher.load_data("all_users.json")) == 1200
+
+    # An interrupted streamed fetch drops the half-written page and resumes after the last completed one
+    failures[("/posts/view", 12)] = data_fetcher.MAX_RETRIES + 1
+    try:
+        data_fetcher.fetch_and_save("viewed_posts.ndjson", endpoints["viewed_posts.ndjson"], base_url=base_url)
+        raise AssertionError("Expected the fetch to fail")
+    except data_fetcher.RetryableError:
+        pass
+    with open(data_fetcher.checkpoint_items_file("viewed_posts.ndjson"), "a") as f:
+        f.write('{"id": 1101, "post_')
+    state = data_fetcher.checkpoint_state("viewed_posts.ndjson")
+    print(f"Streamed checkpoint: page {state['last_page']}, {state['count']} items")
+    assert state["last_page"] == 11 and state["count"] == 1100
+    assert data_fetcher.fetch_and_save("viewed_posts.ndjson", endpoints["viewed_posts.ndjson"], base_url=base_url) == 2500
+    assert [item["id"] for item in data_fetcher.load_data("viewed_posts.ndjson")] == list(range(1, 2501))
+
+    # Preprocessing reads NDJSON files in chunks, with the same frame as a whole-file load
+    preprocessing.DATA_DIR = data_dir
+    chunks = list(preprocessing.iter_json_chunks("viewed_posts.ndjson", chunksize=1000))
+    print(f"Chunk sizes: {[len(chunk) for chunk in chunks]}")
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+    assert preprocessing.load_json_to_df("viewed_posts.ndjson", chunksize=300).equals(
+        preprocessing.load_json_to_df("viewed_posts.ndjson", chunksize=10 ** 6)
+    )
+    assert preprocessing.raw_file("viewed_posts") == "viewed_posts.ndjson"
+    assert preprocessing.raw_file("all_users") == "all_users.json"
+
+    # Incremental sync: only the pages past the saved high-water mark are fetched and appended
+    DATASETS["/posts/view"][1].extend({"id": i, "post_id": i % 97, "user_id": i % 13} for i in range(2501, 2651))
+    del DATASETS["/posts/view"][1][10]  # A record deleted upstream shifts later pages
+    requests_seen.clear()
+    counts = data_fetcher.fetch_and_save_all(endpoints, base_url=base_url, incremental=True)
+    viewed = data_fetcher.load_data("viewed_posts.ndjson")
+    viewed_pages = sorted({page for path, page in requests_seen if path == "/posts/view"})
+    print(f"New items per file: {counts}, pages requested for views: {viewed_pages}")
+    assert counts == {"viewed_posts.ndjson": 150, "all_users.json": 0}
+    assert [item["id"] for item in viewed] == list(range(1, 2651))
+    assert min(viewed_pages) >= 24
+    assert data_fetcher.load_sync_state()["viewed_posts.ndjson"]["high_water_mark"] == 2650
+finally:
+    server.shutdown()
+    data_fetcher.DATA_DIR, data_fetcher.PAGE_SIZE, data_fetcher.BACKOFF_SECONDS = original_settings
+    preprocessing.DATA_DIR = original_data_dir
+    shutil.rmtree(data_dir, ignore_errors=True)
@@ -0,0 +1,39 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from src.recommendation_engine.collaborative import CollaborativeRecommender
+from src.recommendation_engine.datasets import INTERACTION_COLUMNS, append_dataset, load_dataset, save_dataset
+
+# Paths to test datasets
+interactions_csv_path = "data/processed/interaction_df.csv"
+
+interactions_df = pd.read_csv(interactions_csv_path)
+directory = tempfile.mkdtemp()
+try:
+    for file_format in ('parquet', 'feather'):
+        path = os.path.join(directory, f"interaction_df.{file_format}")
+        save_dataset(interactions_df, path)
+
+        # Compact dtypes, and only the requested columns are read
+        loaded = load_dataset(path, columns=['user_id', 'post_id', 'interaction_type', 'viewed_at'])
+        print(f"{file_format} dtypes: {loaded.dtypes.to_dict()}")
+        assert list(loaded.columns) == ['post_id', 'user_id', 'viewed_at', 'interaction_type']
+        assert loaded['user_id'].dtype == np.int32
+        assert isinstance(loaded['interaction_type'].dtype, pd.CategoricalDtype)
+        assert pd.api.types.is_datetime64_any_dtype(loaded['viewed_at'])
+        assert (loaded['post_id'].to_numpy() == interactions_df['post_id'].to_numpy()).all()
+
+        # The collaborative model is the same as when built from the CSV
+        from_csv = CollaborativeRecommender(interactions_csv_path)
+        from_columnar = CollaborativeRecommender(path)
+        assert (from_csv.item_similarity_matrix != from_columnar.item_similarity_matrix).nnz == 0
+        assert set(from_columnar.interactions_df.columns) <= set(INTERACTION_COLUMNS)
+
+        # Appended interactions keep the compact dtypes
+        append_dataset(path, pd.DataFrame([{"user_id": 1, "post_id": 11, "interaction_type": "liked", "liked_at": "2024-12-01 10:00:00"}]))
+        appended = load_dataset(path)
+        assert len(appended) == len(interactions_df) + 1 and appended['user_id'].dtype == np.int32
+finally:
+    shutil.rmtree(directory, ignore_errors=True)
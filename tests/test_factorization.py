@@ -0,0 +1,44 @@
+import tempfile
+import numpy as np
+from src.recommendation_engine.content_based import ContentBasedRecommender
+from src.recommendation_engine.collaborative import CollaborativeRecommender
+from src.recommendation_engine.factorization import ImplicitALSRecommender
+from src.recommendation_engine.hybrid import HybridRecommender
+
+# Paths to test datasets
+posts_csv_path = "data/processed/all_posts_with_features.csv"
+interactions_csv_path = "data/processed/interaction_df.csv"
+
+# Initialize the implicit-ALS Recommender
+factorization_recommender = ImplicitALSRecommender(interactions_csv_path, factors=32, iterations=10)
+assert factorization_recommender.item_factors.dtype == np.float32
+
+# Test with a valid and an invalid user ID
+valid_user_id = 1
+recommendations = factorization_recommender.recommend(valid_user_id, top_n=10)
+print(f"Implicit-ALS Recommendations for user_id {valid_user_id}:\n{recommendations}")
+assert len(recommendations) == 10
+seen_posts = factorization_recommender.interactions_df.loc[factorization_recommender.interactions_df['user_id'] == valid_user_id, 'post_id']
+assert not recommendations['post_id'].isin(seen_posts).any()
+assert factorization_recommender.recommend(9999, top_n=10).empty
+
+# Batch scoring ranks like the single-user path
+batch_recommendations = factorization_recommender.recommend_many([valid_user_id, 9999], top_n=10)
+print(f"\nBatch Implicit-ALS Recommendations:\n{batch_recommendations}")
+assert batch_recommendations['post_id'].tolist() == recommendations['post_id'].tolist()
+
+# Saved factors load back to the same rankings
+with tempfile.TemporaryDirectory() as directory:
+    factorization_recommender.save(directory)
+    loaded = ImplicitALSRecommender.load(directory)
+    assert np.array_equal(loaded.rank(valid_user_id, top_n=10).post_ids, factorization_recommender.rank(valid_user_id, top_n=10).post_ids)
+
+# The model takes part in the hybrid ranking as a third component
+hybrid_recommender = HybridRecommender(ContentBasedRecommender(posts_csv_path), CollaborativeRecommender(interactions_csv_path))
+hybrid_recommender.add_model("factorization", factorization_recommender, weight=0.5)
+report = {}
+ranked = hybrid_recommender.rank_hybrid(valid_user_id, top_n=10, report=report)
+print(f"\nHybrid Recommendations with the factorization model:\n{ranked.to_frame('weighted_score')}")
+assert "factorization" in report["latency"] and len(ranked) == 10
+batch_hybrid = hybrid_recommender.recommend_hybrid_many([valid_user_id], top_n=10)
+assert len(batch_hybrid) == 10
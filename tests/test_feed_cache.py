@@ -0,0 +1,48 @@
+import numpy as np
+from src.feed_cache import FeedCache
+
+# Use a controllable clock to test expiry
+now = [0.0]
+feed_cache = FeedCache(max_entries=2, max_bytes=10 * 1024, ttl=60, clock=lambda: now[0])
+
+post_ids = np.arange(10, dtype=np.int64)
+scores = np.linspace(1.0, 0.1, 10)
+
+# Miss, then hit for the same (user, model version)
+print(f"First lookup for user 1: {feed_cache.get(1, 'v1')}")
+feed_cache.put(1, 'v1', post_ids, scores)
+cached_post_ids, cached_scores = feed_cache.get(1, 'v1')
+print(f"Second lookup for user 1: {cached_post_ids}")
+assert np.array_equal(cached_post_ids, post_ids)
+
+# A new model version does not reuse the old ranking
+print(f"Lookup for user 1 with model v2: {feed_cache.get(1, 'v2')}")
+
+# Entry count bound: the least recently used entry is evicted
+feed_cache.put(2, 'v1', post_ids, scores)
+feed_cache.get(1, 'v1')
+feed_cache.put(3, 'v1', post_ids, scores)
+print(f"User 2 after eviction: {feed_cache.get(2, 'v1')}")
+assert feed_cache.get(2, 'v1') is None and feed_cache.get(1, 'v1') is not None
+
+# Invalidation when new interactions of a user are ingested
+print(f"Invalidated entries for user 1: {feed_cache.invalidate_user(1)}")
+assert feed_cache.get(1, 'v1') is None
+
+# A feed computed before an invalidation is not cached after it
+generation = feed_cache.generation(5)
+feed_cache.invalidate_user(5)
+feed_cache.put(5, 'v1', post_ids, scores, generation=generation)
+print(f"User 5 after a put that raced an invalidation: {feed_cache.get(5, 'v1')}")
+assert feed_cache.get(5, 'v1') is None and feed_cache.stats()['stale_puts'] == 1
+feed_cache.put(5, 'v1', post_ids, scores, generation=feed_cache.generation(5))
+assert feed_cache.get(5, 'v1') is not None
+
+# TTL expiry
+now[0] = 120.0
+print(f"User 3 after the TTL: {feed_cache.get(3, 'v1')}")
+
+# Byte bound: an entry larger than the whole cache is not stored
+feed_cache.put(4, 'v1', np.arange(10000, dtype=np.int64), np.zeros(10000))
+print(f"Cache statistics: {feed_cache.stats()}")
+assert feed_cache.stats()['bytes'] <= feed_cache.max_bytes
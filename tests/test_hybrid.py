@@ -1,6 +1,7 @@
 from src.recommendation_engine.content_based import ContentBasedRecommender
 from src.recommendation_engine.collaborative import CollaborativeRecommender
 from src.recommendation_engine.hybrid import HybridRecommender
+import numpy as np
 import pandas as pd
 
 # Paths to test datasets
@@ -66,3 +67,146 @@ try:
     print(f"Hybrid Recommendations with empty dataset:\n{hybrid_recommendations_empty}")
 except Exception as e:
     print(f"Error generating hybrid recommendations with empty dataset: {e}")
+
+# Test batched hybrid recommendations for several users at once
+batch_user_ids = collaborative_recommender.user_ids[:5].tolist() + [invalid_user_id]
+print(f"\nTesting batched Hybrid Recommender for user_ids: {batch_user_ids}")
+batch_recommendations = hybrid_recommender.recommend_hybrid_many(batch_user_ids, top_n=10)
+print(f"Batched Hybrid Recommendations:\n{batch_recommendations}")
+
+# The batched path fuses with the configured fusion method, like rank_hybrid
+for fusion_method in ("weighted_sum", "reciprocal_rank", "max"):
+    fused_hybrid = HybridRecommender(content_recommender, collaborative_recommender, fusion_method=fusion_method)
+    batch_recommendations = fused_hybrid.recommend_hybrid_many(batch_user_ids, top_n=10)
+    for user_id in batch_user_ids[:5]:
+        user_batch = batch_recommendations[batch_recommendations['user_id'] == user_id]
+        ranked = fused_hybrid.rank_hybrid(user_id, top_n=10)
+        assert np.allclose(np.sort(user_batch['weighted_score'].to_numpy()), np.sort(ranked.scores))
+    print(f"Batched {fusion_method} fusion matches rank_hybrid for user_ids {batch_user_ids[:5]}")
+
+
+# Test the fusion methods on the ranked-list path
+for fusion_method in ("weighted_sum", "reciprocal_rank", "max"):
+    ranked = hybrid_recommender.rank_hybrid(valid_user_id, top_n=10, method=fusion_method)
+    print(f"\n{fusion_method} fusion for user_id {valid_user_id}:\n{ranked.to_frame('weighted_score')}")
+    assert len(ranked) <= 10
+    assert (ranked.scores[:-1] >= ranked.scores[1:]).all()
+
+
+# Category 0 is a filter like any other id: no post has it, so nothing is returned
+assert len(hybrid_recommender.rank_hybrid(valid_user_id, top_n=10, category_id=0)) == 0
+
+
+# Test the per-model deadline: a slow third model is dropped and reported
+import time
+import numpy as np
+from src.recommendation_engine.fusion import RankedList
+
+
+import threading
+
+
+class SlowModel:
+    post_ids = collaborative_recommender.post_ids
+
+    def __init__(self):
+        # The model answers only once released, so it misses any deadline asserted before that
+        self.released = threading.Event()
+
+    def rank(self, user_id, top_n=10):
+        self.released.wait(30)
+        return RankedList(self.post_ids[:top_n], np.ones(min(top_n, len(self.post_ids))))
+
+
+slow_model = SlowModel()
+hybrid_with_slow_model = HybridRecommender(content_recommender, collaborative_recommender, timeout=5)
+hybrid_with_slow_model.add_model("slow", slow_model, weight=1.0, timeout=0.05)
+report = {}
+start = time.perf_counter()
+try:
+    degraded = hybrid_with_slow_model.rank_hybrid(valid_user_id, top_n=10, report=report)
+    elapsed = time.perf_counter() - start
+finally:
+    slow_model.released.set()
+print(f"\nDegraded hybrid recommendations in {elapsed:.3f}s, report: {report}\n{degraded.to_frame('weighted_score')}")
+assert report["timed_out"] == ["slow"]
+assert elapsed < 5
+assert np.array_equal(degraded.post_ids, hybrid_recommender.rank_hybrid(valid_user_id, top_n=10).post_ids)
+
+
+# Test concurrent fan-outs on a saturated pool: the deadline starts when a task runs, not when it is queued
+from concurrent.futures import ThreadPoolExecutor
+from src.recommendation_engine import hybrid as hybrid_module
+
+
+class SleepyModel(SlowModel):
+    def rank(self, user_id, top_n=10):
+        time.sleep(1.0)
+        return RankedList(self.post_ids[:top_n], np.ones(min(top_n, len(self.post_ids))))
+
+
+# Two of the four sleepy tasks queue for about 1s and finish about 2s after submission: within
+# the 1.5s budget counted from their start, with half a second of margin on either side
+hybrid_with_sleepy_model = HybridRecommender(content_recommender, collaborative_recommender, timeout=5)
+hybrid_with_sleepy_model.add_model("sleepy", SleepyModel(), weight=1.0, timeout=1.5)
+shared_executor = hybrid_module._executor
+hybrid_module._executor = ThreadPoolExecutor(max_workers=2)
+try:
+    reports = [{} for _ in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as requests:
+        list(requests.map(lambda report: hybrid_with_sleepy_model.rank_hybrid(valid_user_id, report=report), reports))
+finally:
+    hybrid_module._executor.shutdown()
+    hybrid_module._executor = shared_executor
+print(f"\nTimed-out models of 4 concurrent fan-outs on 2 threads: {[report['timed_out'] for report in reports]}")
+assert all(report["timed_out"] == [] for report in reports)
+assert hybrid_with_sleepy_model.timeout_counts["sleepy"] == 0
+
+# Test a pool busy with tasks that outlive the budget: queued models are given up instead of waited for
+pool_released = threading.Event()
+hybrid_module._executor = ThreadPoolExecutor(max_workers=1)
+try:
+    hybrid_module._executor.submit(pool_released.wait, 30)
+    hybrid_with_busy_pool = HybridRecommender(content_recommender, collaborative_recommender, timeout=0.2)
+    report = {}
+    start = time.perf_counter()
+    starved = hybrid_with_busy_pool.rank_hybrid(valid_user_id, top_n=10, report=report)
+    elapsed = time.perf_counter() - start
+finally:
+    pool_released.set()
+    hybrid_module._executor.shutdown()
+    hybrid_module._executor = shared_executor
+print(f"\nFan-out on a blocked pool returned {len(starved)} posts in {elapsed:.3f}s, report: {report}")
+assert report["timed_out"] == list(hybrid_with_busy_pool.components)
+assert len(starved) == 0
+assert elapsed < 10
+
+# Test the user-profile content scoring and its incremental update
+from src.recommendation_engine.user_profiles import UserProfiles
+
+interactions_df = pd.read_csv(interactions_csv_path)
+profiles = UserProfiles(content_recommender).build(interactions_df)
+print(f"\nUser profiles: {profiles.profiles.shape}, content ranking for user_id {valid_user_id}:\n{profiles.recommend(valid_user_id, top_n=5)}")
+assert profiles.profiles.shape[0] == interactions_df['user_id'].nunique()
+
+half = len(interactions_df) // 2
+incremental_profiles = UserProfiles(content_recommender).build(interactions_df.iloc[:half]).update(interactions_df.iloc[half:])
+assert np.array_equal(profiles.rank(valid_user_id, top_n=5).post_ids, incremental_profiles.rank(valid_user_id, top_n=5).post_ids)
+
+
+# Test that posts learnt by apply_interactions join the fused id space
+fresh_collaborative = CollaborativeRecommender(interactions_csv_path)
+hybrid_with_updates = HybridRecommender(content_recommender, fresh_collaborative)
+new_post_id = int(hybrid_with_updates.post_ids.max()) + 1
+user_post_ids = interactions_df.loc[interactions_df['user_id'] == valid_user_id, 'post_id'].unique()
+other_user_id = int(interactions_df.loc[interactions_df['user_id'] != valid_user_id, 'user_id'].iloc[0])
+fresh_collaborative.apply_interactions(pd.DataFrame({
+    'user_id': other_user_id,
+    'post_id': np.append(user_post_ids[:3], new_post_id),
+    'interaction_type': 'liked'
+}))
+hybrid_with_updates.refresh_post_ids()
+updated = hybrid_with_updates.rank_hybrid(valid_user_id, top_n=len(hybrid_with_updates.post_ids))
+print(f"\nNew post {new_post_id} in the fused ranking of user_id {valid_user_id}: {new_post_id in updated.post_ids}")
+assert new_post_id in fresh_collaborative.rank(valid_user_id, top_n=1000).post_ids
+assert new_post_id in updated.post_ids
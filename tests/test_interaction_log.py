@@ -0,0 +1,145 @@
+import os
+import shutil
+import multiprocessing
+import tempfile
+import pandas as pd
+from src.interaction_log import (
+    append_interaction_log, compact_interaction_log, read_interaction_log, replayable_interactions,
+    validate_interactions
+)
+
+# A valid batch comes back with integer ids
+events_df = validate_interactions([
+    {"user_id": "1", "post_id": 10, "interaction_type": "liked"},
+    {"user_id": 2, "post_id": 11.0, "interaction_type": "rated", "rating_percent": 80},
+])
+print(f"Validated interactions:\n{events_df}")
+assert events_df['user_id'].tolist() == [1, 2] and events_df['post_id'].tolist() == [10, 11]
+
+# Timezone-aware timestamps are converted to naive UTC, like the processed data
+timed_df = validate_interactions([
+    {"user_id": 1, "post_id": 10, "interaction_type": "liked", "liked_at": "2024-12-08T10:00:00Z"},
+    {"user_id": 1, "post_id": 11, "interaction_type": "liked", "liked_at": "2024-12-08T12:00:00+02:00"},
+    {"user_id": 1, "post_id": 12, "interaction_type": "viewed", "viewed_at": "2024-12-08 10:00:00"},
+])
+print(f"Normalised timestamps:\n{timed_df[['liked_at', 'viewed_at']]}")
+assert timed_df['liked_at'].dt.tz is None
+assert (timed_df['liked_at'].iloc[:2] == pd.Timestamp("2024-12-08 10:00:00")).all()
+
+# Malformed batches are rejected as a whole
+malformed_batches = {
+    "missing post_id": [{"user_id": 1, "interaction_type": "viewed"}],
+    "non-numeric user_id": [{"user_id": "abc", "post_id": 10, "interaction_type": "viewed"}],
+    "fractional post_id": [{"user_id": 1, "post_id": 10.5, "interaction_type": "viewed"}],
+    "unknown interaction_type": [{"user_id": 1, "post_id": 10, "interaction_type": "shared"}],
+    "non-object event": ["user 1 viewed post 10"],
+    "unparseable timestamp": [{"user_id": 1, "post_id": 10, "interaction_type": "viewed", "viewed_at": "yesterday"}],
+}
+for name, events in malformed_batches.items():
+    try:
+        validate_interactions(events)
+    except ValueError as e:
+        print(f"Rejected {name}: {e}")
+    else:
+        raise AssertionError(f"{name} was accepted")
+
+# Appends go to the log; compaction moves them into the interactions dataset and empties the log
+directory = tempfile.mkdtemp()
+try:
+    log_path = os.path.join(directory, "interaction_log.csv")
+    dataset_path = os.path.join(directory, "interaction_df.csv")
+    shutil.copy("data/processed/interaction_df.csv", dataset_path)
+    dataset_rows = len(pd.read_csv(dataset_path))
+
+    print(f"Empty log: {len(read_interaction_log(log_path))} events")
+    append_interaction_log(log_path, events_df)
+    append_interaction_log(log_path, validate_interactions([
+        {"user_id": 3, "post_id": 12, "interaction_type": "viewed", "viewed_at": "2024-12-08 10:00:00"}
+    ]))
+    logged_df = read_interaction_log(log_path)
+    print(f"Logged events:\n{logged_df}")
+    assert logged_df['user_id'].tolist() == [1, 2, 3]
+
+    # Log lines that cannot be applied are skipped when the log is replayed
+    with open(log_path, "a") as f:
+        f.write("4,13,viewed,,2024-12-08T10:00:00Z,,,\n")
+        f.write("not-a-user,13,viewed,,,,,\n")
+        f.write("5,14,viewed,,yesterday,,,\n")
+    replayed_df = replayable_interactions(read_interaction_log(log_path))
+    print(f"Replayable events:\n{replayed_df}")
+    assert replayed_df['user_id'].tolist() == [1, 2, 3, 4]
+    assert replayed_df['viewed_at'].dt.tz is None
+    with open(log_path) as f:
+        lines = f.readlines()
+    with open(log_path, "w") as f:
+        f.writelines(lines[:-3])
+
+    print(f"Compacted events: {compact_interaction_log(log_path, dataset_path)}")
+    assert len(pd.read_csv(dataset_path)) == dataset_rows + 3
+    assert not os.path.exists(log_path) and len(read_interaction_log(log_path)) == 0
+
+    # Several processes (like Gunicorn workers) append while another compacts: no event is lost or doubled
+    def append_events(worker):
+        for post_id in range(25):
+            append_interaction_log(log_path, validate_interactions([
+                {"user_id": worker, "post_id": post_id, "interaction_type": "viewed"}
+            ]))
+
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=append_events, args=(worker,)) for worker in range(1, 5)]
+    compactor = context.Process(target=compact_interaction_log, args=(log_path, dataset_path))
+    for process in workers + [compactor]:
+        process.start()
+    for process in workers + [compactor]:
+        process.join()
+    compact_interaction_log(log_path, dataset_path)
+    print(f"Dataset rows after concurrent appends and compactions: {len(pd.read_csv(dataset_path))}")
+    assert len(pd.read_csv(dataset_path)) == dataset_rows + 3 + 100
+finally:
+    shutil.rmtree(directory, ignore_errors=True)
+
+# The API answers 400 to a malformed payload and leaves the interactions data untouched
+import app as app_module
+from app import app, model_reloader, INTERACTION_DATA_PATH
+
+size_before = os.path.getsize(INTERACTION_DATA_PATH)
+response = app.test_client().post("/interactions", json={"interactions": [
+    {"user_id": 1, "post_id": 10, "interaction_type": "viewed"},
+    {"user_id": "not-a-user", "post_id": 10, "interaction_type": "viewed"},
+]})
+print(f"Malformed payload: {response.status_code} {response.get_json()}")
+assert response.status_code == 400 and "error" in response.get_json()
+assert os.path.getsize(INTERACTION_DATA_PATH) == size_before
+
+# Valid events are logged outside the watched data: no reload, so the cached feeds of other users survive
+directory = tempfile.mkdtemp()
+try:
+    app_module.INTERACTION_LOG_PATH = os.path.join(directory, "interaction_log.csv")
+    response = app.test_client().post("/interactions", json={"interactions": [
+        {"user_id": 1, "post_id": 10, "interaction_type": "liked", "liked_at": "2024-12-08 10:00:00"}
+    ]})
+    print(f"Valid payload: {response.status_code} {response.get_json()}")
+    assert response.status_code == 202
+    assert len(read_interaction_log(app_module.INTERACTION_LOG_PATH)) == 1
+    assert os.path.getsize(INTERACTION_DATA_PATH) == size_before
+    assert model_reloader._watch_signature() == model_reloader._signature
+
+    # A reload replays the log on top of the processed data, keeping the model version
+    bundle = app_module.load_models()
+    print(f"Reloaded bundle {bundle.version} with the logged events")
+    assert bundle.version == model_reloader.current().version
+    assert 1 in bundle.hybrid.user_profiles.user_index
+
+    # A timezone-aware event is applied and logged; a bad log line does not keep the models from loading
+    response = app.test_client().post("/interactions", json={"interactions": [
+        {"user_id": 1, "post_id": 11, "interaction_type": "liked", "liked_at": "2024-12-08T10:00:00Z"}
+    ]})
+    print(f"Timezone-aware payload: {response.status_code} {response.get_json()}")
+    assert response.status_code == 202
+    with open(app_module.INTERACTION_LOG_PATH, "a") as f:
+        f.write("7,11,liked,,,2024-12-08T10:00:00+05:00,,\n")
+        f.write("8,11,liked,,,not-a-date,,\n")
+    bundle = app_module.load_models()
+    assert 7 in bundle.hybrid.user_profiles.user_index and 8 not in bundle.hybrid.user_profiles.user_index
+finally:
+    shutil.rmtree(directory, ignore_errors=True)
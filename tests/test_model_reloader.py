@@ -0,0 +1,45 @@
+import os
+import time
+import tempfile
+from src.model_reloader import ModelBundle, ModelReloader
+
+# Use a temporary file as the watched data source; the bundle "model" is the file contents
+with tempfile.TemporaryDirectory() as data_dir:
+    data_path = os.path.join(data_dir, "interactions.csv")
+    with open(data_path, "w") as f:
+        f.write("version 1")
+
+    def load_bundle():
+        with open(data_path, "r") as f:
+            contents = f.read()
+        return ModelBundle(contents.split()[-1], model=contents)
+
+    reloader = ModelReloader(load_bundle, watch_paths=[data_path], interval=0.05)
+    reloader.start()
+
+    # An in-flight request keeps the bundle it started with
+    in_flight_bundle = reloader.current()
+    print(f"Initial model status: {reloader.status()}")
+
+    with open(data_path, "w") as f:
+        f.write("version 22")
+
+    # Wait for the background thread to pick up the change
+    deadline = time.time() + 5
+    while reloader.current().version == in_flight_bundle.version and time.time() < deadline:
+        time.sleep(0.05)
+    reloader.stop()
+
+    print(f"Model status after the data changed: {reloader.status()}")
+    print(f"In-flight request still uses version {in_flight_bundle.version}: {in_flight_bundle.model}")
+    assert reloader.current().version == "22"
+    assert in_flight_bundle.version == "1"
+
+    # The post-swap hook runs for the initial bundle and after every successful swap
+    swapped_versions = []
+    hooked_reloader = ModelReloader(load_bundle, watch_paths=[data_path], after_swap=lambda bundle: swapped_versions.append(bundle.version))
+    with open(data_path, "w") as f:
+        f.write("version 333")
+    hooked_reloader.reload()
+    print(f"Post-swap hook saw versions {swapped_versions}")
+    assert swapped_versions == ["22", "333"]
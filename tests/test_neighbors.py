@@ -0,0 +1,48 @@
+import tempfile
+import numpy as np
+from src.recommendation_engine.content_based import ContentBasedRecommender
+from src.recommendation_engine.neighbors import build_neighbor_index, load_neighbor_index
+
+# Path to posts CSV file
+posts_csv_path = "data/processed/all_posts_with_features.csv"
+
+# Use the content features of the posts as the vectors to index
+content_recommender = ContentBasedRecommender(posts_csv_path)
+vectors = content_recommender.combined_features
+query_row = 0
+
+# Build the exact and the approximate (IVF) neighbour indexes
+exact_index = build_neighbor_index('exact', vectors)
+ivf_index = build_neighbor_index('ivf', vectors, n_probe=8)
+
+exact_indices, exact_scores = exact_index.query(vectors[query_row], k=10)
+ivf_indices, ivf_scores = ivf_index.query(vectors[query_row], k=10)
+print(f"Exact neighbours of row {query_row}: {exact_indices} {exact_scores}")
+print(f"IVF neighbours of row {query_row}: {ivf_indices} {ivf_scores}")
+print(f"IVF recall@10 against exact: {len(np.intersect1d(exact_indices, ivf_indices)) / 10:.2f}")
+
+# Test a masked query (only posts from the same category as the query)
+mask = content_recommender.filter_mask(category_id=content_recommender.posts_df['category_name'].iloc[query_row])
+masked_indices, masked_scores = ivf_index.query(vectors[query_row], k=10, mask=mask)
+print(f"Masked IVF neighbours of row {query_row}: {masked_indices}")
+assert mask[masked_indices].all()
+
+# Test saving and memory-mapped loading
+with tempfile.TemporaryDirectory() as index_dir:
+    ivf_index.save(index_dir)
+    loaded_index = load_neighbor_index(index_dir, mmap_mode='r')
+    loaded_indices, loaded_scores = loaded_index.query(vectors[query_row], k=10)
+    print(f"Neighbours from the loaded IVF index: {loaded_indices}")
+    assert np.array_equal(loaded_indices, ivf_indices)
+
+# Test the batched neighbour tables against one query per row
+from src.recommendation_engine.neighbors import neighbor_similarity_matrix
+
+for index in (exact_index, ivf_index):
+    similarity = neighbor_similarity_matrix(index, 10)
+    print(f"{index.backend} neighbour table: {similarity.shape}, {similarity.nnz} entries")
+    for row in range(0, vectors.shape[0], 97):
+        indices, scores = index.query(vectors[row], k=11)
+        keep = (indices != row) & (scores > 0)
+        expected = np.sort(scores[keep][:10])
+        assert np.allclose(np.sort(similarity[row].data), expected, atol=1e-5)
@@ -0,0 +1,58 @@
+import numpy as np
+from src.recommendation_engine.content_based import ContentBasedRecommender
+from src.recommendation_engine.collaborative import CollaborativeRecommender
+from src.recommendation_engine.hybrid import HybridRecommender
+from src.recommendation_engine.pipeline import RecommendationPipeline
+
+# Paths to test datasets
+posts_csv_path = "data/processed/all_posts_with_features.csv"
+interactions_csv_path = "data/processed/interaction_df.csv"
+
+content_recommender = ContentBasedRecommender(posts_csv_path)
+collaborative_recommender = CollaborativeRecommender(interactions_csv_path)
+hybrid_recommender = HybridRecommender(content_recommender, collaborative_recommender)
+pipeline = RecommendationPipeline(hybrid_recommender, max_candidates=200)
+
+# Test the staged pipeline for a known user
+valid_user_id = 1
+stats = {}
+ranked = pipeline.recommend(valid_user_id, top_n=10, stats=stats)
+print(f"Pipeline recommendations for user_id {valid_user_id}:\n{ranked.to_frame('weighted_score')}")
+print(f"Pipeline stats: {stats}")
+assert stats["candidates"] <= 200
+assert set(stats["stages"]) == {"collaborative", "content", "trending", "mood"}
+
+# Previously seen posts are never recommended
+seen_posts = collaborative_recommender.post_ids[collaborative_recommender.interaction_matrix[0].indices]
+assert not np.isin(ranked.post_ids, seen_posts).any()
+
+# Test the category and mood filters
+category_id, mood = 4, "joy"
+filtered = pipeline.recommend(valid_user_id, top_n=10, category_id=category_id, mood=mood)
+print(f"Filtered pipeline recommendations (category_id={category_id}, mood={mood}):\n{filtered.to_frame('weighted_score')}")
+mask = content_recommender.filter_mask(category_id=category_id, mood=mood)
+assert mask[content_recommender.positions_of(filtered.post_ids)].all()
+
+# Every hybrid model ranks the candidates: with the other weights at 0 the factorization model decides the order
+from src.recommendation_engine.factorization import ImplicitALSRecommender
+
+factorization_recommender = ImplicitALSRecommender(interactions_csv_path, factors=16, iterations=5)
+factorization_hybrid = HybridRecommender(
+    content_recommender, collaborative_recommender, weight_content=0.0, weight_collaborative=0.0
+)
+factorization_hybrid.add_model("factorization", factorization_recommender, weight=1.0)
+factorization_pipeline = RecommendationPipeline(factorization_hybrid, max_candidates=200)
+candidates = factorization_pipeline.generate_candidates(valid_user_id)
+ranked = factorization_pipeline.rank_candidates(valid_user_id, candidates, top_n=5)
+scores, seen = factorization_recommender.score_candidates(valid_user_id, candidates)
+expected = candidates[~seen][np.argsort(-scores[~seen], kind='stable')[:5]]
+print(f"Pipeline ranking with the factorization model:\n{ranked.to_frame('weighted_score')}")
+assert np.array_equal(ranked.post_ids, expected)
+
+# The pipeline ranks a candidate set like the hybrid ranks the whole catalog, with the same fusion
+for fusion_method in ("weighted_sum", "reciprocal_rank"):
+    hybrid_recommender.fusion_method = fusion_method
+    full = hybrid_recommender.rank_hybrid(valid_user_id, top_n=len(hybrid_recommender.post_ids))
+    ranked = hybrid_recommender.rank_candidates(valid_user_id, full.post_ids, top_n=10)
+    print(f"{fusion_method} ranking of the hybrid's own candidates: {ranked.post_ids}")
+    assert np.array_equal(np.sort(ranked.post_ids), np.sort(full.post_ids[:10]))
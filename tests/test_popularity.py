@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from src.recommendation_engine.popularity import PopularityRecommender
+
+# Paths to test datasets
+posts_csv_path = "data/processed/all_posts_with_features.csv"
+interactions_csv_path = "data/processed/interaction_df.csv"
+
+posts_df = pd.read_csv(posts_csv_path)
+interactions_df = pd.read_csv(interactions_csv_path)
+popularity_recommender = PopularityRecommender(posts_df, interactions_df)
+
+# Test the global, category and mood tables
+print(f"Most popular posts:\n{popularity_recommender.recommend_cold_start(top_n=5)}")
+print(f"Most popular posts in category 4:\n{popularity_recommender.recommend_cold_start(top_n=5, category_id=4)}")
+print(f"Most popular 'passion' posts:\n{popularity_recommender.recommend_cold_start(top_n=5, mood='passion')}")
+top = popularity_recommender.top(10)
+assert (np.diff(top.scores) <= 0).all()
+category_top = popularity_recommender.top(10, category_id=4)
+assert set(category_top.post_ids) <= set(posts_df.loc[posts_df['category_id'] == 4, 'id'])
+
+# Incremental updates give the same tables as a rebuild (without the all-time prior, which is seeded at build time)
+half = len(interactions_df) // 2
+rebuilt = PopularityRecommender(posts_df, interactions_df, prior_weight=0)
+incremental = PopularityRecommender(posts_df, interactions_df.iloc[:half], prior_weight=0)
+incremental.update(interactions_df.iloc[half:])
+print(f"Max score difference after the incremental update: {np.abs(incremental.scores - rebuilt.scores).max()}")
+assert np.allclose(incremental.scores, rebuilt.scores)
+assert np.array_equal(incremental.top(20).post_ids, rebuilt.top(20).post_ids)
+assert np.array_equal(incremental.top(20, category_id=2).post_ids, rebuilt.top(20, category_id=2).post_ids)
+# Category 0 (not in the data) filters everything out instead of being taken as no filter
+assert len(popularity_recommender.top(10, category_id=0)) == 0
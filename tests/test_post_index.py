@@ -0,0 +1,37 @@
+import numpy as np
+from src.recommendation_engine.post_index import InvertedPostIndex, TokenTrie
+
+# Small catalog with overlapping mood tokens
+post_index = InvertedPostIndex(
+    post_ids=[10, 11, 12, 13],
+    category_ids=[1, 2, 1, 3],
+    category_names=["Music", "Sports", "Music", "Talks"],
+    moods=["Passionate, calm", "compassion", "energetic, passion", None]
+)
+
+# Category lookups by id and by name
+print(f"Category 1: {post_index.category(1)}, category 'Music': {post_index.category('Music')}")
+assert np.array_equal(post_index.category(1), [10, 12])
+assert np.array_equal(post_index.category("Music"), post_index.category(1))
+assert post_index.category(99).size == 0
+
+# Exact, prefix and substring mood matching
+print(f"Tokens matching 'passion': {post_index.matching_tokens('passion')}")
+assert np.array_equal(post_index.mood("passion", match="exact"), [12])
+assert np.array_equal(post_index.mood("pass", match="prefix"), [10, 12])
+assert np.array_equal(post_index.mood(" PASSION "), [10, 11, 12])
+assert post_index.mood("sad").size == 0
+
+# Filters are combined by intersecting the sorted posting lists
+print(f"Category 1 with mood 'calm': {post_index.lookup(category_id=1, mood='calm')}")
+assert np.array_equal(post_index.lookup(category_id=1, mood="passion"), [10, 12])
+assert post_index.lookup() is None
+# Category 0 is a filter like any other id, not "no filter"
+assert post_index.lookup(category_id=0).size == 0
+
+# Suffix trie lookups
+trie = TokenTrie(suffixes=True)
+for token_id, token in enumerate(["calm", "calming", "becalmed"]):
+    trie.insert(token, token_id)
+assert trie.lookup("calm") == [0, 1, 2]
+assert trie.lookup("med") == [2]
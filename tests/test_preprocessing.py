@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+import pandas as pd
+from benchmarks.bench_aggregation import aggregate_interactions_lambdas
+from src import preprocessing
+
+# Interactions of the bundled raw files
+preprocessing.DATA_DIR = "data"
+viewed, liked, inspired, rated = [
+    preprocessing.load_json_to_df(preprocessing.raw_file(name))
+    for name in ("viewed_posts", "liked_posts", "inspired_posts", "rated_posts")
+]
+interaction_df = preprocessing.preprocess_interactions(viewed, liked, inspired, rated)
+
+# The bincount aggregation gives the same features as the per-group lambdas
+user_features, post_features = preprocessing.aggregate_interactions(interaction_df)
+expected_users, expected_posts = aggregate_interactions_lambdas(interaction_df)
+print(f"User features:\n{user_features.head()}")
+print(f"Post features:\n{post_features.head()}")
+pd.testing.assert_frame_equal(user_features, expected_users)
+pd.testing.assert_frame_equal(post_features, expected_posts)
+
+# The streaming pipeline writes the same interactions and aggregates in small chunks
+output_dir = tempfile.mkdtemp()
+try:
+    output_path = os.path.join(output_dir, "interaction_df.csv")
+    streamed_users, streamed_posts = preprocessing.stream_interactions(output_path, chunk_size=500, spill_dir=output_dir)
+    with open(output_path) as f:
+        streamed_csv = f.read()
+    print(f"Streamed {len(streamed_csv.splitlines()) - 1} interactions in chunks of 500")
+    assert streamed_csv == interaction_df.to_csv(index=False)
+    pd.testing.assert_frame_equal(streamed_users, user_features)
+    pd.testing.assert_frame_equal(streamed_posts, post_features)
+    assert os.listdir(output_dir) == ["interaction_df.csv"]
+
+    users = preprocessing.preprocess_users(preprocessing.load_json_to_df(preprocessing.raw_file("all_users")))
+    pd.testing.assert_frame_equal(
+        preprocessing.preprocess_in_chunks("all_users", preprocessing.preprocess_users, chunk_size=100), users
+    )
+finally:
+    shutil.rmtree(output_dir, ignore_errors=True)
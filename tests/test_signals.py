@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+from src.recommendation_engine.signals import InteractionSignals
+
+# Path to interactions CSV file
+interactions_csv_path = "data/processed/interaction_df.csv"
+interactions_df = pd.read_csv(interactions_csv_path)
+
+# Build the weighted, time-decayed signal matrix
+signals = InteractionSignals().build(interactions_df)
+print(f"Signal matrix: {signals.matrix.shape}, {signals.matrix.nnz} pairs, as of {signals.as_of}")
+assert signals.matrix.shape == (interactions_df['user_id'].nunique(), interactions_df['post_id'].nunique())
+
+# Type weights, rating scaling and recency decay of a handful of events
+events = pd.DataFrame([
+    {"user_id": 1, "post_id": 10, "interaction_type": "liked", "liked_at": "2024-12-31 00:00:00"},
+    {"user_id": 1, "post_id": 10, "interaction_type": "viewed", "viewed_at": "2024-12-01 00:00:00"},
+    {"user_id": 2, "post_id": 10, "interaction_type": "rated", "rating_percent": 50.0, "rated_at": "2024-12-31 00:00:00"},
+])
+weights = InteractionSignals(half_life_days=30.0).build(events)
+print(f"Signals of the sample events:\n{weights.matrix.toarray()}")
+assert np.allclose(weights.matrix.toarray().ravel(), [3.0 + 0.5, 1.0])
+
+# A daily re-decay only rescales the matrix
+total = weights.matrix.sum()
+factor = weights.decay_to(pd.Timestamp("2025-01-01"))
+assert np.isclose(weights.matrix.sum(), total * 0.5 ** (1 / 30)) and np.isclose(factor, 0.5 ** (1 / 30))
+assert weights.decay_to(pd.Timestamp("2024-06-01")) == 1.0